@@ -0,0 +1,127 @@
+"""
+Benchmark: latencia de broadcast del chat con 1, 10 y 100 sockets por sala.
+
+Usa sockets simulados con latencia de red por envío (y, opcionalmente, un
+móvil lento en la sala) para comparar el envío secuencial anterior con
+ConnectionManager (colas por conexión con tarea escritora). Se mide la
+latencia extremo a extremo: desde que se emite el mensaje hasta que lo tiene
+el último socket sano de la sala.
+
+Uso (desde app/):
+    python -m benchmarks.bench_broadcast --mensajes 50 --latencia-ms 2 --lento-ms 300
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("ENVIRONMENT", "benchmark")
+
+from websocket.chat_manager import ConnectionManager
+
+
+class SocketSimulado:
+    def __init__(self, latencia: float):
+        self.latencia = latencia
+        self.llegadas = {}
+
+    scope = {"subprotocols": []}
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_json(self, mensaje):
+        await asyncio.sleep(self.latencia)
+        self.llegadas[mensaje["id"]] = time.perf_counter()
+
+    async def send_text(self, texto):
+        await self.send_json(json.loads(texto))
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+class ManagerSecuencial(ConnectionManager):
+    """Comportamiento anterior: un send_json detrás de otro"""
+
+    async def broadcast(self, message: dict, hogar_id: int):
+        for connection in self.active_connections.get(hogar_id, ()):
+            await connection.send_json(message)
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+async def medir(clase, sockets: int, mensajes: int, latencia: float, lento: float):
+    manager = clase(timeout_envio=max(lento, latencia) * 2 + 1)
+    sanos, todos = [], []
+    for i in range(sockets):
+        # El último socket de la sala es el "móvil lento" si se pidió uno
+        es_lento = lento and i == sockets - 1
+        socket = SocketSimulado(lento if es_lento else latencia)
+        if not es_lento:
+            sanos.append(socket)
+        todos.append(socket)
+        await manager.connect(socket, 1)
+    # Sala de un solo socket lento: se mide ese mismo
+    sanos = sanos or todos
+
+    emitidos = {}
+    for n in range(mensajes):
+        emitidos[n] = time.perf_counter()
+        await manager.broadcast({"id": n, "contenido": "hola"}, 1)
+        await asyncio.sleep(0.01)  # ritmo de conversación: 100 msg/s
+
+    # Esperar a que los sanos reciban todo (las colas se vacían en segundo plano)
+    while any(len(s.llegadas) < mensajes for s in sanos):
+        await asyncio.sleep(0.01)
+    for websocket in list(manager.active_connections.get(1, ())):
+        manager.disconnect(websocket, 1)
+
+    return [
+        (max(s.llegadas[n] for s in sanos) - emitidos[n]) * 1000
+        for n in range(mensajes)
+    ]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mensajes", type=int, default=50)
+    parser.add_argument("--latencia-ms", type=float, default=2.0)
+    parser.add_argument(
+        "--lento-ms",
+        type=float,
+        default=0.0,
+        help="Latencia del último socket de la sala (móvil lento)",
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    latencia, lento = args.latencia_ms / 1000, args.lento_ms / 1000
+    for sockets in (1, 10, 100):
+        for nombre, clase in (
+            ("secuencial", ManagerSecuencial),
+            ("colas", ConnectionManager),
+        ):
+            valores = await medir(clase, sockets, args.mensajes, latencia, lento)
+            print(
+                f"{sockets:>4} sockets | {nombre:>10} | "
+                f"p50 {statistics.median(valores):8.1f} ms | "
+                f"p99 {percentil(valores, 99):8.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""
+Benchmark: latencia de entrega del chat entre workers con el broker SQLite.
+
+Lanza un segundo proceso (el "worker receptor") suscrito al mismo relay y
+publica desde este proceso. Cada mensaje lleva time.perf_counter() del emisor
+(reloj monotónico del sistema, comparable entre procesos en Linux) y el
+receptor informa de los percentiles de publicación → entrega.
+
+Uso (desde app/):
+    python -m benchmarks.bench_broker --mensajes 200 --ritmo 100 --sondeo-ms 20
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("ENVIRONMENT", "benchmark")
+
+from websocket.broker import BrokerSQLite
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+async def receptor(ruta: str, mensajes: int, sondeo: float):
+    latencias = []
+    completo = asyncio.Event()
+
+    def entregar(hogar_id, mensaje):
+        latencias.append((time.perf_counter() - mensaje["t"]) * 1000)
+        if len(latencias) >= mensajes:
+            completo.set()
+
+    broker = BrokerSQLite(ruta, intervalo_sondeo=sondeo)
+    await broker.iniciar(entregar)
+    print("listo", flush=True)
+    await asyncio.wait_for(completo.wait(), timeout=60)
+    await broker.cerrar()
+    print(
+        f"sondeo {sondeo * 1000:5.1f} ms | mensajes {len(latencias)} | "
+        f"p50 {statistics.median(latencias):6.1f} ms | "
+        f"p95 {percentil(latencias, 95):6.1f} ms | "
+        f"p99 {percentil(latencias, 99):6.1f} ms | "
+        f"max {max(latencias):6.1f} ms",
+        flush=True,
+    )
+
+
+async def emisor(mensajes: int, ritmo: float, sondeo: float):
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "relay.db")
+        proceso = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_broker",
+                "--receptor",
+                ruta,
+                "--mensajes",
+                str(mensajes),
+                "--sondeo-ms",
+                str(sondeo * 1000),
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        # Esperar a que el receptor esté suscrito
+        assert proceso.stdout.readline().strip() == "listo"
+
+        broker = BrokerSQLite(ruta, intervalo_sondeo=sondeo)
+        await broker.iniciar(lambda hogar_id, mensaje: None)
+        for n in range(mensajes):
+            await broker.publicar(1, {"id": n, "t": time.perf_counter()})
+            await asyncio.sleep(1 / ritmo)
+        salida, _ = await asyncio.to_thread(proceso.communicate, timeout=120)
+        await broker.cerrar()
+        print(salida.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mensajes", type=int, default=200)
+    parser.add_argument("--ritmo", type=float, default=100, help="mensajes/s")
+    parser.add_argument("--sondeo-ms", type=float, default=None)
+    parser.add_argument("--receptor", metavar="RUTA", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    if args.receptor:
+        asyncio.run(receptor(args.receptor, args.mensajes, args.sondeo_ms / 1000))
+        return
+
+    for sondeo_ms in [args.sondeo_ms] if args.sondeo_ms else [5, 20, 50]:
+        asyncio.run(emisor(args.mensajes, args.ritmo, sondeo_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Prueba de carga del chat: miles de clientes WebSocket repartidos en varios
+hogares contra la app en proceso y una BD SQLite en fichero temporal.
+
+Los clientes hablan ASGI directamente con la app (tests/cliente_ws.py),
+así que se ejercita todo el camino real: websocket/chat.py (autenticación,
+persistencia, broadcast) y ConnectionManager (broker, colas, escritoras).
+Los envíos siguen un ritmo objetivo fijo (bucle abierto: no esperan a que
+llegue el anterior) y cada mensaje lleva el instante en que se envió, así que
+cada cliente mide la latencia extremo a extremo de cada entrega. Informa de:
+
+- percentiles de latencia de broadcast (envío → llegada a cada miembro)
+- throughput de mensajes y de entregas, y entregas perdidas
+- retraso del event loop (un temporizador de ``--tick-ms`` que llega tarde)
+- RSS antes y después de conectar y máxima
+
+Clientes y servidor comparten proceso y event loop: el trabajo de los
+clientes (decodificar cada entrega) también cuenta en latencia y retraso, así
+que las cifras son una cota superior; sirven para comparar entre versiones.
+
+Con ``--p99-max-ms`` / ``--lag-max-ms`` termina con código 1 si se superan,
+para usarla como control de regresiones.
+
+Uso (desde app/):
+    python -m benchmarks.bench_carga_chat --clientes 2000 --hogares 50 --tasa 200 --duracion 10
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("ENVIRONMENT", "benchmark")
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+import websocket.chat as chat
+from tests.cliente_ws import ClienteWS, ConexionRechazada
+from db.database import Base, crear_motor
+from main import app  # noqa: F401  (registra las rutas y todos los modelos)
+from models.hogar import Hogar
+from models.miembro import Miembro
+from models.rol import Rol
+from utils.security import crear_token_acceso
+from websocket.persistencia import PersistenciaDiferida, PersistenciaSincrona
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * p / 100), len(ordenados) - 1)]
+
+
+def rss_actual_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1024**2
+
+
+async def poblar(motor, clientes: int, hogares: int):
+    async with motor.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(Rol.__table__), [{"id": 1, "nombre": "Usuario", "estado": True}]
+        )
+        await conn.execute(
+            insert(Hogar.__table__),
+            [
+                {"id": h, "nombre": f"Hogar {h}", "estado": True}
+                for h in range(1, hogares + 1)
+            ],
+        )
+        await conn.execute(
+            insert(Miembro.__table__),
+            [
+                {
+                    "id": n,
+                    "nombre_completo": f"Miembro {n}",
+                    "correo_electronico": f"m{n}@carga.local",
+                    "contrasena_hash": "x",
+                    "id_rol": 1,
+                    "id_hogar": n % hogares + 1,
+                    "estado": True,
+                }
+                for n in range(1, clientes + 1)
+            ],
+        )
+
+
+class MonitorLoop:
+    """Mide cuánto tarde se despierta un temporizador periódico."""
+
+    def __init__(self, tick: float):
+        self.tick = tick
+        self.retrasos: list = []
+        self._tarea = None
+
+    async def _medir(self):
+        while True:
+            inicio = time.perf_counter()
+            await asyncio.sleep(self.tick)
+            self.retrasos.append(max(time.perf_counter() - inicio - self.tick, 0.0))
+
+    def iniciar(self):
+        self._tarea = asyncio.create_task(self._medir())
+
+    async def detener(self):
+        self._tarea.cancel()
+        await asyncio.gather(self._tarea, return_exceptions=True)
+
+
+async def escuchar(cliente: ClienteWS, latencias: list):
+    """Lee frames hasta el cierre: anota latencias y contesta los latidos."""
+    while True:
+        try:
+            evento = json.loads(await cliente.recibir())
+        except (ConexionRechazada, asyncio.CancelledError):
+            return
+        if "tipo" in evento:
+            if evento["tipo"] == "ping":
+                await cliente.enviar('{"tipo": "pong"}')
+            continue
+        enviado = float(evento["contenido"].rsplit(" ", 1)[1])
+        latencias.append(time.perf_counter() - enviado)
+
+
+async def ejecutar(
+    clientes: int,
+    hogares: int,
+    tasa: float,
+    duracion: float,
+    ruta_bd: str,
+    modo_persistencia: str = "sincrona",
+    perfil: str = "dev",
+    tick: float = 0.01,
+    espera_final: float = 10.0,
+    semilla: int = 1,
+) -> dict:
+    """Ejecuta una prueba de carga completa y devuelve las métricas."""
+    motor = crear_motor(f"sqlite+aiosqlite:///{ruta_bd}", perfil)
+    await poblar(motor, clientes, hogares)
+    sesiones = sessionmaker(motor, class_=AsyncSession, expire_on_commit=False)
+    if modo_persistencia == "diferida":
+        persistencia = PersistenciaDiferida(fabrica_sesiones=sesiones)
+    else:
+        persistencia = PersistenciaSincrona(fabrica_sesiones=sesiones)
+    originales = chat.AsyncSessionLocal, chat.persistencia
+    chat.AsyncSessionLocal, chat.persistencia = sesiones, persistencia
+    await persistencia.iniciar()
+
+    latencias: list = []
+    oyentes: list = []
+    monitor = MonitorLoop(tick)
+    conexiones = [
+        ClienteWS(app, token=crear_token_acceso({"sub": str(n)}))
+        for n in range(1, clientes + 1)
+    ]
+    # Miembros por hogar: entregas esperadas por cada mensaje enviado
+    por_hogar = {h: 0 for h in range(1, hogares + 1)}
+    for n in range(1, clientes + 1):
+        por_hogar[n % hogares + 1] += 1
+
+    try:
+        # 1. Conectar a todos
+        rss_antes = rss_actual_mb()
+        inicio = time.perf_counter()
+        await asyncio.gather(*(c.conectar() for c in conexiones))
+        conexion_s = time.perf_counter() - inicio
+        rss_conectados = rss_actual_mb()
+        oyentes.extend(asyncio.create_task(escuchar(c, latencias)) for c in conexiones)
+
+        # 2. Enviar a ritmo fijo desde clientes al azar
+        aleatorio = random.Random(semilla)
+        total = int(tasa * duracion)
+        esperadas = 0
+        monitor.iniciar()
+        inicio = time.perf_counter()
+        for i in range(total):
+            objetivo = inicio + i / tasa
+            retraso = objetivo - time.perf_counter()
+            if retraso > 0:
+                await asyncio.sleep(retraso)
+            n = aleatorio.randrange(clientes)
+            esperadas += por_hogar[(n + 1) % hogares + 1]
+            await conexiones[n].enviar(
+                json.dumps({"contenido": f"carga {i} {time.perf_counter():.6f}"})
+            )
+        envio_s = time.perf_counter() - inicio
+
+        # 3. Esperar a que lleguen las entregas pendientes
+        limite = time.perf_counter() + espera_final
+        while len(latencias) < esperadas and time.perf_counter() < limite:
+            await asyncio.sleep(0.05)
+        total_s = time.perf_counter() - inicio
+        await monitor.detener()
+        descartados = sum(s["descartados"] for s in chat.manager.metricas().values())
+    finally:
+        await asyncio.gather(*(c.cerrar() for c in conexiones))
+        await asyncio.gather(*oyentes, return_exceptions=True)
+        await chat.manager.cerrar()
+        await persistencia.cerrar()
+        chat.AsyncSessionLocal, chat.persistencia = originales
+        await motor.dispose()
+
+    return {
+        "clientes": clientes,
+        "hogares": hogares,
+        "conexion_s": conexion_s,
+        "mensajes": total,
+        "tasa_real": total / envio_s if envio_s else 0.0,
+        "entregas": len(latencias),
+        "entregas_esperadas": esperadas,
+        "entregas_por_s": len(latencias) / total_s if total_s else 0.0,
+        "descartados": descartados,
+        "latencia_ms": {p: percentil(latencias, p) * 1000 for p in (50, 90, 99, 99.9)}
+        | {"max": max(latencias, default=0.0) * 1000},
+        "lag_ms": {p: percentil(monitor.retrasos, p) * 1000 for p in (50, 99)}
+        | {"max": max(monitor.retrasos, default=0.0) * 1000},
+        "rss_mb": {
+            "antes": rss_antes,
+            "conectados": rss_conectados,
+            "max": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        },
+    }
+
+
+def informe(r: dict) -> str:
+    lat, lag, rss = r["latencia_ms"], r["lag_ms"], r["rss_mb"]
+    return (
+        f"{r['clientes']} clientes en {r['hogares']} hogares conectados en "
+        f"{r['conexion_s']:.2f} s | RSS {rss['antes']:.0f} → "
+        f"{rss['conectados']:.0f} MB (máx {rss['max']:.0f} MB)\n"
+        f"{r['mensajes']} mensajes a {r['tasa_real']:.0f} msg/s | "
+        f"{r['entregas']}/{r['entregas_esperadas']} entregas "
+        f"({r['entregas_por_s']:.0f}/s) | descartadas por cola llena "
+        f"{r['descartados']}\n"
+        f"latencia de broadcast p50 {lat[50]:.1f} ms | p90 {lat[90]:.1f} ms | "
+        f"p99 {lat[99]:.1f} ms | p99.9 {lat[99.9]:.1f} ms | máx {lat['max']:.1f} ms\n"
+        f"retraso del event loop p50 {lag[50]:.2f} ms | p99 {lag[99]:.2f} ms | "
+        f"máx {lag['max']:.1f} ms"
+    )
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clientes", type=int, default=2000)
+    parser.add_argument("--hogares", type=int, default=50)
+    parser.add_argument("--tasa", type=float, default=200, help="mensajes/s")
+    parser.add_argument("--duracion", type=float, default=10, help="segundos")
+    parser.add_argument(
+        "--persistencia", choices=("sincrona", "diferida"), default="sincrona"
+    )
+    parser.add_argument("--perfil", default="dev", help="perfil del pool (db)")
+    parser.add_argument("--tick-ms", type=float, default=10)
+    parser.add_argument("--p99-max-ms", type=float, default=None)
+    parser.add_argument("--lag-max-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory(prefix="bench_carga_") as directorio:
+        r = await ejecutar(
+            args.clientes,
+            args.hogares,
+            args.tasa,
+            args.duracion,
+            os.path.join(directorio, "carga.db"),
+            modo_persistencia=args.persistencia,
+            perfil=args.perfil,
+            tick=args.tick_ms / 1000,
+        )
+    print(informe(r))
+
+    fallos = []
+    if r["entregas"] < r["entregas_esperadas"] - r["descartados"]:
+        fallos.append("entregas perdidas")
+    if args.p99_max_ms is not None and r["latencia_ms"][99] > args.p99_max_ms:
+        fallos.append(f"p99 {r['latencia_ms'][99]:.1f} ms > {args.p99_max_ms} ms")
+    if args.lag_max_ms is not None and r["lag_ms"][99] > args.lag_max_ms:
+        fallos.append(f"lag p99 {r['lag_ms'][99]:.2f} ms > {args.lag_max_ms} ms")
+    for fallo in fallos:
+        print(f"REGRESIÓN: {fallo}")
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
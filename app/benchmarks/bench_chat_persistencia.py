@@ -0,0 +1,86 @@
+"""
+Benchmark: mensajes/s del chat con persistencia síncrona vs diferida.
+
+Simula N remitentes concurrentes (uno por WebSocket, como en chat_websocket)
+enviando M mensajes cada uno contra una BD SQLite en fichero. Se mide:
+- aceptados/s: hasta que guardar() devuelve el id (cuando se puede difundir)
+- persistidos/s: hasta que todo está en la BD (incluye el último vaciado)
+
+Uso (desde app/):
+    python -m benchmarks.bench_chat_persistencia --remitentes 20 --mensajes 100
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("ENVIRONMENT", "benchmark")
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from db.database import Base
+from models.mensaje import Mensaje
+from models.secuencia import Secuencia  # noqa: F401
+from websocket.persistencia import PersistenciaDiferida, PersistenciaSincrona
+
+
+async def ejecutar(modo: str, remitentes: int, mensajes: int, directorio: str):
+    motor = create_async_engine(
+        f"sqlite+aiosqlite:///{os.path.join(directorio, modo + '.db')}",
+        connect_args={"timeout": 30},
+    )
+    async with motor.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Sesion = sessionmaker(motor, class_=AsyncSession, expire_on_commit=False)
+
+    if modo == "sincrona":
+        persistencia = PersistenciaSincrona(Sesion)
+    else:
+        persistencia = PersistenciaDiferida(Sesion)
+    await persistencia.iniciar()
+
+    async def remitente(n: int):
+        for i in range(mensajes):
+            await persistencia.guardar(1, n, f"mensaje {i} de {n}")
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(remitente(n) for n in range(remitentes)))
+    aceptados = time.perf_counter() - inicio
+    await persistencia.cerrar()
+    persistidos = time.perf_counter() - inicio
+
+    async with Sesion() as db:
+        total = await db.scalar(select(func.count(Mensaje.id)))
+    await motor.dispose()
+    assert total == remitentes * mensajes, total
+
+    print(
+        f"{modo:>8} | aceptados/s {total / aceptados:9.0f} | "
+        f"persistidos/s {total / persistidos:9.0f} | mensajes {total}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--remitentes", type=int, default=20)
+    parser.add_argument("--mensajes", type=int, default=100)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directorio:
+        for modo in ("sincrona", "diferida"):
+            await ejecutar(modo, args.remitentes, args.mensajes, directorio)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,142 @@
+"""
+Benchmark: logins concurrentes vs. latencia del resto de endpoints.
+
+Lanza ráfagas de POST /auth/login mientras sondea GET / y compara bcrypt
+ejecutado en el event loop ("inline", comportamiento anterior) con el pool
+de hilos de utils.hashing.
+
+Uso (desde app/):
+    python -m benchmarks.bench_hashing --logins 40 --concurrencia 20
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("ENVIRONMENT", "benchmark")
+
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from main import app
+from db.database import Base, get_db
+from models.hogar import Hogar
+from models.rol import Rol
+from models.miembro import Miembro
+from utils.hashing import servicio_hash
+from utils.security import obtener_hash_contrasena
+
+CORREO = "bench@example.com"
+CONTRASENA = "password123"
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+async def preparar_db():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Sesion = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with Sesion() as db:
+        db.add_all([Hogar(id=1, nombre="Bench"), Rol(id=1, nombre="Bench")])
+        db.add(
+            Miembro(
+                nombre_completo="Bench",
+                correo_electronico=CORREO,
+                contrasena_hash=obtener_hash_contrasena(CONTRASENA),
+                id_rol=1,
+                id_hogar=1,
+            )
+        )
+        await db.commit()
+
+    async def override_get_db():
+        async with Sesion() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    return engine
+
+
+async def ejecutar(modo: str, logins: int, concurrencia: int):
+    servicio_hash.cerrar()
+    servicio_hash.tipo = modo
+
+    latencias_raiz = []
+    terminado = asyncio.Event()
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+
+        async def sondear():
+            # Se mide desde el instante en que la sonda *debía* arrancar, así
+            # los bloqueos del event loop cuentan como latencia
+            while not terminado.is_set():
+                programado = time.perf_counter() + 0.005
+                await asyncio.sleep(0.005)
+                await client.get("/")
+                latencias_raiz.append((time.perf_counter() - programado) * 1000)
+
+        semaforo = asyncio.Semaphore(concurrencia)
+
+        async def login():
+            async with semaforo:
+                r = await client.post(
+                    "/auth/login",
+                    json={"correo_electronico": CORREO, "contrasena": CONTRASENA},
+                )
+                assert r.status_code == 200, r.text
+
+        sonda = asyncio.create_task(sondear())
+        inicio = time.perf_counter()
+        await asyncio.gather(*[login() for _ in range(logins)])
+        duracion = time.perf_counter() - inicio
+        terminado.set()
+        await sonda
+
+    print(
+        f"{modo:>7} | logins/s {logins / duracion:7.1f} | "
+        f"GET / p50 {statistics.median(latencias_raiz):7.1f} ms | "
+        f"p99 {percentil(latencias_raiz, 99):7.1f} ms | "
+        f"muestras {len(latencias_raiz)}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrencia", type=int, default=20)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    engine = await preparar_db()
+    try:
+        for modo in ("inline", "thread"):
+            await ejecutar(modo, args.logins, args.concurrencia)
+    finally:
+        servicio_hash.cerrar()
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,212 @@
+"""
+Benchmark: latencia de petición con el logging síncrono y con la cola.
+
+GET /tareas/{id} registra varias líneas por petición (require_permission,
+tarea_service, acceso). Cada modo se mide en un proceso hijo propio (los
+loggers se configuran al importar) con settings.LOG_MODO:
+- sincrono: cada logger formatea, escribe y rota en el hilo de la petición
+- cola: la petición solo encola; el hilo listener formatea y escribe
+
+Con ``--retardo-escritura-ms`` cada flush de un handler (fichero o consola)
+tarda además ese tiempo, para simular un disco lento o un consumidor de
+stdout que no da abasto: es el caso en el que el modo síncrono bloquea el
+event loop.
+
+Los hijos trabajan en un directorio temporal (BD SQLite en fichero y logs/),
+así que no tocan los logs del repositorio. La salida INFO de consola va a
+una tubería, como con un gestor de procesos.
+
+Uso (desde app/):
+    python -m benchmarks.bench_logging --peticiones 2000 --concurrencia 20
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODOS = ("sincrono", "cola")
+PREFIJO = "RESULTADO "
+
+
+def percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * p / 100), len(ordenados) - 1)]
+
+
+def simular_escritura_lenta(retardo: float):
+    flush = logging.StreamHandler.flush
+
+    def flush_lento(handler):
+        flush(handler)
+        time.sleep(retardo)
+
+    logging.StreamHandler.flush = flush_lento
+
+
+async def medir(peticiones: int, concurrencia: int, retardo: float) -> dict:
+    """Se ejecuta en el hijo: arranca la app y mide peticiones reales."""
+    if retardo > 0:
+        simular_escritura_lenta(retardo)
+    os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///bench_logging.db")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+    os.environ.setdefault("DEBUG", "false")
+    os.environ.setdefault("ENVIRONMENT", "benchmark")
+
+    import httpx
+    from sqlalchemy import insert
+
+    from db.database import engine
+    from main import app, arrancar
+    from models.hogar import Hogar
+    from models.miembro import Miembro
+    from models.modulo import Modulo
+    from models.permiso import Permiso
+    from models.rol import Rol
+    from models.tarea import Tarea
+    from services.permiso_service import matriz_permisos
+    from utils.logger import vaciar_logs
+    from utils.security import crear_token_acceso
+
+    await arrancar(app)
+    async with engine.begin() as conn:
+        await conn.execute(insert(Rol.__table__), [{"id": 1, "nombre": "Admin"}])
+        await conn.execute(insert(Hogar.__table__), [{"id": 1, "nombre": "Hogar"}])
+        await conn.execute(
+            insert(Miembro.__table__),
+            [
+                {
+                    "id": 1,
+                    "nombre_completo": "Miembro 1",
+                    "correo_electronico": "m1@bench.local",
+                    "contrasena_hash": "x",
+                    "id_rol": 1,
+                    "id_hogar": 1,
+                    "estado": True,
+                }
+            ],
+        )
+        await conn.execute(insert(Modulo.__table__), [{"id": 1, "nombre": "Tareas"}])
+        await conn.execute(
+            insert(Permiso.__table__),
+            [{"id_rol": 1, "id_modulo": 1, "puede_leer": True, "estado": True}],
+        )
+        await conn.execute(
+            insert(Tarea.__table__),
+            [
+                {
+                    "id": 1,
+                    "titulo": "Lavar platos",
+                    "categoria": "cocina",
+                    "asignado_a": 1,
+                    "id_hogar": 1,
+                    "estado": True,
+                }
+            ],
+        )
+
+    # arrancar() precargó la matriz de permisos antes de sembrar el permiso
+    matriz_permisos.invalidar()
+
+    cabeceras = {"Authorization": f"Bearer {crear_token_acceso({'sub': '1'})}"}
+    transporte = httpx.ASGITransport(app=app)
+    latencias = []
+    async with httpx.AsyncClient(transport=transporte, base_url="http://test") as http:
+
+        async def una():
+            inicio = time.perf_counter()
+            respuesta = await http.get("/tareas/1", headers=cabeceras)
+            latencias.append(time.perf_counter() - inicio)
+            assert respuesta.status_code == 200, respuesta.text
+
+        # Calentamiento: rutas, cachés de permisos y principal
+        for _ in range(50):
+            await una()
+        latencias.clear()
+
+        async def trabajador(cantidad: int):
+            for _ in range(cantidad):
+                await una()
+
+        inicio = time.perf_counter()
+        por_trabajador = peticiones // concurrencia
+        await asyncio.gather(*(trabajador(por_trabajador) for _ in range(concurrencia)))
+        duracion = time.perf_counter() - inicio
+        # Lo que quedaba en cola se escribe fuera del tramo medido
+        vaciar_logs(timeout=30)
+
+    await engine.dispose()
+    return {
+        "peticiones": len(latencias),
+        "rps": len(latencias) / duracion,
+        "media_ms": statistics.mean(latencias) * 1000,
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p99_ms": percentil(latencias, 99) * 1000,
+    }
+
+
+def lanzar(modo: str, args) -> dict:
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory(prefix="bench_logging_") as directorio:
+        entorno = dict(os.environ, LOG_MODO=modo, PYTHONPATH=app_dir)
+        salida = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_logging",
+                "--hijo",
+                "--peticiones",
+                str(args.peticiones),
+                "--concurrencia",
+                str(args.concurrencia),
+                "--retardo-escritura-ms",
+                str(args.retardo_escritura_ms),
+            ],
+            cwd=directorio,
+            env=entorno,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    linea = next(l for l in salida.splitlines() if l.startswith(PREFIJO))
+    return json.loads(linea[len(PREFIJO) :])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--concurrencia", type=int, default=20)
+    parser.add_argument("--retardo-escritura-ms", type=float, default=0)
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        resultado = asyncio.run(
+            medir(args.peticiones, args.concurrencia, args.retardo_escritura_ms / 1000)
+        )
+        print(PREFIJO + json.dumps(resultado), flush=True)
+        return
+
+    base = None
+    for modo in MODOS:
+        r = lanzar(modo, args)
+        base = base or r["media_ms"]
+        print(
+            f"{modo:>8} | {r['peticiones']} peticiones, concurrencia "
+            f"{args.concurrencia}, retardo {args.retardo_escritura_ms} ms | "
+            f"{r['rps']:7.0f} req/s | media "
+            f"{r['media_ms']:6.2f} ms | p50 {r['p50_ms']:6.2f} ms | "
+            f"p99 {r['p99_ms']:6.2f} ms | x{base / r['media_ms']:4.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
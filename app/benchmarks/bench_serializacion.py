@@ -0,0 +1,134 @@
+"""
+Benchmark: tiempo de CPU por mensaje difundido a una sala de 100 miembros.
+
+Usa WebSockets reales de Starlette sobre un transporte ASGI que descarta los
+frames, así que lo medido es el trabajo del servidor: colas, tareas
+escritoras y serialización. Compara:
+- send_json: comportamiento anterior, json.dumps repetido por destinatario
+- json stdlib: una sola codificación por mensaje con json de la stdlib
+- json: una sola codificación con orjson (si está instalado)
+- msgpack: una sola codificación binaria para clientes con ese subprotocolo
+
+Uso (desde app/):
+    python -m benchmarks.bench_serializacion --miembros 100 --mensajes 500 --rondas 5
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("ENVIRONMENT", "benchmark")
+
+from starlette.websockets import WebSocket
+
+import websocket.codificacion as codificacion
+from websocket.chat_manager import ConnectionManager
+
+
+class ManagerSendJson(ConnectionManager):
+    """Comportamiento anterior: send_json (json.dumps) por cada socket"""
+
+    async def _enviar(self, websocket, message, formato="json") -> bool:
+        try:
+            await asyncio.wait_for(websocket.send_json(message), self.timeout_envio)
+            return True
+        except Exception:
+            return False
+
+
+def crear_socket(subprotocolos) -> tuple[WebSocket, list]:
+    frames = []
+
+    async def recibir():
+        return {"type": "websocket.connect"}
+
+    async def enviar(evento):
+        if evento["type"] == "websocket.send":
+            frames.append(1)
+
+    scope = {
+        "type": "websocket",
+        "path": "/ws/chat",
+        "headers": [],
+        "query_string": b"",
+        "subprotocols": subprotocolos,
+    }
+    return WebSocket(scope, recibir, enviar), frames
+
+
+def mensaje(n: int) -> dict:
+    return {
+        "id": 1_000_000 + n,
+        "remitente": "María José Fernández",
+        "contenido": f"¿Alguien puede sacar la basura antes de las 9? Gracias ({n})",
+        "fecha": "2025-01-15T20:31:07",
+    }
+
+
+async def medir(clase, subprotocolos, miembros: int, mensajes: int) -> float:
+    manager = clase(max_cola=mensajes + 1)
+    contadores = []
+    for _ in range(miembros):
+        socket, frames = crear_socket(subprotocolos)
+        contadores.append(frames)
+        await manager.connect(socket, 1)
+
+    inicio = time.process_time()
+    for n in range(mensajes):
+        await manager.broadcast(mensaje(n), 1)
+    while sum(map(len, contadores)) < miembros * mensajes:
+        await asyncio.sleep(0)
+    cpu = time.process_time() - inicio
+
+    escritoras = [s.tarea for s in manager._salientes.values()]
+    for socket in list(manager.active_connections.get(1, ())):
+        manager.disconnect(socket, 1)
+    await asyncio.gather(*escritoras, return_exceptions=True)
+    await manager.cerrar()
+    return cpu
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--miembros", type=int, default=100)
+    parser.add_argument("--mensajes", type=int, default=500)
+    parser.add_argument("--rondas", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    orjson = codificacion.orjson
+    casos = [
+        ("send_json", ManagerSendJson, [], None),
+        ("json stdlib", ConnectionManager, [], None),
+        ("json" if orjson else "json (sin orjson)", ConnectionManager, [], orjson),
+        ("msgpack", ConnectionManager, ["msgpack"], orjson),
+    ]
+    base = None
+    for nombre, clase, subprotocolos, codificador_json in casos:
+        codificacion.orjson = codificador_json
+        # La mejor de varias rondas: el ruido del planificador solo suma
+        cpu = min(
+            [
+                await medir(clase, subprotocolos, args.miembros, args.mensajes)
+                for _ in range(args.rondas)
+            ]
+        )
+        base = base or cpu
+        print(
+            f"{nombre:>17} | {args.miembros} miembros | "
+            f"CPU {cpu * 1e6 / args.mensajes:8.1f} µs/mensaje | "
+            f"{cpu * 1e6 / (args.mensajes * args.miembros):5.2f} µs/entrega | "
+            f"x{base / cpu:4.2f}"
+        )
+    codificacion.orjson = orjson
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,194 @@
+"""
+Prueba de carga: N WebSockets de chat inactivos contra el pool del perfil
+"test" (pool_size 2, sin overflow) sobre una BD SQLite en fichero.
+
+Antes cada socket retenía su sesión (y al primer uso, su conexión) durante
+toda su vida; ahora solo se usa una sesión corta para autenticar y otra por
+mensaje. Se comprueba que:
+- el pico de conexiones prestadas nunca supera pool_size + max_overflow
+- con los N sockets abiertos e inactivos no hay ninguna conexión prestada
+- una petición REST sigue obteniendo conexión sin esperar al pool
+
+También informa de la memoria por socket para dimensionar workers: la que
+estima ConnectionManager.memoria() y el aumento real de RSS al abrirlos
+(este último incluye el lado cliente en proceso, así que es una cota superior).
+
+Uso (desde app/):
+    python -m benchmarks.bench_ws_inactivos --sockets 1000 --hogares 20
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+_directorio = tempfile.mkdtemp(prefix="bench_ws_")
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(_directorio, 'ws.db')}"
+)
+os.environ.setdefault("DB_PERFIL", "test")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("ENVIRONMENT", "benchmark")
+
+import httpx
+from sqlalchemy import event, func, insert, select
+
+from tests.cliente_ws import ClienteWS
+from db.database import PERFILES_MOTOR, engine, estadisticas_pool
+from main import app, arrancar
+from models.hogar import Hogar
+from models.mensaje import Mensaje
+from models.miembro import Miembro
+from models.rol import Rol
+from utils.security import crear_token_acceso
+from websocket.chat_manager import manager
+from websocket.persistencia import persistencia
+
+
+class MonitorPool:
+    """Lleva el pico de conexiones prestadas a la vez."""
+
+    def __init__(self, motor):
+        self.prestadas = 0
+        self.pico = 0
+        event.listen(motor.sync_engine, "checkout", self._checkout)
+        event.listen(motor.sync_engine, "checkin", self._checkin)
+
+    def _checkout(self, *args):
+        self.prestadas += 1
+        self.pico = max(self.pico, self.prestadas)
+
+    def _checkin(self, *args):
+        self.prestadas -= 1
+
+
+async def poblar(sockets: int, hogares: int):
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(Rol.__table__), [{"id": 1, "nombre": "Usuario", "estado": True}]
+        )
+        await conn.execute(
+            insert(Hogar.__table__),
+            [
+                {"id": h, "nombre": f"Hogar {h}", "estado": True}
+                for h in range(1, hogares + 1)
+            ],
+        )
+        await conn.execute(
+            insert(Miembro.__table__),
+            [
+                {
+                    "id": n,
+                    "nombre_completo": f"Miembro {n}",
+                    "correo_electronico": f"m{n}@bench.local",
+                    "contrasena_hash": "x",
+                    "id_rol": 1,
+                    "id_hogar": n % hogares + 1,
+                    "estado": True,
+                }
+                for n in range(1, sockets + 1)
+            ],
+        )
+
+
+def rss_actual_kb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1024
+
+
+async def contar_mensajes() -> int:
+    async with engine.connect() as conn:
+        return await conn.scalar(select(func.count(Mensaje.id)))
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sockets", type=int, default=1000)
+    parser.add_argument("--hogares", type=int, default=20)
+    parser.add_argument("--mensajes", type=int, default=200)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    perfil = PERFILES_MOTOR["test"]
+    limite = perfil["pool_size"] + perfil["max_overflow"]
+
+    await arrancar(app)
+    await poblar(args.sockets, args.hogares)
+    monitor = MonitorPool(engine)
+
+    # 1. Conectar todos a la vez (cada uno autentica con su propio miembro)
+    clientes = [
+        ClienteWS(app, token=crear_token_acceso({"sub": str(n)}))
+        for n in range(1, args.sockets + 1)
+    ]
+    rss_antes = rss_actual_kb()
+    inicio = time.perf_counter()
+    await asyncio.gather(*(c.conectar() for c in clientes))
+    conexion_s = time.perf_counter() - inicio
+    rss_por_socket = (rss_actual_kb() - rss_antes) / args.sockets
+    memoria = manager.memoria()
+    conectados = sum(len(s) for s in manager.active_connections.values())
+
+    # 2. Inactivos: ninguna conexión del pool prestada
+    await asyncio.sleep(0.5)
+    prestadas_inactivos = engine.pool.checkedout()
+
+    # 3. Unos pocos hablan mientras el resto sigue inactivo
+    inicio = time.perf_counter()
+    for i in range(args.mensajes):
+        await clientes[i % len(clientes)].enviar(f'{{"contenido": "hola {i}"}}')
+    while await contar_mensajes() < args.mensajes:
+        await asyncio.sleep(0.01)
+    mensajes_s = time.perf_counter() - inicio
+
+    # 4. REST con los sockets abiertos (ya sin difusiones en curso)
+    await asyncio.sleep(0.5)
+    token = crear_token_acceso({"sub": "1"})
+    transporte = httpx.ASGITransport(app=app)
+    cabeceras = {"Authorization": f"Bearer {token}"}
+    ruta = f"/mensajes/hogar/{1 % args.hogares + 1}"
+    async with httpx.AsyncClient(transport=transporte, base_url="http://test") as http:
+        # La primera petición paga el arranque en frío de la ruta, no el pool
+        await http.get(ruta, headers=cabeceras)
+        inicio = time.perf_counter()
+        respuesta = await http.get(ruta, headers=cabeceras)
+        rest_ms = (time.perf_counter() - inicio) * 1000
+
+    datos = estadisticas_pool()
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"sockets {conectados}/{args.sockets} en {conexion_s:.2f} s | "
+        f"límite del pool {limite}\n"
+        f"pico de prestadas {monitor.pico} | prestadas con sockets inactivos "
+        f"{prestadas_inactivos} | timeouts {datos['timeouts']} | "
+        f"espera máx {datos['espera_max_s'] * 1000:.1f} ms\n"
+        f"{args.mensajes} mensajes persistidos en {mensajes_s:.2f} s | "
+        f"REST {respuesta.status_code} en {rest_ms:.1f} ms | RSS máx {rss_mb:.0f} MB\n"
+        f"memoria por socket: manager {memoria['bytes_por_conexion']} B (estimada) | "
+        f"RSS {rss_por_socket:.1f} KB (medida, incluye el cliente)"
+    )
+
+    await asyncio.gather(*(c.cerrar() for c in clientes))
+    await manager.cerrar()
+    await persistencia.cerrar()
+    await engine.dispose()
+
+    assert conectados == args.sockets
+    assert monitor.pico <= limite
+    assert prestadas_inactivos == 0
+    assert datos["timeouts"] == 0
+    assert respuesta.status_code == 200
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    finally:
+        shutil.rmtree(_directorio, ignore_errors=True)
@@ -14,5 +14,141 @@ class Settings(BaseSettings):
     DEBUG: bool = os.getenv("DEBUG")
     ENVIRONMENT: str = os.getenv("ENVIRONMENT")
 
+    # Perfil del motor de BD: dev, test, prod o low-memory (db/database.py).
+    # Por defecto "prod": "dev" activa echo y vuelca todo el SQL al log
+    DB_PERFIL: str = os.getenv("DB_PERFIL", "prod")
+
+    # Modo de token: "estandar" (sub, rol, id_hogar) o "permisos" (además
+    # embebe la máscara de permisos por módulo y la huella de la matriz)
+    TOKEN_MODO: str = os.getenv("TOKEN_MODO", "estandar")
+    ACCESS_TOKEN_PERMISOS_EXPIRE_MINUTES: int = int(
+        os.getenv("ACCESS_TOKEN_PERMISOS_EXPIRE_MINUTES", "5")
+    )
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+
+    # Pool de hashing de contraseñas (bcrypt fuera del event loop)
+    # HASH_POOL_TIPO: "thread", "process" o "inline" (sin pool, solo para depurar)
+    HASH_POOL_TIPO: str = os.getenv("HASH_POOL_TIPO", "thread")
+    HASH_POOL_WORKERS: int = int(os.getenv("HASH_POOL_WORKERS", "4"))
+    HASH_POOL_MAX_PENDIENTES: int = int(os.getenv("HASH_POOL_MAX_PENDIENTES", "64"))
+
+    # Caché del miembro autenticado (utils/auth.py)
+    PRINCIPAL_CACHE_TTL_SEGUNDOS: int = int(
+        os.getenv("PRINCIPAL_CACHE_TTL_SEGUNDOS", "60")
+    )
+    PRINCIPAL_CACHE_MAX_ENTRADAS: int = int(
+        os.getenv("PRINCIPAL_CACHE_MAX_ENTRADAS", "10000")
+    )
+
+    # Sesiones de mensaje de tareas en memoria (services/mensaje_service.py)
+    SESIONES_TAREA_CACHE_TTL_SEGUNDOS: int = int(
+        os.getenv("SESIONES_TAREA_CACHE_TTL_SEGUNDOS", "300")
+    )
+    SESIONES_TAREA_CACHE_MAX_ENTRADAS: int = int(
+        os.getenv("SESIONES_TAREA_CACHE_MAX_ENTRADAS", "10000")
+    )
+
+    # Matriz de permisos en memoria (services/permiso_service.py)
+    PERMISOS_MATRIZ_TTL_SEGUNDOS: int = int(
+        os.getenv("PERMISOS_MATRIZ_TTL_SEGUNDOS", "300")
+    )
+
+    # Catálogos de referencia en memoria (atributos activos)
+    CATALOGOS_CACHE_TTL_SEGUNDOS: int = int(
+        os.getenv("CATALOGOS_CACHE_TTL_SEGUNDOS", "300")
+    )
+
+    # Medición de SQL por petición (db/instrumentacion.py): una misma sentencia
+    # ejecutada más veces que esto en una petición se avisa como posible N+1
+    SQL_N_MAS_1_UMBRAL: int = int(os.getenv("SQL_N_MAS_1_UMBRAL", "10"))
+
+    # Registro de consultas por huella (db/consultas_lentas.py), desactivado
+    # por defecto: busca el origen de cada sentencia recorriendo la pila.
+    # Ventana de duraciones por huella para el p95, huellas máximas en memoria
+    # y umbral (ms) a partir del cual una sentencia se avisa en el log
+    SQL_LENTAS_ACTIVO: bool = os.getenv("SQL_LENTAS_ACTIVO", "false").lower() == "true"
+    SQL_LENTAS_MUESTRAS: int = int(os.getenv("SQL_LENTAS_MUESTRAS", "200"))
+    SQL_LENTAS_MAX_HUELLAS: int = int(os.getenv("SQL_LENTAS_MAX_HUELLAS", "1000"))
+    SQL_LENTAS_UMBRAL_MS: float = float(os.getenv("SQL_LENTAS_UMBRAL_MS", "100"))
+    SQL_LENTAS_TOP_K: int = int(os.getenv("SQL_LENTAS_TOP_K", "20"))
+
+    # Historial de chat paginado (/mensajes/hogar/{id})
+    MENSAJES_PAGINA_DEFECTO: int = int(os.getenv("MENSAJES_PAGINA_DEFECTO", "50"))
+    MENSAJES_PAGINA_MAX: int = int(os.getenv("MENSAJES_PAGINA_MAX", "200"))
+
+    # Chat por WebSocket (websocket/chat_manager.py): tiempo máximo por envío
+    # antes de dar la conexión por muerta y retirarla de la sala
+    WS_TIMEOUT_ENVIO_SEGUNDOS: float = float(
+        os.getenv("WS_TIMEOUT_ENVIO_SEGUNDOS", "2.0")
+    )
+    # Cola de salida acotada por conexión y qué hacer cuando se llena:
+    # "descartar_antiguo", "fusionar" (aviso de resincronización) o "desconectar"
+    WS_COLA_MAX_MENSAJES: int = int(os.getenv("WS_COLA_MAX_MENSAJES", "100"))
+    WS_POLITICA_COLA_LLENA: str = os.getenv(
+        "WS_POLITICA_COLA_LLENA", "descartar_antiguo"
+    )
+
+    # Latido del servidor ({"tipo": "ping"} a quien lleva este tiempo callado) y
+    # desalojo de conexiones sin actividad (TCP medio abierto en móviles)
+    WS_LATIDO_SEGUNDOS: float = float(os.getenv("WS_LATIDO_SEGUNDOS", "25"))
+    WS_INACTIVIDAD_SEGUNDOS: float = float(os.getenv("WS_INACTIVIDAD_SEGUNDOS", "75"))
+
+    # Búfer en memoria de los últimos mensajes por hogar (websocket/recientes.py):
+    # reanudación con ?last_id= al reconectar y primera página del historial
+    WS_RECIENTES_MENSAJES: int = int(os.getenv("WS_RECIENTES_MENSAJES", "100"))
+    WS_RECIENTES_MAX_HOGARES: int = int(os.getenv("WS_RECIENTES_MAX_HOGARES", "1000"))
+    # La primera página sale del búfer solo durante este tiempo tras sembrarlo
+    # desde la BD; luego se vuelve a consultar (acota lo que se pierda de
+    # mensajes guardados sin pasar por el chat)
+    WS_RECIENTES_TTL_SEGUNDOS: float = float(
+        os.getenv("WS_RECIENTES_TTL_SEGUNDOS", "30")
+    )
+
+    # Difusión del chat entre workers (websocket/broker.py): "proceso" (un solo
+    # worker) o "sqlite" (relay por fichero compartido en la misma máquina)
+    CHAT_BROKER: str = os.getenv("CHAT_BROKER", "proceso")
+    CHAT_BROKER_SQLITE_RUTA: str = os.getenv(
+        "CHAT_BROKER_SQLITE_RUTA", "chat_relay.db"
+    )
+    CHAT_BROKER_SONDEO_MS: int = int(os.getenv("CHAT_BROKER_SONDEO_MS", "20"))
+
+    # Persistencia de los mensajes del chat (websocket/persistencia.py):
+    # - "sincrona": commit de cada mensaje antes de difundirlo
+    # - "diferida": id y fecha asignados en el servidor, difusión inmediata e
+    #   INSERT por lotes cada CHAT_LOTE_INTERVALO_MS o CHAT_LOTE_MAX_MENSAJES.
+    #   Los mensajes ya difundidos y aún sin guardar viven solo en memoria: si
+    #   el proceso muere se pierden todos los pendientes, y con la BD caída se
+    #   acumulan hasta CHAT_LOTE_MAX_PENDIENTES y luego se descartan los más
+    #   antiguos. Una fila que la BD rechaza se descarta sola, sin frenar al resto.
+    CHAT_PERSISTENCIA: str = os.getenv("CHAT_PERSISTENCIA", "sincrona")
+    CHAT_LOTE_INTERVALO_MS: int = int(os.getenv("CHAT_LOTE_INTERVALO_MS", "50"))
+    CHAT_LOTE_MAX_MENSAJES: int = int(os.getenv("CHAT_LOTE_MAX_MENSAJES", "200"))
+    CHAT_LOTE_MAX_PENDIENTES: int = int(
+        os.getenv("CHAT_LOTE_MAX_PENDIENTES", "10000")
+    )
+    # Tamaño de los bloques de ids de mensajes (db/secuencias.py), en los dos modos
+    CHAT_BLOQUE_IDS: int = int(os.getenv("CHAT_BLOQUE_IDS", "1000"))
+
+    # Logging (utils/logger.py):
+    # - "cola": las peticiones solo encolan cada registro; un único hilo
+    #   listener formatea, escribe y rota los ficheros
+    # - "sincrono": cada logger escribe y rota en el hilo que registra
+    LOG_MODO: str = os.getenv("LOG_MODO", "cola")
+    # Nivel por defecto y niveles por logger ("permissions=WARNING,tarea_service=DEBUG")
+    LOG_NIVEL: str = os.getenv("LOG_NIVEL", "INFO")
+    LOG_NIVELES: str = os.getenv("LOG_NIVELES", "")
+    # Por debajo de WARNING (avisos y errores siempre pasan):
+    # - muestreo: se registra 1 de cada N ("permissions=20,tarea_service=10")
+    # - límite: como mucho N registros por segundo y logger ("*=200" para todos)
+    LOG_MUESTREO: str = os.getenv("LOG_MUESTREO", "permissions=20")
+    LOG_LIMITE_POR_SEGUNDO: str = os.getenv("LOG_LIMITE_POR_SEGUNDO", "*=200")
+
+    # Modo de arranque (main.lifespan):
+    # - "completo": revisa y aplica las migraciones en cada arranque
+    # - "rapido": compara la huella del esquema guardada y omite el DDL si
+    #   coincide; además abre las conexiones mínimas del pool y precalienta
+    #   las cachés de permisos y catálogos
+    ARRANQUE_MODO: str = os.getenv("ARRANQUE_MODO", "completo")
+
 
 settings = Settings()
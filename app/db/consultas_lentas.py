@@ -0,0 +1,192 @@
+"""
+Registro de consultas por huella (opt-in, settings.SQL_LENTAS_ACTIVO).
+
+Cada sentencia se normaliza a una huella (literales y listas IN colapsados,
+espacios uniformes), y por huella se acumulan ejecuciones, tiempo total,
+máximo, una ventana de las últimas duraciones para el p95 y las funciones
+de la app que la originan (services/... primero). El informe ordena por
+tiempo total y por p95 para ver qué ``select(...)`` domina el tiempo de BD
+con tráfico real.
+
+Lo llama db/instrumentacion.py desde after_cursor_execute, así que mide lo
+mismo que la cabecera Server-Timing. Averiguar el origen recorre la pila en
+cada sentencia: por eso es opcional.
+"""
+
+import hashlib
+import os
+import re
+import sys
+from collections import Counter, deque
+from config.config import settings
+from utils.logger import setup_logger
+
+try:
+    import greenlet
+except ImportError:  # sin greenlet (motor síncrono) basta la pila propia
+    greenlet = None
+
+logger = setup_logger("consultas_lentas")
+
+DIRECTORIO_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRECTORIO_DB = os.path.join(DIRECTORIO_APP, "db") + os.sep
+DIRECTORIO_SERVICIOS = os.path.join(DIRECTORIO_APP, "services") + os.sep
+
+_LITERAL_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_LITERAL_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETRO = re.compile(r"%\(\w+\)s|%s|:\w+|\$\d+|\?")
+_LISTA_IN = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_POSTCOMPILE = re.compile(r"\(?__\[POSTCOMPILE_\w+\]\)?")
+
+
+def normalizar(sentencia: str) -> str:
+    """SQL → forma canónica: sin literales, parámetros como ?, listas IN (?...)."""
+    forma = " ".join(sentencia.split())
+    forma = _LITERAL_TEXTO.sub("?", forma)
+    forma = _POSTCOMPILE.sub("(?...)", forma)
+    forma = _PARAMETRO.sub("?", forma)
+    forma = _LITERAL_NUMERO.sub("?", forma)
+    return _LISTA_IN.sub("(?...)", forma)
+
+
+def _frames(frame):
+    """La pila propia y, bajo AsyncSession, la de los greenlets padre."""
+    actual = greenlet.getcurrent() if greenlet is not None else None
+    while frame is not None:
+        yield frame
+        frame = frame.f_back
+        if frame is None and actual is not None:
+            actual = actual.parent
+            frame = actual.gr_frame if actual is not None else None
+
+
+def origen_de_la_llamada() -> str:
+    """
+    Función de la app que lanzó la sentencia: la primera de services/ o, si
+    no hay, la primera de la app fuera de db/ ("modulo.funcion").
+    """
+    primera = None
+    for frame in _frames(sys._getframe(1)):
+        fichero = frame.f_code.co_filename
+        if not fichero.startswith(DIRECTORIO_APP) or fichero.startswith(DIRECTORIO_DB):
+            continue
+        nombre = f"{os.path.basename(fichero)[:-3]}.{frame.f_code.co_qualname}"
+        if fichero.startswith(DIRECTORIO_SERVICIOS):
+            return nombre
+        primera = primera or nombre
+    return primera or "(desconocido)"
+
+
+class Huella:
+    __slots__ = ("sentencia", "ejecuciones", "total", "maximo", "recientes", "origenes")
+
+    def __init__(self, sentencia: str, muestras: int):
+        self.sentencia = sentencia
+        self.ejecuciones = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.recientes: deque = deque(maxlen=muestras)
+        self.origenes: Counter = Counter()
+
+    def p95(self) -> float:
+        if not self.recientes:
+            return 0.0
+        ordenadas = sorted(self.recientes)
+        return ordenadas[min(int(len(ordenadas) * 0.95), len(ordenadas) - 1)]
+
+    def informe(self, huella: str) -> dict:
+        return {
+            "huella": huella,
+            "sentencia": self.sentencia[:500],
+            "ejecuciones": self.ejecuciones,
+            "tiempo_total_ms": round(self.total * 1000, 3),
+            "media_ms": round(self.total * 1000 / self.ejecuciones, 3),
+            "p95_ms": round(self.p95() * 1000, 3),
+            "max_ms": round(self.maximo * 1000, 3),
+            "origenes": [
+                {"funcion": funcion, "ejecuciones": n}
+                for funcion, n in self.origenes.most_common(3)
+            ],
+        }
+
+
+class RegistroConsultasLentas:
+    def __init__(
+        self,
+        activo: bool = settings.SQL_LENTAS_ACTIVO,
+        umbral_ms: float = settings.SQL_LENTAS_UMBRAL_MS,
+        muestras: int = settings.SQL_LENTAS_MUESTRAS,
+        max_huellas: int = settings.SQL_LENTAS_MAX_HUELLAS,
+    ):
+        self.activo = activo
+        self.umbral = umbral_ms / 1000
+        self.muestras = muestras
+        self.max_huellas = max_huellas
+        # { huella: Huella } y caché texto SQL → huella (las sentencias se repiten)
+        self._huellas: dict[str, Huella] = {}
+        self._normalizadas: dict[str, str] = {}
+        self.descartadas = 0
+
+    def _huella_de(self, sentencia: str) -> str:
+        huella = self._normalizadas.get(sentencia)
+        if huella is None:
+            forma = normalizar(sentencia)
+            huella = hashlib.sha1(forma.encode()).hexdigest()[:12]
+            if len(self._normalizadas) >= self.max_huellas * 4:
+                self._normalizadas.clear()
+            self._normalizadas[sentencia] = huella
+            if huella not in self._huellas:
+                self._nueva(huella, forma)
+        return huella
+
+    def _nueva(self, huella: str, forma: str):
+        if len(self._huellas) >= self.max_huellas:
+            # Se olvida la de menos tiempo acumulado: el top-K no la echará de menos
+            menor = min(self._huellas, key=lambda h: self._huellas[h].total)
+            del self._huellas[menor]
+            self.descartadas += 1
+        self._huellas[huella] = Huella(forma, self.muestras)
+
+    def registrar(self, sentencia: str, segundos: float):
+        huella = self._huella_de(sentencia)
+        datos = self._huellas.get(huella)
+        if datos is None:
+            # Desalojada mientras su texto seguía en la caché
+            self._nueva(huella, normalizar(sentencia))
+            datos = self._huellas[huella]
+        origen = origen_de_la_llamada()
+        datos.ejecuciones += 1
+        datos.total += segundos
+        datos.maximo = max(datos.maximo, segundos)
+        datos.recientes.append(segundos)
+        datos.origenes[origen] += 1
+        if self.umbral > 0 and segundos >= self.umbral:
+            logger.warning(
+                "Consulta lenta (%.1f ms) [%s] desde %s",
+                segundos * 1000,
+                huella,
+                origen,
+            )
+
+    def limpiar(self):
+        self._huellas.clear()
+        self._normalizadas.clear()
+        self.descartadas = 0
+
+    def informe(self, top: int = 20) -> dict:
+        """Top-``top`` huellas por tiempo total y por p95."""
+        items = list(self._huellas.items())
+        por_total = sorted(items, key=lambda i: i[1].total, reverse=True)[:top]
+        por_p95 = sorted(items, key=lambda i: i[1].p95(), reverse=True)[:top]
+        return {
+            "activo": self.activo,
+            "huellas": len(items),
+            "descartadas": self.descartadas,
+            "ejecuciones": sum(d.ejecuciones for _, d in items),
+            "tiempo_total_ms": round(sum(d.total for _, d in items) * 1000, 3),
+            "por_tiempo_total": [d.informe(h) for h, d in por_total],
+            "por_p95": [d.informe(h) for h, d in por_p95],
+        }
+
+
+consultas_lentas = RegistroConsultasLentas()
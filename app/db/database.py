@@ -1,22 +1,233 @@
-
+import asyncio
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base  # ← Añadido declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from config.config import settings
+from utils.metricas import BUCKETS_CORTOS, registro
+
+# Perfiles de motor: tamaño del pool, reciclado, pre-ping, echo y timeout por
+# sentencia (ms, 0 = sin límite). Se elige con settings.DB_PERFIL.
+# pool_min: conexiones que se abren al arrancar (calentar_pool).
+PERFILES_MOTOR = {
+    "dev": {
+        "pool_min": 1,
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "echo": True,
+        "statement_timeout_ms": 0,
+    },
+    "test": {
+        "pool_min": 0,
+        "pool_size": 2,
+        "max_overflow": 0,
+        "pool_timeout": 5,
+        "pool_recycle": -1,
+        "pool_pre_ping": False,
+        "echo": False,
+        "statement_timeout_ms": 5000,
+    },
+    "prod": {
+        "pool_min": 5,
+        "pool_size": 20,
+        "max_overflow": 10,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "echo": False,
+        "statement_timeout_ms": 15000,
+    },
+    "low-memory": {
+        "pool_min": 1,
+        "pool_size": 2,
+        "max_overflow": 2,
+        "pool_timeout": 30,
+        "pool_recycle": 900,
+        "pool_pre_ping": True,
+        "echo": False,
+        "statement_timeout_ms": 15000,
+    },
+}
+
+
+class EstadisticasPool:
+    """Contadores de checkout de un pool (espera acumulada, máxima y timeouts)."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.timeouts = 0
+
+    def registrar_espera(self, segundos: float):
+        self.checkouts += 1
+        self.espera_total += segundos
+        self.espera_max = max(self.espera_max, segundos)
+
+
+# Distribución de la espera en checkout (GET /metrics)
+espera_checkout = registro.histograma(
+    "hometasks_db_pool_espera_checkout_segundos",
+    "Espera para obtener una conexión del pool",
+    buckets=BUCKETS_CORTOS,
+)
+
+
+class PoolInstrumentado(AsyncAdaptedQueuePool):
+    """
+    Pool de SQLAlchemy que mide cuánto espera cada checkout en la cola. Abrir
+    una conexión nueva no cuenta como espera. Cada pool (uno por motor) lleva
+    sus propias estadísticas.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.estadisticas = EstadisticasPool()
+
+    def _create_connection(self):
+        inicio = time.perf_counter()
+        entrada = super()._create_connection()
+        entrada._segundos_apertura = time.perf_counter() - inicio
+        return entrada
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            entrada = super()._do_get()
+        except PoolTimeoutError:
+            self.estadisticas.timeouts += 1
+            raise
+        # Solo la espera en cola: si la conexión es nueva se descuenta su apertura
+        apertura = entrada.__dict__.pop("_segundos_apertura", 0.0)
+        espera = max(time.perf_counter() - inicio - apertura, 0.0)
+        self.estadisticas.registrar_espera(espera)
+        espera_checkout.observar(espera)
+        return entrada
+
+
+def crear_motor(url: str, perfil: str = "dev"):
+    """Crea el motor asíncrono con la configuración del perfil indicado."""
+    if perfil not in PERFILES_MOTOR:
+        raise ValueError(f"Perfil de motor desconocido: {perfil}")
+    config = PERFILES_MOTOR[perfil]
+
+    if url.startswith("sqlite") and ":memory:" in url:
+        # SQLite en memoria usa su propio pool (StaticPool): sin dimensionado
+        return create_async_engine(url, echo=config["echo"])
+
+    opciones = {
+        "echo": config["echo"],
+        "poolclass": PoolInstrumentado,
+        "pool_size": config["pool_size"],
+        "max_overflow": config["max_overflow"],
+        "pool_timeout": config["pool_timeout"],
+        "pool_recycle": config["pool_recycle"],
+        "pool_pre_ping": config["pool_pre_ping"],
+    }
+    timeout_ms = config["statement_timeout_ms"]
+    if timeout_ms and url.startswith("postgresql"):
+        opciones["connect_args"] = {
+            "server_settings": {"statement_timeout": str(timeout_ms)}
+        }
+
+    motor = create_async_engine(url, **opciones)
+
+    if timeout_ms and motor.dialect.name == "mysql":
+
+        @event.listens_for(motor.sync_engine, "connect")
+        def _fijar_timeout_sentencia(dbapi_connection, connection_record):
+            # MySQL solo limita SELECTs con max_execution_time
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"SET SESSION max_execution_time = {int(timeout_ms)}")
+            cursor.close()
+
+    return motor
+
 
 # Motor asíncrono
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+engine = crear_motor(settings.DATABASE_URL, settings.DB_PERFIL)
 
 # Sesión asíncrona
 AsyncSessionLocal = sessionmaker(
-    engine, 
-    class_=AsyncSession, 
+    engine,
+    class_=AsyncSession,
     expire_on_commit=False
 )
 
 
 Base = declarative_base()
 
+
+def estadisticas_pool(motor=None) -> dict:
+    """
+    Estado del pool del motor (por defecto el principal): conexiones prestadas,
+    overflow y tiempos de espera en checkout, para dimensionar el pool con
+    carga real. Los pools sin instrumentar (SQLite en memoria) dan ceros.
+    """
+    pool = (motor or engine).pool
+    estadisticas = getattr(pool, "estadisticas", None) or EstadisticasPool()
+    datos = {
+        "perfil": settings.DB_PERFIL,
+        "pool": type(pool).__name__,
+        "checkouts": estadisticas.checkouts,
+        "espera_total_s": estadisticas.espera_total,
+        "espera_max_s": estadisticas.espera_max,
+        "espera_media_s": (
+            estadisticas.espera_total / estadisticas.checkouts
+            if estadisticas.checkouts
+            else 0.0
+        ),
+        "timeouts": estadisticas.timeouts,
+    }
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        datos.update(
+            {
+                "tamano": pool.size(),
+                "prestadas": pool.checkedout(),
+                "disponibles": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            }
+        )
+    return datos
+
+
+async def calentar_pool(motor=None, minimo: int | None = None) -> int:
+    """
+    Abre a la vez ``minimo`` conexiones (por defecto pool_min del perfil) y las
+    devuelve al pool, para que las primeras peticiones no paguen el connect.
+    Devuelve cuántas se abrieron.
+    """
+    motor = motor or engine
+    if not isinstance(motor.pool, AsyncAdaptedQueuePool):
+        return 0
+    if minimo is None:
+        minimo = PERFILES_MOTOR[settings.DB_PERFIL]["pool_min"]
+    minimo = min(minimo, motor.pool.size())
+    if minimo <= 0:
+        return 0
+
+    resultados = await asyncio.gather(
+        *(motor.connect().start() for _ in range(minimo)), return_exceptions=True
+    )
+    conexiones = [r for r in resultados if not isinstance(r, BaseException)]
+    try:
+        for conn in conexiones:
+            await conn.exec_driver_sql("SELECT 1")
+    finally:
+        for conn in conexiones:
+            await conn.close()
+    errores = [r for r in resultados if isinstance(r, BaseException)]
+    if errores:
+        raise errores[0]
+    return len(conexiones)
+
+
 # Dependencia para FastAPI
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
@@ -0,0 +1,180 @@
+"""
+Medición del SQL de cada petición HTTP: cuántas sentencias ejecuta, cuánto
+tiempo pasa en la BD y qué sentencias se repiten (posibles N+1).
+
+- instrumentar_motor() engancha before/after_cursor_execute al motor.
+- MedicionSQLMiddleware abre una MedicionSQL por petición (ContextVar, así
+  que cada petición async solo ve sus sentencias), añade la cabecera
+  ``Server-Timing`` y acumula por plantilla de ruta en estadisticas_sql.
+
+Una misma forma de sentencia (el SQL con parámetros, sin valores) ejecutada
+más de settings.SQL_N_MAS_1_UMBRAL veces en una petición se registra como
+posible N+1 con la ruta. Si settings.SQL_LENTAS_ACTIVO, cada sentencia se
+pasa además a db/consultas_lentas.py (top por huella, con su origen).
+"""
+
+import time
+from collections import Counter
+from contextvars import ContextVar
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from config.config import settings
+from db.consultas_lentas import consultas_lentas
+from utils.logger import setup_logger
+
+logger = setup_logger("sql")
+
+
+class MedicionSQL:
+    """Sentencias y tiempo de BD de una petición."""
+
+    __slots__ = ("consultas", "tiempo", "formas")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo = 0.0
+        # { sentencia: ejecuciones } (el texto ya viene parametrizado)
+        self.formas: Counter = Counter()
+
+    def registrar(self, sentencia: str, segundos: float):
+        self.consultas += 1
+        self.tiempo += segundos
+        self.formas[sentencia] += 1
+
+    def repetidas(self, umbral: int) -> list[tuple[str, int]]:
+        return [(s, n) for s, n in self.formas.items() if n > umbral]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.tiempo * 1000:.2f};desc="{self.consultas} consultas"'
+
+
+_medicion_actual: ContextVar[MedicionSQL | None] = ContextVar(
+    "medicion_sql", default=None
+)
+
+
+def medicion_actual() -> MedicionSQL | None:
+    """Medición de la petición en curso (None fuera de una petición HTTP)."""
+    return _medicion_actual.get()
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._inicio_sql = time.perf_counter()
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, "_inicio_sql", None)
+    if inicio is None:
+        return
+    segundos = time.perf_counter() - inicio
+    medicion = _medicion_actual.get()
+    if medicion is not None:
+        medicion.registrar(statement, segundos)
+    # También fuera de peticiones HTTP (WebSocket, tareas de fondo)
+    if consultas_lentas.activo:
+        consultas_lentas.registrar(statement, segundos)
+
+
+def instrumentar_motor(motor):
+    """Engancha la medición al motor (idempotente)."""
+    sync_engine = motor.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _antes_de_ejecutar):
+        event.listen(sync_engine, "before_cursor_execute", _antes_de_ejecutar)
+        event.listen(sync_engine, "after_cursor_execute", _despues_de_ejecutar)
+
+
+class EstadisticasRuta:
+    __slots__ = ("peticiones", "consultas", "tiempo", "max_consultas", "n_mas_1")
+
+    def __init__(self):
+        self.peticiones = 0
+        self.consultas = 0
+        self.tiempo = 0.0
+        self.max_consultas = 0
+        self.n_mas_1 = 0
+
+
+class EstadisticasSQL:
+    """Acumulados por plantilla de ruta ("GET /tareas/{tarea_id}")."""
+
+    def __init__(self):
+        self._rutas: dict[str, EstadisticasRuta] = {}
+
+    def registrar(self, ruta: str, medicion: MedicionSQL, n_mas_1: int):
+        datos = self._rutas.get(ruta)
+        if datos is None:
+            datos = self._rutas[ruta] = EstadisticasRuta()
+        datos.peticiones += 1
+        datos.consultas += medicion.consultas
+        datos.tiempo += medicion.tiempo
+        datos.max_consultas = max(datos.max_consultas, medicion.consultas)
+        datos.n_mas_1 += n_mas_1
+
+    def limpiar(self):
+        self._rutas.clear()
+
+    def metricas(self) -> dict:
+        return {
+            ruta: {
+                "peticiones": d.peticiones,
+                "consultas": d.consultas,
+                "consultas_media": d.consultas / d.peticiones,
+                "consultas_max": d.max_consultas,
+                "tiempo_total_s": d.tiempo,
+                "tiempo_medio_ms": d.tiempo * 1000 / d.peticiones,
+                "n_mas_1": d.n_mas_1,
+            }
+            for ruta, d in self._rutas.items()
+        }
+
+
+estadisticas_sql = EstadisticasSQL()
+
+
+def plantilla_ruta(scope) -> str:
+    """
+    "MÉTODO /plantilla" de la ruta que atendió la petición; las que no
+    casaron con ninguna se agrupan para no crear una entrada por URL.
+    """
+    ruta = scope.get("route")
+    plantilla = getattr(ruta, "path", None) or "(sin ruta)"
+    return f"{scope.get('method', '')} {plantilla}"
+
+
+class MedicionSQLMiddleware:
+    """Middleware ASGI: mide el SQL de cada petición HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicion = MedicionSQL()
+        token = _medicion_actual.set(medicion)
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                # Lo ejecutado hasta que sale la respuesta
+                MutableHeaders(scope=mensaje).append(
+                    "Server-Timing", medicion.server_timing()
+                )
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicion_actual.reset(token)
+            ruta = plantilla_ruta(scope)
+            repetidas = medicion.repetidas(settings.SQL_N_MAS_1_UMBRAL)
+            for sentencia, veces in repetidas:
+                logger.warning(
+                    "Posible N+1 en %s: %s ejecuciones de %s",
+                    ruta,
+                    veces,
+                    " ".join(sentencia.split())[:300],
+                )
+            estadisticas_sql.registrar(ruta, medicion, len(repetidas))
@@ -0,0 +1,260 @@
+"""
+Migraciones versionadas del esquema.
+
+Cada migración es (versión, descripción, función síncrona que recibe la
+conexión). Las aplicadas se registran en la tabla ``schema_version``.
+Se ejecutan desde main.lifespan con ``conn.run_sync(aplicar_migraciones)``.
+
+- BD vacía: se crea el esquema actual con create_all y se marcan todas las
+  versiones como aplicadas.
+- BD existente: se aplican en orden solo las versiones pendientes.
+
+Tras migrar se guarda la huella del esquema (tablas, columnas e índices de
+Base.metadata más la última versión). En el arranque rápido basta con leerla
+y compararla (``esquema_al_dia``) para omitir todo el DDL y la reflexión.
+"""
+
+import hashlib
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+    inspect,
+    insert,
+    delete,
+    select,
+)
+from sqlalchemy.exc import DBAPIError
+from db.database import Base
+
+# Importar todos los modelos para que Base.metadata esté completo
+from models import (  # noqa: F401
+    atributo,
+    atributo_miembro,
+    comentario_tarea,
+    evento,
+    hogar,
+    mensaje,
+    miembro,
+    modulo,
+    notificacion,
+    permiso,
+    rol,
+    secuencia,
+    tarea,
+    token_revocado,
+)
+from utils.logger import setup_logger
+
+logger = setup_logger("migraciones")
+
+_metadata_versiones = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    _metadata_versiones,
+    Column("version", Integer, primary_key=True),
+    Column("descripcion", String(200), nullable=False),
+    Column("aplicada_en", DateTime, server_default=func.now()),
+)
+
+schema_huella = Table(
+    "schema_huella",
+    _metadata_versiones,
+    Column("clave", String(50), primary_key=True),
+    Column("huella", String(64), nullable=False),
+    Column("registrada_en", DateTime, server_default=func.now()),
+)
+
+_CLAVE_HUELLA = "esquema"
+
+
+def _crear_indices(conn, nombres_por_tabla: dict[str, list[str]]):
+    for nombre_tabla, nombres in nombres_por_tabla.items():
+        tabla = Base.metadata.tables[nombre_tabla]
+        for indice in tabla.indexes:
+            if indice.name in nombres:
+                indice.create(conn, checkfirst=True)
+                logger.info(f"Índice {indice.name} verificado en {nombre_tabla}")
+
+
+def _eliminar_indice(conn, nombre_tabla: str, nombre: str):
+    existentes = {i["name"] for i in inspect(conn).get_indexes(nombre_tabla)}
+    if nombre not in existentes:
+        return
+    if conn.dialect.name == "mysql":
+        conn.exec_driver_sql(f"DROP INDEX {nombre} ON {nombre_tabla}")
+    else:
+        conn.exec_driver_sql(f"DROP INDEX {nombre}")
+    logger.info(f"Índice {nombre} eliminado de {nombre_tabla}")
+
+
+def _m001_esquema_base(conn):
+    # Esquema previo a las migraciones: crea solo las tablas que falten
+    Base.metadata.create_all(conn)
+
+
+def _m002_indices_consultas_calientes(conn):
+    # Los índices únicos fallan si ya hay duplicados: limpiar antes de migrar
+    _crear_indices(
+        conn,
+        {
+            "tareas": [
+                "ix_tareas_asignado_a_estado",
+                "ix_tareas_hogar_categoria_estado",
+                "ix_tareas_id_sesion_mensaje",
+                "ix_tareas_evento_estado",
+            ],
+            "mensajes": ["ix_mensajes_hogar_estado_fecha"],
+            "miembros": ["ix_miembros_hogar_estado", "ix_miembros_rol_estado"],
+            "eventos": ["ix_eventos_hogar_estado"],
+            "notificaciones": ["ix_notificaciones_destino_leido"],
+            "atributo_miembro": ["ux_atributo_miembro_miembro_atributo"],
+            "permisos": ["ux_permisos_rol_modulo"],
+        },
+    )
+
+
+def _m003_indices_paginacion_tareas(conn):
+    _crear_indices(
+        conn,
+        {
+            "tareas": [
+                "ix_tareas_asignado_estado_fecha_limite",
+                "ix_tareas_asignado_estado_fecha_creacion",
+            ]
+        },
+    )
+
+
+def _m004_indice_keyset_mensajes(conn):
+    # Sustituye ix_mensajes_hogar_estado_fecha por la versión con id
+    _crear_indices(conn, {"mensajes": ["ix_mensajes_hogar_estado_fecha_id"]})
+    _eliminar_indice(conn, "mensajes", "ix_mensajes_hogar_estado_fecha")
+
+
+def _m005_secuencias(conn):
+    Base.metadata.tables["secuencias"].create(conn, checkfirst=True)
+
+
+def _m006_tokens_revocados(conn):
+    Base.metadata.tables["tokens_revocados"].create(conn, checkfirst=True)
+
+
+MIGRACIONES = [
+    (1, "Esquema base", _m001_esquema_base),
+    (
+        2,
+        "Índices compuestos para las consultas calientes",
+        _m002_indices_consultas_calientes,
+    ),
+    (
+        3,
+        "Índices de keyset para el listado paginado de tareas",
+        _m003_indices_paginacion_tareas,
+    ),
+    (
+        4,
+        "Keyset (fecha_envio, id) de mensajes",
+        _m004_indice_keyset_mensajes,
+    ),
+    (
+        5,
+        "Tabla secuencias para ids asignados por la aplicación (chat diferido)",
+        _m005_secuencias,
+    ),
+    (
+        6,
+        "Tabla tokens_revocados para refresh tokens de un solo uso",
+        _m006_tokens_revocados,
+    ),
+]
+
+
+def version_actual(conn) -> int:
+    if not inspect(conn).has_table("schema_version"):
+        return 0
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def aplicar_migraciones(conn) -> list[int]:
+    """Aplica las migraciones pendientes y devuelve las versiones aplicadas."""
+    tablas_existentes = set(inspect(conn).get_table_names())
+    schema_version.create(conn, checkfirst=True)
+    aplicadas = set(conn.execute(select(schema_version.c.version)).scalars())
+
+    if not tablas_existentes & set(Base.metadata.tables):
+        # BD nueva: el esquema actual ya incluye todas las migraciones
+        logger.info("BD vacía: creando esquema actual")
+        Base.metadata.create_all(conn)
+        pendientes = [m for m in MIGRACIONES if m[0] not in aplicadas]
+        for version, descripcion, _ in pendientes:
+            conn.execute(
+                insert(schema_version).values(version=version, descripcion=descripcion)
+            )
+        guardar_huella(conn, huella_esquema())
+        return [version for version, _, _ in pendientes]
+
+    nuevas = []
+    for version, descripcion, funcion in MIGRACIONES:
+        if version in aplicadas:
+            continue
+        logger.info(f"Aplicando migración {version}: {descripcion}")
+        funcion(conn)
+        conn.execute(
+            insert(schema_version).values(version=version, descripcion=descripcion)
+        )
+        nuevas.append(version)
+
+    if nuevas:
+        logger.info(f"Migraciones aplicadas: {nuevas}")
+    else:
+        logger.info("Esquema al día, no hay migraciones pendientes")
+    guardar_huella(conn, huella_esquema())
+    return nuevas
+
+
+def huella_esquema() -> str:
+    """Huella estable del esquema declarado en los modelos y las migraciones."""
+    partes = [f"version={MIGRACIONES[-1][0]}"]
+    for nombre in sorted(Base.metadata.tables):
+        tabla = Base.metadata.tables[nombre]
+        for col in tabla.columns:
+            partes.append(
+                f"{nombre}.{col.name}:{col.type!r}:{col.nullable}:{col.primary_key}"
+            )
+        for indice in sorted(tabla.indexes, key=lambda i: i.name):
+            columnas = ",".join(c.name for c in indice.columns)
+            partes.append(f"{nombre}#{indice.name}({columnas}):{indice.unique}")
+    return hashlib.sha256("\n".join(partes).encode()).hexdigest()
+
+
+def leer_huella(conn) -> str | None:
+    """Huella guardada, o None si la tabla aún no existe (BD anterior)."""
+    try:
+        return conn.execute(
+            select(schema_huella.c.huella).where(
+                schema_huella.c.clave == _CLAVE_HUELLA
+            )
+        ).scalar()
+    except DBAPIError:
+        return None
+
+
+def guardar_huella(conn, huella: str):
+    schema_huella.create(conn, checkfirst=True)
+    conn.execute(delete(schema_huella).where(schema_huella.c.clave == _CLAVE_HUELLA))
+    conn.execute(insert(schema_huella).values(clave=_CLAVE_HUELLA, huella=huella))
+
+
+def esquema_al_dia(conn) -> bool:
+    """
+    Una sola consulta, sin reflexión: True si la huella guardada coincide con
+    la del código. Usar en su propia conexión: si la tabla no existe el error
+    aborta la transacción en algunos motores.
+    """
+    return leer_huella(conn) == huella_esquema()
@@ -0,0 +1,90 @@
+"""
+Ids asignados por la aplicación a partir de bloques reservados (hi/lo).
+
+Cada AsignadorIds reserva un bloque en la tabla ``secuencias`` con una
+transacción corta y luego reparte ids en memoria. Si una tabla usa estos ids,
+TODAS sus inserciones deben sacarlos de un asignador: un INSERT con el
+autoincremento de la BD puede tomar un id de un bloque ya reservado por otro
+worker. Para ``mensajes`` se usa ids_mensajes().
+"""
+
+import asyncio
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from config.config import settings
+from models.mensaje import Mensaje
+from models.secuencia import Secuencia
+from utils.logger import setup_logger
+
+logger = setup_logger("secuencias")
+
+
+class AsignadorIds:
+    """Reparte ids de un bloque reservado; pide otro bloque al agotarlo."""
+
+    def __init__(
+        self, fabrica_sesiones, nombre: str, tamano_bloque: int, columna=Mensaje.id
+    ):
+        self.fabrica_sesiones = fabrica_sesiones
+        self.nombre = nombre
+        self.tamano_bloque = tamano_bloque
+        self.columna = columna
+        self._siguiente = 0
+        self._limite = 0
+        self._cerrojo = asyncio.Lock()
+
+    async def _reservar_bloque(self):
+        for _ in range(2):
+            async with self.fabrica_sesiones() as db:
+                try:
+                    fila = await db.get(Secuencia, self.nombre, with_for_update=True)
+                    # Siempre por encima de los ids existentes: una fila que
+                    # entrase sin asignador (datos importados, SQL a mano) no
+                    # acaba dentro de un bloque
+                    maximo = await db.scalar(select(func.max(self.columna)))
+                    if fila is None:
+                        fila = Secuencia(nombre=self.nombre, siguiente=1)
+                        db.add(fila)
+                        await db.flush()
+                    inicio = max(fila.siguiente, (maximo or 0) + 1)
+                    fila.siguiente = inicio + self.tamano_bloque
+                    await db.commit()
+                except IntegrityError:
+                    # Otro worker creó la secuencia a la vez: reintentar
+                    await db.rollback()
+                    continue
+            self._siguiente, self._limite = inicio, inicio + self.tamano_bloque
+            logger.info(f"Bloque de ids reservado para {self.nombre}: {inicio}+")
+            return
+        raise RuntimeError(f"No se pudo reservar un bloque de ids para {self.nombre}")
+
+    async def siguiente(self) -> int:
+        if self._siguiente >= self._limite:
+            async with self._cerrojo:
+                if self._siguiente >= self._limite:
+                    await self._reservar_bloque()
+        valor = self._siguiente
+        self._siguiente += 1
+        return valor
+
+
+# Un asignador de mensajes por motor en cada proceso
+_asignadores_mensajes: dict = {}
+
+
+def ids_mensajes(motor, tamano_bloque: int = settings.CHAT_BLOQUE_IDS) -> AsignadorIds:
+    """
+    Asignador de ids de ``mensajes`` para el motor (AsyncEngine) indicado.
+    Lo comparten el chat y el servicio de mensajes; ``tamano_bloque`` solo
+    cuenta la primera vez que se pide para ese motor.
+    """
+    asignador = _asignadores_mensajes.get(motor)
+    if asignador is None:
+        fabrica = sessionmaker(motor, class_=AsyncSession, expire_on_commit=False)
+        asignador = _asignadores_mensajes[motor] = AsignadorIds(
+            fabrica, "mensajes", tamano_bloque
+        )
+    return asignador
@@ -2,8 +2,12 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 # from fastapi.security import OAuth2PasswordBearer
-from db.database import engine, Base
+import time
+from db.database import engine, AsyncSessionLocal, calentar_pool
+from db.instrumentacion import MedicionSQLMiddleware, instrumentar_motor
+from db.migraciones import aplicar_migraciones, esquema_al_dia
 from contextlib import asynccontextmanager
+from config.config import settings
 
 # from sqlalchemy.ext.asyncio import AsyncEngine
 # from models.hogar import Hogar
@@ -24,23 +28,90 @@ from routes import (
     modulo_routes,
     atributo_routes,
     miembro_routes,
+    metricas_routes,
 )
 
 from utils.logger import setup_logger
+from utils.hashing import servicio_hash
+from utils.contexto import ContextoPeticionMiddleware
+from utils.metricas import MetricasHTTPMiddleware
+from services.permiso_service import matriz_permisos
+from services.atributo_service import precargar_catalogos
+from websocket.chat import chat_websocket
+from websocket.chat_manager import manager as chat_manager
+from websocket.persistencia import persistencia as chat_persistencia
 
 logger = setup_logger("main")
 
 
+async def _preparar_esquema(rapido: bool):
+    if rapido:
+        # Una sola consulta: si la huella coincide no hace falta DDL ni reflexión
+        async with engine.connect() as conn:
+            if await conn.run_sync(esquema_al_dia):
+                logger.info("Huella del esquema al día, se omite el DDL")
+                return
+        logger.info("Huella del esquema distinta o ausente, aplicando migraciones")
+
+    # Aplica las migraciones versionadas pendientes (db/migraciones.py)
+    async with engine.begin() as conn:
+        logger.info("Verificando migraciones de la base de datos...")
+        await conn.run_sync(aplicar_migraciones)
+        logger.info("Esquema de base de datos al día")
+
+
+async def arrancar(app: FastAPI):
+    """
+    Pasos de arranque cronometrados. El desglose (ms por fase) se deja en
+    app.state.arranque y en el log para detectar regresiones de arranque en frío.
+    """
+    rapido = settings.ARRANQUE_MODO == "rapido"
+    tiempos = {}
+    inicio = time.perf_counter()
+
+    t = time.perf_counter()
+    await _preparar_esquema(rapido)
+    tiempos["esquema"] = time.perf_counter() - t
+
+    if rapido:
+        t = time.perf_counter()
+        abiertas = await calentar_pool()
+        tiempos["pool"] = time.perf_counter() - t
+        logger.info(f"Pool precalentado con {abiertas} conexiones")
+
+    # Precargar la matriz de permisos para no pagarla en la primera petición
+    t = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        await matriz_permisos.recargar(db)
+    tiempos["permisos"] = time.perf_counter() - t
+
+    if rapido:
+        t = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            await precargar_catalogos(db)
+        tiempos["catalogos"] = time.perf_counter() - t
+
+    # Suscripción al broker del chat para recibir lo publicado por otros workers
+    t = time.perf_counter()
+    await chat_manager.iniciar()
+    await chat_persistencia.iniciar()
+    tiempos["chat"] = time.perf_counter() - t
+
+    tiempos["total"] = time.perf_counter() - inicio
+    app.state.arranque = {
+        "modo": settings.ARRANQUE_MODO,
+        **{fase: round(s * 1000, 2) for fase, s in tiempos.items()},
+    }
+    desglose = ", ".join(f"{fase}={ms}ms" for fase, ms in app.state.arranque.items())
+    logger.info(f"Arranque completado: {desglose}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Iniciar la app
     try:
         logger.info("Iniciando la aplicación...")
-        # Crea todas las tablas en la base de datos
-        async with engine.begin() as conn:
-            logger.info("Creando tablas en la base de datos...")
-            await conn.run_sync(Base.metadata.create_all)
-            logger.info("Tablas creadas exitosamente")
+        await arrancar(app)
     except Exception as e:
         logger.error(f"Error durante el inicio de la aplicación: {str(e)}")
         raise
@@ -49,6 +120,10 @@ async def lifespan(app: FastAPI):
 
     # Shutdown: Código de limpieza (si es necesario)
     logger.info("Cerrando la aplicación...")
+    await chat_manager.cerrar()
+    # Vacía los mensajes pendientes del modo diferido antes de salir
+    await chat_persistencia.cerrar()
+    servicio_hash.cerrar()
 
 
 app = FastAPI(
@@ -80,8 +155,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cursor de paginación de /tareas/mias/, legible desde el navegador
+    expose_headers=["X-Siguiente-Cursor"],
 )
 
+# Sentencias y tiempo de BD por petición (Server-Timing, /metricas/sql, N+1).
+# Va por dentro del contexto para que sus avisos lleven el request_id.
+instrumentar_motor(engine)
+app.add_middleware(MedicionSQLMiddleware)
+
+# Contexto por petición (identidad resuelta una vez, request_id para logs)
+app.add_middleware(ContextoPeticionMiddleware)
+
+# Latencia y código de estado por plantilla de ruta (GET /metrics). Es el más
+# externo: mide la petición completa, middlewares incluidos
+app.add_middleware(MetricasHTTPMiddleware)
+
 # Registrar rutas
 app.include_router(permiso_routes.router)
 app.include_router(tarea_routes.router)
@@ -92,6 +181,11 @@ app.include_router(evento_routes.router)
 app.include_router(modulo_routes.router)
 app.include_router(atributo_routes.router)
 app.include_router(miembro_routes.router)
+app.include_router(metricas_routes.router)
+app.include_router(metricas_routes.router_prometheus)
+
+# Chat en tiempo real por hogar: ws://.../ws/chat?token=<access token>
+app.add_api_websocket_route("/ws/chat", chat_websocket)
 
 
 @app.get("/")
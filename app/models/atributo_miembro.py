@@ -1,9 +1,17 @@
-from sqlalchemy import Column, Integer, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, Text, Boolean, ForeignKey, Index
 from db.database import Base
 
 
 class AtributoMiembro(Base):
     __tablename__ = "atributo_miembro"
+    __table_args__ = (
+        Index(
+            "ux_atributo_miembro_miembro_atributo",
+            "id_miembro",
+            "id_atributo",
+            unique=True,
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     id_miembro = Column(
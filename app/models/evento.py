@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Integer as IntCol, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Integer as IntCol, Boolean, ForeignKey, Index
 from db.database import Base
 
 class Evento(Base):
     __tablename__ = "eventos"
+    __table_args__ = (Index("ix_eventos_hogar_estado", "id_hogar", "estado"),)
     
     id = Column(Integer, primary_key=True, index=True)
     titulo = Column(String(100), nullable=False)
@@ -1,12 +1,31 @@
 # models/mensaje.py
 from sqlalchemy.orm import relationship
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DATETIME, Text
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    ForeignKey,
+    Boolean,
+    DATETIME,
+    Text,
+    Index,
+)
 from db.database import Base
 from sqlalchemy.sql import func  # Para los defaults de fecha
 
 
 class Mensaje(Base):
     __tablename__ = "mensajes"
+    __table_args__ = (
+        # Keyset del historial (fecha_envio, id), del más reciente al más antiguo
+        Index(
+            "ix_mensajes_hogar_estado_fecha_id",
+            "id_hogar",
+            "estado",
+            "fecha_envio",
+            "id",
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
 
@@ -1,10 +1,23 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, func
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    ForeignKey,
+    Boolean,
+    DateTime,
+    Index,
+    func,
+)
 from sqlalchemy.orm import relationship
 from db.database import Base
 
 
 class Miembro(Base):
     __tablename__ = "miembros"
+    __table_args__ = (
+        Index("ix_miembros_hogar_estado", "id_hogar", "estado"),
+        Index("ix_miembros_rol_estado", "id_rol", "estado"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nombre_completo = Column(String(100), nullable=False)
@@ -1,5 +1,14 @@
 # models/notificacion.py
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DATETIME, Text
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    ForeignKey,
+    Boolean,
+    DATETIME,
+    Text,
+    Index,
+)
 from sqlalchemy.orm import relationship
 from db.database import Base
 from sqlalchemy.sql import func
@@ -7,6 +16,9 @@ from sqlalchemy.sql import func
 
 class Notificacion(Base):
     __tablename__ = "notificaciones"
+    __table_args__ = (
+        Index("ix_notificaciones_destino_leido", "id_miembro_destino", "leido"),
+    )
 
     id = Column(Integer, primary_key=True)
     id_miembro_destino = Column(
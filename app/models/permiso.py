@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, Boolean, ForeignKey, Index
 from db.database import Base
 
 class Permiso(Base):
     __tablename__ = "permisos"
+    __table_args__ = (
+        Index("ux_permisos_rol_modulo", "id_rol", "id_modulo", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
     id_rol = Column(Integer, ForeignKey("roles.id", ondelete="CASCADE"), nullable=False)
     id_modulo = Column(Integer, ForeignKey("modulos.id", ondelete="CASCADE"), nullable=False)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, BigInteger
+from db.database import Base
+
+
+class Secuencia(Base):
+    """
+    Contador para reservar bloques de ids desde la aplicación (hi/lo): cada
+    worker reserva un bloque con una transacción y luego asigna ids en memoria.
+    """
+
+    __tablename__ = "secuencias"
+    nombre = Column(String(50), primary_key=True)
+    siguiente = Column(BigInteger, nullable=False)
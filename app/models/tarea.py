@@ -8,6 +8,7 @@ from sqlalchemy import (
     Boolean,
     ForeignKey,
     DateTime,
+    Index,
     func,
 )
 from db.database import Base
@@ -15,6 +16,27 @@ from db.database import Base
 
 class Tarea(Base):
     __tablename__ = "tareas"
+    __table_args__ = (
+        Index("ix_tareas_asignado_a_estado", "asignado_a", "estado"),
+        Index("ix_tareas_hogar_categoria_estado", "id_hogar", "categoria", "estado"),
+        Index("ix_tareas_id_sesion_mensaje", "id_sesion_mensaje"),
+        Index("ix_tareas_evento_estado", "id_evento", "estado"),
+        # Keyset de /tareas/mias/ (orden, id): la página sale del índice ya ordenada
+        Index(
+            "ix_tareas_asignado_estado_fecha_limite",
+            "asignado_a",
+            "estado",
+            "fecha_limite",
+            "id",
+        ),
+        Index(
+            "ix_tareas_asignado_estado_fecha_creacion",
+            "asignado_a",
+            "estado",
+            "fecha_creacion",
+            "id",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     titulo = Column(String(100), nullable=False)
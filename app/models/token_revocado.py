@@ -0,0 +1,13 @@
+from sqlalchemy import Column, DateTime, String
+from db.database import Base
+
+
+class TokenRevocado(Base):
+    """
+    jti de un refresh token ya canjeado. Se guarda hasta que el token caduca
+    para que no se pueda canjear otra vez.
+    """
+
+    __tablename__ = "tokens_revocados"
+    jti = Column(String(36), primary_key=True)
+    expira = Column(DateTime, nullable=False, index=True)
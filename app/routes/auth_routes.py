@@ -6,12 +6,14 @@ from sqlalchemy.orm import selectinload
 from utils.logger import setup_logger
 from db.database import get_db
 from models.miembro import Miembro
-from schemas.auth import MiembroLogin, MiembroRegistro, Token
+from schemas.auth import MiembroLogin, MiembroRegistro, Token, RefreshTokenRequest
 from services.auth_service import (
     autenticar_miembro,
     crear_miembro,
-    crear_token_para_miembro,
+    crear_tokens_para_miembro,
+    refrescar_sesion,
 )
+from utils.hashing import ServicioHashSaturado, error_servicio_saturado
 
 logger = setup_logger("auth_routes")
 
@@ -36,9 +38,12 @@ async def registrar_miembro(datos: MiembroRegistro, db: AsyncSession = Depends(g
         )
 
         # 3. Crear y devolver el token
-        token = crear_token_para_miembro(miembro)
+        token, refresh_token = await crear_tokens_para_miembro(db, miembro)
         return Token(
-            access_token=token, id_miembro=miembro.id, id_hogar=miembro.id_hogar
+            access_token=token,
+            refresh_token=refresh_token,
+            id_miembro=miembro.id,
+            id_hogar=miembro.id_hogar,
         )
 
     except ValueError as e:
@@ -46,6 +51,10 @@ async def registrar_miembro(datos: MiembroRegistro, db: AsyncSession = Depends(g
         await db.rollback()
         logger.warning(f"Error de validación al registrar miembro: {str(e)}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ServicioHashSaturado as e:
+        await db.rollback()
+        logger.warning("Registro rechazado por saturación del pool de hashing")
+        raise error_servicio_saturado(e)
     except Exception as e:
         # Error inesperado del servidor
         await db.rollback()
@@ -59,34 +68,71 @@ async def registrar_miembro(datos: MiembroRegistro, db: AsyncSession = Depends(g
 @router.post("/login", response_model=Token)
 async def login(datos: MiembroLogin, db: AsyncSession = Depends(get_db)):
 
-    miembro = await autenticar_miembro(db, datos.correo_electronico, datos.contrasena)
+    try:
+        miembro = await autenticar_miembro(
+            db, datos.correo_electronico, datos.contrasena
+        )
+    except ServicioHashSaturado as e:
+        raise error_servicio_saturado(e)
     if not miembro:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Correo o contraseña incorrectas",
         )
 
-    access_token = crear_token_para_miembro(miembro)
+    access_token, refresh_token = await crear_tokens_para_miembro(db, miembro)
     return Token(
         access_token=access_token,
+        refresh_token=refresh_token,
         rol=miembro.rol,
         id_miembro=miembro.id,
         id_hogar=miembro.id_hogar,
     )
 
 
+@router.post("/refresh", response_model=Token)
+async def refrescar_token(
+    datos: RefreshTokenRequest, db: AsyncSession = Depends(get_db)
+):
+    """
+    Canjea un refresh token por un access token nuevo (y rota el refresh).
+    Vuelve a comprobar en BD que el miembro siga activo.
+    """
+    miembro = await refrescar_sesion(db, datos.refresh_token)
+    if not miembro:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token inválido o expirado",
+        )
+    # El refresh canjeado queda revocado antes de emitir el nuevo
+    await db.commit()
+
+    access_token, refresh_token = await crear_tokens_para_miembro(db, miembro)
+    return Token(
+        access_token=access_token,
+        refresh_token=refresh_token,
+        id_miembro=miembro.id,
+        id_hogar=miembro.id_hogar,
+    )
+
+
 # Nueva ruta SOLO para Swagger UI (no la uses en producción)
 @router.post("/login-swagger", response_model=Token, include_in_schema=False)
 async def login_swagger(
     form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)
 ):
     # Mapea username → correo_electronico, password → contrasena
-    miembro = await autenticar_miembro(db, form_data.username, form_data.password)
+    try:
+        miembro = await autenticar_miembro(db, form_data.username, form_data.password)
+    except ServicioHashSaturado as e:
+        raise error_servicio_saturado(e)
     if not miembro:
         raise HTTPException(status_code=401, detail="Credenciales incorrectas")
-    access_token = crear_token_para_miembro(miembro)
+    access_token, refresh_token = await crear_tokens_para_miembro(db, miembro)
     return Token(
         access_token=access_token,
+        refresh_token=refresh_token,
         rol=miembro.rol,
         id_miembro=miembro.id,
         id_hogar=miembro.id_hogar,
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.database import get_db
 from models.miembro import Miembro
 from services.mensaje_service import obtener_mensajes_por_hogar
+from websocket.chat import obtener_mensajes_recientes, obtener_presencia_hogar
 from utils.auth import obtener_miembro_actual
-from schemas.mensaje import MensajeResponse
+from schemas.mensaje import MensajeResponse, PresenciaMiembro
 
 router = APIRouter(prefix="/mensajes", tags=["Mensajes"])
 
@@ -12,11 +14,36 @@ router = APIRouter(prefix="/mensajes", tags=["Mensajes"])
 @router.get("/hogar/{hogar_id}", response_model=list[MensajeResponse])
 async def listar_mensajes(
     hogar_id: int,
+    antes: Optional[int] = Query(None, description="Mensajes anteriores a este id"),
+    despues: Optional[int] = Query(
+        None, description="Mensajes posteriores a este id"
+    ),
+    limite: Optional[int] = Query(
+        None, ge=1, description="Tamaño de página (se recorta al máximo configurado)"
+    ),
     db: AsyncSession = Depends(get_db),
     current_user: Miembro = Depends(obtener_miembro_actual),
 ):
     if current_user.id_hogar != hogar_id:
         raise HTTPException(status_code=403, detail="No perteneces a este hogar")
 
-    mensajes = await obtener_mensajes_por_hogar(db, hogar_id)
+    try:
+        if antes is None and despues is None:
+            # Primera página: desde el búfer del chat si está disponible
+            return await obtener_mensajes_recientes(db, hogar_id, limite=limite)
+        mensajes = await obtener_mensajes_por_hogar(
+            db, hogar_id, antes=antes, despues=despues, limite=limite
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return mensajes
+
+
+@router.get("/hogar/{hogar_id}/presencia", response_model=list[PresenciaMiembro])
+async def presencia_hogar(
+    hogar_id: int,
+    current_user: Miembro = Depends(obtener_miembro_actual),
+):
+    if current_user.id_hogar != hogar_id:
+        raise HTTPException(status_code=403, detail="No perteneces a este hogar")
+    return obtener_presencia_hogar(hogar_id)
@@ -0,0 +1,285 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from config.config import settings
+from db.consultas_lentas import consultas_lentas
+from db.database import estadisticas_pool
+from db.instrumentacion import estadisticas_sql
+from services.atributo_service import cache_catalogos
+from services.mensaje_service import cache_sesiones_tarea
+from utils.auth import cache_principales
+from utils.hashing import servicio_hash
+from schemas.logs import ConfiguracionLogs
+from utils.logger import actualizar_config_logs, metricas_logs
+from utils.metricas import TIPO_CONTENIDO, familia, registro
+from utils.permissions import require_admin
+from websocket.chat_manager import manager
+from websocket.persistencia import persistencia
+
+router = APIRouter(prefix="/metricas", tags=["Métricas"])
+
+# GET /metrics va fuera del prefijo: es la ruta que espera Prometheus
+router_prometheus = APIRouter(tags=["Métricas"])
+
+
+@router.get("/sql")
+async def metricas_sql():
+    """Por plantilla de ruta: sentencias por petición, tiempo de BD y avisos N+1."""
+    return estadisticas_sql.metricas()
+
+
+@router.get("/consultas-lentas", dependencies=[Depends(require_admin)])
+async def metricas_consultas_lentas(
+    top: int = Query(settings.SQL_LENTAS_TOP_K, ge=1, le=500)
+):
+    """
+    Sentencias (por huella) que más tiempo de BD consumen, en total y en p95,
+    con las funciones de services/ que las lanzan. Solo administradores; vacío
+    salvo con SQL_LENTAS_ACTIVO.
+    """
+    return consultas_lentas.informe(top)
+
+
+@router.put("/logs", dependencies=[Depends(require_admin)])
+async def actualizar_logs(cambios: ConfiguracionLogs):
+    """
+    Cambia niveles, muestreo y límites de los logs sin reiniciar. Solo
+    administradores; se aplica al worker que atiende la petición.
+    """
+    try:
+        return actualizar_config_logs(**cambios.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _pool() -> list[str]:
+    datos = estadisticas_pool()
+    lineas = familia(
+        "hometasks_db_pool_checkouts_total",
+        "counter",
+        "Conexiones obtenidas del pool",
+        [({}, datos["checkouts"])],
+    )
+    lineas += familia(
+        "hometasks_db_pool_timeouts_total",
+        "counter",
+        "Checkouts que agotaron pool_timeout",
+        [({}, datos["timeouts"])],
+    )
+    if "tamano" in datos:
+        lineas += familia(
+            "hometasks_db_pool_conexiones",
+            "gauge",
+            "Conexiones del pool por estado",
+            [
+                ({"estado": estado}, datos[estado])
+                for estado in ("prestadas", "disponibles", "overflow")
+            ],
+        )
+        lineas += familia(
+            "hometasks_db_pool_tamano",
+            "gauge",
+            "Tamaño configurado del pool",
+            [({}, datos["tamano"])],
+        )
+    return lineas
+
+
+def _sql() -> list[str]:
+    rutas = []
+    for ruta, datos in estadisticas_sql.metricas().items():
+        metodo, _, plantilla = ruta.partition(" ")
+        rutas.append(({"metodo": metodo, "ruta": plantilla}, datos))
+    return (
+        familia(
+            "hometasks_db_consultas_total",
+            "counter",
+            "Sentencias SQL ejecutadas por plantilla de ruta",
+            [(etiquetas, d["consultas"]) for etiquetas, d in rutas],
+        )
+        + familia(
+            "hometasks_db_tiempo_segundos_total",
+            "counter",
+            "Tiempo de BD por plantilla de ruta",
+            [(etiquetas, d["tiempo_total_s"]) for etiquetas, d in rutas],
+        )
+        + familia(
+            "hometasks_db_n_mas_1_total",
+            "counter",
+            "Peticiones con una sentencia repetida más de SQL_N_MAS_1_UMBRAL veces",
+            [(etiquetas, d["n_mas_1"]) for etiquetas, d in rutas],
+        )
+    )
+
+
+def _hashing() -> list[str]:
+    datos = servicio_hash.metricas()
+    return (
+        familia(
+            "hometasks_hash_pendientes",
+            "gauge",
+            "Operaciones bcrypt en cola o en ejecución en el pool de hashing",
+            [({}, datos["pendientes"])],
+        )
+        + familia(
+            "hometasks_hash_pendientes_max",
+            "gauge",
+            "Máximo de operaciones bcrypt pendientes a la vez",
+            [({}, datos["pico_pendientes"])],
+        )
+        + familia(
+            "hometasks_hash_operaciones_total",
+            "counter",
+            "Operaciones bcrypt por resultado",
+            [
+                ({"resultado": resultado}, datos[resultado])
+                for resultado in ("completadas", "rechazadas", "errores")
+            ],
+        )
+        + familia(
+            "hometasks_hash_espera_segundos_total",
+            "counter",
+            "Tiempo acumulado en cola antes de llegar a un worker de hashing",
+            [({}, datos["tiempo_espera_total"])],
+        )
+    )
+
+
+def _caches() -> list[str]:
+    caches = {
+        "principales": cache_principales.metricas(),
+        "catalogos": cache_catalogos.metricas(),
+        "sesiones_tarea": cache_sesiones_tarea.metricas(),
+    }
+    recientes = manager.recientes.metricas()
+    caches["recientes_chat"] = {
+        "hits": recientes["aciertos"],
+        "misses": recientes["fallos"],
+        "entradas": recientes["mensajes"],
+    }
+    for datos in caches.values():
+        total = datos["hits"] + datos["misses"]
+        datos["hit_ratio"] = datos["hits"] / total if total else 0.0
+    return (
+        familia(
+            "hometasks_cache_hit_ratio",
+            "gauge",
+            "Aciertos / consultas de cada caché en memoria",
+            [({"cache": c}, d["hit_ratio"]) for c, d in caches.items()],
+        )
+        + familia(
+            "hometasks_cache_consultas_total",
+            "counter",
+            "Consultas a cada caché en memoria por resultado",
+            [
+                ({"cache": c, "resultado": resultado}, d[clave])
+                for c, d in caches.items()
+                for resultado, clave in (("acierto", "hits"), ("fallo", "misses"))
+            ],
+        )
+        + familia(
+            "hometasks_cache_entradas",
+            "gauge",
+            "Entradas en cada caché en memoria",
+            [({"cache": c}, d["entradas"]) for c, d in caches.items()],
+        )
+    )
+
+
+def _chat() -> list[str]:
+    worker = {"worker": str(os.getpid())}
+    salas = manager.metricas().values()
+    memoria = manager.memoria()
+    persistidos = persistencia.metricas()
+    return (
+        familia(
+            "hometasks_ws_conexiones_activas",
+            "gauge",
+            "Conexiones WebSocket del chat abiertas en este worker",
+            [(worker, memoria["conexiones"])],
+        )
+        + familia(
+            "hometasks_ws_memoria_bytes",
+            "gauge",
+            "Memoria estimada del manager del chat para sus conexiones",
+            [(worker, memoria["bytes_total"])],
+        )
+        + familia(
+            "hometasks_ws_cola_mensajes",
+            "gauge",
+            "Mensajes en las colas de salida de las conexiones",
+            [(worker, sum(s["cola_total"] for s in salas))],
+        )
+        + familia(
+            "hometasks_ws_descartados_total",
+            "counter",
+            "Mensajes descartados por cola de salida llena",
+            [(worker, sum(s["descartados"] for s in salas))],
+        )
+        + familia(
+            "hometasks_ws_desconexiones_total",
+            "counter",
+            "Conexiones cerradas por el servidor por motivo",
+            [
+                (
+                    {**worker, "motivo": "lenta"},
+                    sum(s["desconexiones_lentas"] for s in salas),
+                ),
+                ({**worker, "motivo": "inactiva"}, sum(s["inactivas"] for s in salas)),
+            ],
+        )
+        + familia(
+            "hometasks_chat_persistencia_pendientes",
+            "gauge",
+            "Mensajes del chat aceptados y aún sin guardar",
+            [({}, persistidos["pendientes"])],
+        )
+        + familia(
+            "hometasks_chat_persistencia_mensajes_total",
+            "counter",
+            "Mensajes del chat por resultado al guardarlos",
+            [
+                ({"resultado": resultado}, persistidos[resultado])
+                for resultado in ("persistidos", "descartados", "rechazados", "errores")
+            ],
+        )
+    )
+
+
+def _logs() -> list[str]:
+    return familia(
+        "hometasks_logs_descartados_total",
+        "counter",
+        "Registros de log descartados por muestreo o por límite por segundo",
+        [
+            ({"logger": nombre, "motivo": motivo}, datos[motivo])
+            for nombre, datos in metricas_logs().items()
+            for motivo in ("muestreados", "limitados")
+        ],
+    )
+
+
+def _arranque(request: Request) -> list[str]:
+    arranque = dict(getattr(request.app.state, "arranque", None) or {})
+    modo = arranque.pop("modo", "")
+    return familia(
+        "hometasks_arranque_segundos",
+        "gauge",
+        "Duración de cada fase del último arranque",
+        [({"fase": fase, "modo": modo}, ms / 1000) for fase, ms in arranque.items()],
+    )
+
+
+@router_prometheus.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    """
+    Métricas del proceso en formato de texto de Prometheus: histogramas de
+    latencia HTTP por plantilla de ruta, espera de checkout del pool y
+    difusión del chat, más los contadores que ya exponen el pool, el hashing,
+    las cachés, el chat, los logs y la medición de SQL. Cada worker expone
+    las suyas.
+    """
+    lineas = registro.exponer()
+    lineas += _pool() + _sql() + _hashing() + _caches() + _chat() + _logs()
+    lineas += _arranque(request)
+    return PlainTextResponse("\n".join(lineas) + "\n", media_type=TIPO_CONTENIDO)
@@ -15,6 +15,7 @@ from services.miembro_service import (
 from utils.logger import setup_logger
 from utils.permissions import require_permission
 from utils.auth import obtener_miembro_actual
+from utils.hashing import ServicioHashSaturado, error_servicio_saturado
 
 logger = setup_logger("miembro_routes")
 
@@ -47,6 +48,11 @@ async def crear_miembro_endpoint(
     except ValueError as e:
         logger.warning(f"Error de validación al crear miembro: {str(e)}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ServicioHashSaturado as e:
+        logger.warning(
+            "Creación de miembro rechazada por saturación del pool de hashing"
+        )
+        raise error_servicio_saturado(e)
     except Exception as e:
         logger.error(f"Error al crear miembro: {str(e)}")
         raise HTTPException(
@@ -1,12 +1,14 @@
 # routes/tarea_routes.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.database import get_db
 from schemas.tarea import TareaCreate, TareaUpdateEstado, Tarea
 from services.tarea_service import (
     crear_tarea,
     obtener_tarea_por_id,
-    listar_tareas_por_miembro,
+    listar_tareas_por_miembro_paginado,
     listar_tareas_por_evento,
     listar_tareas_por_tipo,  # ¡Ojo! Este servicio no lo he visto, ¡pero lo dejo!
     actualizar_estado_tarea,
@@ -86,13 +88,48 @@ async def ver_tarea(
         )
 
 
+# Cabecera con el cursor de la página siguiente (ausente en la última)
+CABECERA_SIGUIENTE_CURSOR = "X-Siguiente-Cursor"
+
+
 @router.get("/mias/", response_model=list[Tarea])  # ¡Buena práctica: "/" al final!
 async def listar_mis_tareas(
+    response: Response,
+    orden: Literal["fecha_limite", "fecha_creacion"] = "fecha_limite",
+    cursor: Optional[str] = None,
+    limite: int = Query(50, ge=1, le=100),
+    estado_actual: Optional[Literal["pendiente", "en_progreso", "completada"]] = None,
+    categoria: Optional[
+        Literal["limpieza", "cocina", "compras", "mantenimiento"]
+    ] = None,
+    repeticion: Optional[Literal["ninguna", "diaria", "semanal"]] = None,
+    fecha_limite_desde: Optional[date] = None,
+    fecha_limite_hasta: Optional[date] = None,
     db: AsyncSession = Depends(get_db),
     current_user: Miembro = Depends(obtener_miembro_actual),  # ¡Cambiado a Miembro!
 ):
+    """
+    Página de las tareas del miembro. El cuerpo sigue siendo una lista; el
+    cursor para pedir la siguiente página va en la cabecera X-Siguiente-Cursor.
+    """
     try:
-        return await listar_tareas_por_miembro(db, current_user.id)
+        tareas, siguiente_cursor = await listar_tareas_por_miembro_paginado(
+            db,
+            current_user.id,
+            orden=orden,
+            cursor=cursor,
+            limite=limite,
+            estado_actual=estado_actual,
+            categoria=categoria,
+            repeticion=repeticion,
+            fecha_limite_desde=fecha_limite_desde,
+            fecha_limite_hasta=fecha_limite_hasta,
+        )
+        if siguiente_cursor is not None:
+            response.headers[CABECERA_SIGUIENTE_CURSOR] = siguiente_cursor
+        return tareas
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"Error al listar tareas del usuario {current_user.id}: {str(e)}")
         raise HTTPException(
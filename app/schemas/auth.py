@@ -22,6 +22,7 @@ class MiembroRegistro(BaseModel):
 
 class Token(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
     # rol: str
     id_miembro: int
@@ -30,6 +31,10 @@ class Token(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+
 # Nuevo esquema solo para Swagger UI
 class OAuth2PasswordRequestFormCompat(BaseModel):
     username: str  # correo electrónico
@@ -0,0 +1,12 @@
+# schemas/logs.py
+from pydantic import BaseModel
+from typing import Optional
+
+
+# Cambios en caliente de la configuración de logs (None = no tocar); mismo
+# formato que las variables de entorno homónimas
+class ConfiguracionLogs(BaseModel):
+    LOG_NIVEL: Optional[str] = None
+    LOG_NIVELES: Optional[str] = None
+    LOG_MUESTREO: Optional[str] = None
+    LOG_LIMITE_POR_SEGUNDO: Optional[str] = None
@@ -36,3 +36,10 @@ class MensajeResponse(Mensaje):
     remitente: Optional[MiembroChatResponse] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class PresenciaMiembro(BaseModel):
+    id_miembro: int
+    en_linea: bool
+    # En línea: ahora; si no, cuándo se desconectó por última vez
+    ultima_vez: datetime
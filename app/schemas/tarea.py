@@ -38,3 +38,4 @@ class Tarea(TareaBase):
     creado_por: Optional[int] = None
 
     model_config = ConfigDict(from_attributes=True)
+
@@ -1,12 +1,21 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from models.atributo import Atributo
+from schemas.atributo import Atributo as AtributoSchema
+from config.config import settings
+from utils.cache import CacheTTL
+
+# Catálogo de atributos activos en memoria (dato de referencia, cambia poco).
+# Se guardan instantáneas pydantic, no objetos ORM ligados a una sesión.
+cache_catalogos = CacheTTL(max_entradas=16, ttl=settings.CATALOGOS_CACHE_TTL_SEGUNDOS)
+_CLAVE_ATRIBUTOS_ACTIVOS = "atributos_activos"
 
 
 async def crear_atributo(db: AsyncSession, nombre: str, descripcion: str, tipo: str):
     atributo = Atributo(nombre=nombre, descripcion=descripcion, tipo=tipo)
     db.add(atributo)
     await db.commit()
+    cache_catalogos.invalidar(_CLAVE_ATRIBUTOS_ACTIVOS)
     await db.refresh(atributo)
     return atributo
 
@@ -16,9 +25,19 @@ async def obtener_atributo(db: AsyncSession, atributo_id: int):
 
 
 async def listar_atributos_activos(db: AsyncSession):
+    atributos = cache_catalogos.obtener(_CLAVE_ATRIBUTOS_ACTIVOS)
+    if atributos is None:
+        atributos = await precargar_catalogos(db)
+    return atributos
+
+
+async def precargar_catalogos(db: AsyncSession):
+    """Carga el catálogo de atributos activos en la caché (también al arrancar)."""
     stmt = select(Atributo).where(Atributo.estado == True)
     result = await db.execute(stmt)
-    return result.scalars().all()
+    atributos = [AtributoSchema.model_validate(a) for a in result.scalars().all()]
+    cache_catalogos.guardar(_CLAVE_ATRIBUTOS_ACTIVOS, atributos)
+    return atributos
 
 
 async def actualizar_atributo(db: AsyncSession, atributo_id: int, updates: dict):
@@ -27,6 +46,7 @@ async def actualizar_atributo(db: AsyncSession, atributo_id: int, updates: dict)
         for k, v in updates.items():
             setattr(atributo, k, v)
         await db.commit()
+        cache_catalogos.invalidar(_CLAVE_ATRIBUTOS_ACTIVOS)
         return atributo
     return None
 
@@ -36,5 +56,6 @@ async def eliminar_atributo_logico(db: AsyncSession, atributo_id: int):
     if atributo and atributo.estado:
         atributo.estado = False
         await db.commit()
+        cache_catalogos.invalidar(_CLAVE_ATRIBUTOS_ACTIVOS)
         return True
     return False
@@ -1,21 +1,22 @@
-from sqlalchemy import select
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from models.miembro import Miembro
 from models.rol import Rol
 from models.hogar import Hogar
 from models.modulo import Modulo
 from models.permiso import Permiso
+from models.token_revocado import TokenRevocado
 from schemas.auth import MiembroRegistro
 from sqlalchemy.orm import selectinload
-from utils.security import (
-    verificar_contrasena,
-    obtener_hash_contrasena,
-    crear_token_acceso,
-)
-from datetime import timedelta
+from utils.security import crear_token_acceso, decode_jwt
+from utils.hashing import servicio_hash
+from utils.auth import invalidar_principal
+from services.permiso_service import matriz_permisos
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
 from config.config import settings
 from utils.logger import setup_logger
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 logger = setup_logger("auth_service")
 
@@ -34,7 +35,7 @@ async def autenticar_miembro(db: AsyncSession, correo: str, contrasena: str):
             logger.warning(f"No se encontró ningún miembro con el correo: {correo}")
             return None
 
-        if not verificar_contrasena(contrasena, miembro.contrasena_hash):
+        if not await servicio_hash.verificar(contrasena, miembro.contrasena_hash):
             logger.warning(f"Contraseña incorrecta para el correo: {correo}")
             return None
 
@@ -82,7 +83,7 @@ async def crear_miembro(db: AsyncSession, datos: MiembroRegistro):
             raise ValueError(f"El hogar con id {datos.id_hogar} no existe.")
 
         # 3. Crear el miembro
-        contrasena_hash = obtener_hash_contrasena(datos.contrasena)
+        contrasena_hash = await servicio_hash.hash(datos.contrasena)
         miembro = Miembro(
             nombre_completo=datos.nombre_completo,
             correo_electronico=datos.correo_electronico,
@@ -252,6 +253,22 @@ def crear_token_para_miembro(miembro: Miembro):
             "id_hogar": miembro.id_hogar,
         }
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+
+        if settings.TOKEN_MODO == "permisos":
+            # Token autosuficiente: identidad + máscaras de permisos + huella
+            # de la matriz con la que se emitieron. Vida corta para acotar la
+            # revocación; se renueva con el refresh token.
+            data.update(
+                {
+                    "id_rol": miembro.id_rol,
+                    "nombre": miembro.nombre_completo,
+                    "perm": matriz_permisos.permisos_de_rol(miembro.id_rol),
+                    "pv": matriz_permisos.huella,
+                }
+            )
+            access_token_expires = timedelta(
+                minutes=settings.ACCESS_TOKEN_PERMISOS_EXPIRE_MINUTES
+            )
         token = crear_token_acceso(data, expires_delta=access_token_expires)
         logger.info("Token de acceso generado exitosamente")
         return token
@@ -260,3 +277,92 @@ def crear_token_para_miembro(miembro: Miembro):
             f"Error al crear token para miembro {miembro.nombre_completo}: {str(e)}"
         )
         raise
+
+
+def crear_token_refresco(miembro: Miembro):
+    try:
+        logger.info(f"Generando refresh token para miembro ID: {miembro.id}")
+        # jti: identificador único para revocarlo al canjearlo (un solo uso)
+        data = {"sub": str(miembro.id), "typ": "refresh", "jti": str(uuid4())}
+        return crear_token_acceso(
+            data, expires_delta=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        )
+    except Exception as e:
+        logger.error(
+            f"Error al crear refresh token para miembro {miembro.id}: {str(e)}"
+        )
+        raise
+
+
+async def crear_tokens_para_miembro(db: AsyncSession, miembro: Miembro):
+    """
+    Devuelve (access_token, refresh_token). En modo "permisos" se asegura
+    antes de que la matriz esté al día para no embeber máscaras viejas.
+    """
+    if settings.TOKEN_MODO == "permisos":
+        await matriz_permisos.asegurar(db)
+    return crear_token_para_miembro(miembro), crear_token_refresco(miembro)
+
+
+async def _revocar_refresco(db: AsyncSession, payload: dict) -> bool:
+    """
+    Guarda el jti del refresh token. False si ya estaba (token reutilizado).
+    De paso borra los jti de tokens ya caducados, que no hace falta recordar.
+    """
+    ahora = datetime.now(timezone.utc).replace(tzinfo=None)
+    expira = datetime.fromtimestamp(payload["exp"], timezone.utc).replace(tzinfo=None)
+    await db.execute(delete(TokenRevocado).where(TokenRevocado.expira < ahora))
+    try:
+        async with db.begin_nested():
+            db.add(TokenRevocado(jti=payload["jti"], expira=expira))
+    except IntegrityError:
+        return False
+    return True
+
+
+async def refrescar_sesion(db: AsyncSession, refresh_token: str):
+    """
+    Valida un refresh token y devuelve el miembro (con rol) si sigue activo.
+    Aquí sí se consulta la BD: es el punto donde se aplica la revocación.
+
+    Cada refresh token se canjea una sola vez: su jti se guarda en
+    tokens_revocados (hace flush; la ruta hace commit) y un segundo canje,
+    aunque sea simultáneo, se rechaza.
+    """
+    try:
+        payload = decode_jwt(refresh_token)
+        if (
+            not payload
+            or payload.get("typ") != "refresh"
+            or "sub" not in payload
+            or "jti" not in payload
+        ):
+            logger.warning("Refresh token inválido o de tipo incorrecto")
+            return None
+
+        miembro_id = int(payload["sub"])
+        result = await db.execute(
+            select(Miembro)
+            .options(selectinload(Miembro.rol))
+            .where(Miembro.id == miembro_id)
+        )
+        miembro = result.scalar_one_or_none()
+        if not miembro or not miembro.estado:
+            logger.warning(
+                f"Refresh rechazado: miembro {miembro_id} inexistente o inactivo"
+            )
+            return None
+
+        if not await _revocar_refresco(db, payload):
+            logger.warning(
+                f"Refresh rechazado: token ya canjeado por el miembro {miembro_id}"
+            )
+            return None
+
+        # El refresh es el momento de revalidar: descartar la instantánea cacheada
+        invalidar_principal(miembro.id)
+        logger.info(f"Sesión refrescada para miembro ID: {miembro.id}")
+        return miembro
+    except SQLAlchemyError as e:
+        logger.error(f"Error de base de datos al refrescar sesión: {str(e)}")
+        raise
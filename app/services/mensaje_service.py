@@ -1,14 +1,80 @@
+from dataclasses import dataclass
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import event, select, and_, or_
 from sqlalchemy.orm import joinedload
 from models.mensaje import Mensaje
 from models.tarea import Tarea
 from uuid import uuid4
+from utils.cache import CacheTTL
 from utils.logger import setup_logger
+from config.config import settings
+from db.secuencias import ids_mensajes
 
 logger = setup_logger("mensaje_service")
 
 
+@dataclass(frozen=True)
+class SesionTarea:
+    """Lo que enviar_mensaje_en_sesion necesita de la tarea de una sesión."""
+
+    tarea_id: int
+    id_hogar: int
+    activa: bool
+
+
+# Caché de sesiones por id_sesion_mensaje: evita un SELECT de Tarea por mensaje
+cache_sesiones_tarea = CacheTTL(
+    max_entradas=settings.SESIONES_TAREA_CACHE_MAX_ENTRADAS,
+    ttl=settings.SESIONES_TAREA_CACHE_TTL_SEGUNDOS,
+)
+
+
+# Callbacks async (hogar_id) que se llaman tras guardar un mensaje que no pasa
+# por el chat. Los registra la capa websocket (ver websocket/chat.py), así el
+# servicio no depende de ella.
+_al_guardar_fuera_del_chat: list = []
+
+
+def registrar_al_guardar_fuera_del_chat(callback):
+    """Registra ``callback(hogar_id)``, que se espera tras cada envío guardado."""
+    _al_guardar_fuera_del_chat.append(callback)
+
+
+def invalidar_sesion_tarea(sesion_id: str | None):
+    """Descarta la sesión cacheada; llamar cuando cambie o se desactive la tarea."""
+    if sesion_id:
+        cache_sesiones_tarea.invalidar(sesion_id)
+
+
+@event.listens_for(Tarea.estado, "set")
+def _al_cambiar_estado_tarea(tarea, valor, anterior, iniciador):
+    # Cualquier desactivación por el ORM invalida la sesión en este worker;
+    # en los demás (o con UPDATE masivos) caduca por TTL
+    if not valor:
+        invalidar_sesion_tarea(tarea.id_sesion_mensaje)
+
+
+async def _resolver_sesion(db: AsyncSession, sesion_id: str) -> SesionTarea | None:
+    """SesionTarea de la caché o, si no está, de la BD. None si no existe."""
+    sesion = cache_sesiones_tarea.obtener(sesion_id)
+    if sesion is not None:
+        return sesion
+
+    stmt = select(Tarea.id, Tarea.id_hogar, Tarea.estado).where(
+        Tarea.id_sesion_mensaje == sesion_id
+    )
+    fila = (await db.execute(stmt)).first()
+    if fila is None:
+        return None
+
+    sesion = SesionTarea(
+        tarea_id=fila.id, id_hogar=fila.id_hogar, activa=bool(fila.estado)
+    )
+    cache_sesiones_tarea.guardar(sesion_id, sesion)
+    return sesion
+
+
 async def crear_sesion_mensaje_para_tarea(db: AsyncSession, tarea_id: int):
     try:
         logger.info(f"Creando sesión de mensaje para tarea {tarea_id}")
@@ -20,8 +86,14 @@ async def crear_sesion_mensaje_para_tarea(db: AsyncSession, tarea_id: int):
             return None
 
         sesion_id = str(uuid4())
+        # La sesión anterior (si había) deja de ser válida
+        invalidar_sesion_tarea(tarea.id_sesion_mensaje)
         tarea.id_sesion_mensaje = sesion_id
         await db.commit()
+        cache_sesiones_tarea.guardar(
+            sesion_id,
+            SesionTarea(tarea_id=tarea.id, id_hogar=tarea.id_hogar, activa=True),
+        )
         logger.info(f"Sesión creada con ID: {sesion_id} para tarea {tarea_id}")
         return sesion_id
     except Exception as e:
@@ -37,50 +109,132 @@ async def enviar_mensaje_en_sesion(
         logger.info(
             f"Enviando mensaje en sesión {sesion_id} por remitente {remitente_id}"
         )
-        stmt = select(Tarea).where(
-            Tarea.id_sesion_mensaje == sesion_id, Tarea.estado == True
-        )
-        result = await db.execute(stmt)
-        tarea_obj = result.scalar_one_or_none()
+        sesion = await _resolver_sesion(db, sesion_id)
 
-        if not tarea_obj:
+        if sesion is None or not sesion.activa:
             logger.error(f"Sesión {sesion_id} no vinculada a ninguna tarea activa")
             raise ValueError("Sesión inválida o tarea inactiva")
 
+        # Id y valores por defecto asignados aquí, como en la persistencia del
+        # chat: sin refresh el envío es un solo INSERT, y el id sale del mismo
+        # asignador por bloques (el autoincremento podría caer en un bloque
+        # ya reservado por el chat de otro worker)
+        fecha = datetime.now().replace(microsecond=0)
         mensaje = Mensaje(
-            id_hogar=tarea_obj.id_hogar, id_remitente=remitente_id, contenido=contenido
+            id=await ids_mensajes(db.bind).siguiente(),
+            id_hogar=sesion.id_hogar,
+            id_remitente=remitente_id,
+            contenido=contenido,
+            fecha_envio=fecha,
+            fecha_creacion=fecha,
+            fecha_actualizacion=fecha,
+            leido=False,
+            estado=1,
         )
         db.add(mensaje)
         await db.commit()
-        await db.refresh(mensaje)
         logger.info(f"Mensaje enviado en sesión {sesion_id}, ID mensaje: {mensaje.id}")
-        return mensaje
     except Exception as e:
         logger.error(f"Error al enviar mensaje en sesión {sesion_id}: {str(e)}")
         await db.rollback()
         raise
 
+    # Fuera del try: el mensaje ya está guardado, así que un fallo al avisar
+    # (p. ej. el broker caído) no debe hacer rollback ni fallar el envío
+    for callback in _al_guardar_fuera_del_chat:
+        try:
+            await callback(sesion.id_hogar)
+        except Exception as e:
+            logger.warning(
+                f"No se pudo avisar del mensaje {mensaje.id} del hogar "
+                f"{sesion.id_hogar}: {str(e)}"
+            )
+    return mensaje
+
+
+def _fecha_de(hogar_id: int, mensaje_id: int):
+    # Subconsulta escalar: la comparación se hace en SQL con el valor tal cual
+    # está guardado, sin ida y vuelta ni conversiones de formato de fecha
+    return (
+        select(Mensaje.fecha_envio)
+        .where(Mensaje.id == mensaje_id, Mensaje.id_hogar == hogar_id)
+        .scalar_subquery()
+    )
 
-async def obtener_mensajes_por_hogar(db: AsyncSession, hogar_id: int):
+
+async def obtener_mensajes_por_hogar(
+    db: AsyncSession,
+    hogar_id: int,
+    antes: int | None = None,
+    despues: int | None = None,
+    limite: int | None = None,
+):
     """
-    Obtiene TODOS los mensajes de un hogar, cargando el remitente (Miembro)
-    para evitar N+1 queries.
+    Obtiene una página de mensajes de un hogar, cargando el remitente
+    (Miembro) para evitar N+1 queries. Como antes de paginar, cada página va
+    del más antiguo al más reciente.
+
+    Paginación por keyset sobre (fecha_envio, id) usando el id de un mensaje
+    como ancla: sin ancla, los últimos ``limite`` mensajes; ``antes`` devuelve
+    los anteriores a ese mensaje y ``despues`` los posteriores (los más
+    cercanos al ancla). El tamaño de página se limita a
+    settings.MENSAJES_PAGINA_MAX. Lanza ValueError si se pasan ambos.
     """
     try:
-        logger.info(f"Obteniendo mensajes del hogar {hogar_id}")
+        if antes is not None and despues is not None:
+            raise ValueError("Usa 'antes' o 'despues', no ambos")
+        limite = min(
+            limite or settings.MENSAJES_PAGINA_DEFECTO, settings.MENSAJES_PAGINA_MAX
+        )
+        logger.debug(
+            "Obteniendo mensajes del hogar %s (antes=%s, despues=%s, limite=%s)",
+            hogar_id,
+            antes,
+            despues,
+            limite,
+        )
 
         stmt_mensajes = (
             select(Mensaje)
             .where(Mensaje.id_hogar == hogar_id, Mensaje.estado == True)
             .options(joinedload(Mensaje.remitente))  # <-- ¡EL PARCHE N+1!
-            .order_by(Mensaje.fecha_envio.asc())
+            .limit(limite)
         )
 
+        if despues is not None:
+            fecha = _fecha_de(hogar_id, despues)
+            stmt_mensajes = stmt_mensajes.where(
+                or_(
+                    Mensaje.fecha_envio > fecha,
+                    and_(Mensaje.fecha_envio == fecha, Mensaje.id > despues),
+                )
+            ).order_by(Mensaje.fecha_envio.asc(), Mensaje.id.asc())
+        else:
+            if antes is not None:
+                fecha = _fecha_de(hogar_id, antes)
+                stmt_mensajes = stmt_mensajes.where(
+                    or_(
+                        Mensaje.fecha_envio < fecha,
+                        and_(Mensaje.fecha_envio == fecha, Mensaje.id < antes),
+                    )
+                )
+            stmt_mensajes = stmt_mensajes.order_by(
+                Mensaje.fecha_envio.desc(), Mensaje.id.desc()
+            )
+
         result_mensajes = await db.execute(stmt_mensajes)
-        mensajes = result_mensajes.scalars().all()
+        mensajes = list(result_mensajes.scalars().all())
+        if despues is None:
+            # Se leen del más reciente hacia atrás; se devuelven en orden
+            mensajes.reverse()
 
-        logger.info(f"Se recuperaron {len(mensajes)} mensajes para el hogar {hogar_id}")
+        logger.info(
+            "Se recuperaron %s mensajes para el hogar %s", len(mensajes), hogar_id
+        )
         return mensajes
+    except ValueError as e:
+        logger.warning(f"Consulta de mensajes rechazada: {str(e)}")
+        raise
     except Exception as e:
         logger.error(f"Error al obtener mensajes del hogar {hogar_id}: {str(e)}")
         raise
@@ -2,7 +2,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, func
 from models.miembro import Miembro
 from models.rol import Rol
-from utils.security import obtener_hash_contrasena
+from utils.hashing import servicio_hash
+from utils.auth import invalidar_principal
 from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import SQLAlchemyError
 from utils.logger import setup_logger
@@ -26,10 +27,11 @@ async def crear_miembro(db: AsyncSession, data: dict):
             )
             raise ValueError("El correo electrónico ya está registrado")
 
+        contrasena_hash = await servicio_hash.hash(data["contrasena"])
         miembro = Miembro(
             nombre_completo=data["nombre_completo"],
             correo_electronico=data["correo_electronico"],
-            contrasena_hash=obtener_hash_contrasena(data["contrasena"]),
+            contrasena_hash=contrasena_hash,
             id_rol=data["id_rol"],
             id_hogar=data["id_hogar"],
         )
@@ -139,6 +141,7 @@ async def actualizar_miembro(db: AsyncSession, miembro_id: int, data: dict):
                 setattr(miembro, key, value)
 
         await db.commit()
+        invalidar_principal(miembro_id)
         # await db.refresh(miembro, ["rol"])  # Refrescar incluyendo el rol
         logger.info(f"Miembro actualizado exitosamente: {miembro_id}")
         # ¡Use la función que ya carga el objeto con el 'joinedload' (rol)!
@@ -171,6 +174,7 @@ async def desactivar_miembro(db: AsyncSession, miembro_id: int):
 
         miembro.estado = False
         await db.commit()
+        invalidar_principal(miembro_id)
         logger.info(f"Miembro desactivado exitosamente: {miembro_id}")
         return True
     except SQLAlchemyError as e:
@@ -1,11 +1,134 @@
+import hashlib
+import time
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, event
+from sqlalchemy.orm import Session
 from models.permiso import Permiso
 from models.miembro import Miembro
 from models.rol import Rol
 from models.modulo import Modulo
 from schemas.permiso import PermisoCreate, PermisoUpdate
 from sqlalchemy.exc import SQLAlchemyError
+from config.config import settings
+from utils.logger import setup_logger
+from utils.contexto import miembro_actual_en_contexto
+
+logger = setup_logger("permiso_service")
+
+# Bit de cada acción dentro de la máscara de permisos
+BITS_ACCION = {"crear": 1, "leer": 2, "actualizar": 4, "eliminar": 8}
+
+
+class MatrizPermisos:
+    """
+    Matriz de permisos compilada en memoria: (id_rol, modulo_nombre) -> máscara.
+
+    Se construye con una sola consulta sobre Permiso/Rol/Modulo y se sustituye
+    entera al recargar, así las lecturas nunca ven una matriz a medio construir.
+    Se marca como obsoleta cuando una sesión confirma cambios en esas tablas
+    (ver listeners abajo) y, en cualquier caso, tras PERMISOS_MATRIZ_TTL_SEGUNDOS
+    para que otros workers terminen viendo los cambios.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._matriz: dict[tuple[int, str], int] = {}
+        self.version = 0
+        # Huella del contenido: igual en todos los workers si los datos coinciden
+        self.huella = ""
+        self._obsoleta = True
+        self._cargada_en = 0.0
+
+    @property
+    def vigente(self) -> bool:
+        return not self._obsoleta and time.monotonic() - self._cargada_en < self.ttl
+
+    def invalidar(self):
+        self._obsoleta = True
+
+    async def recargar(self, db: AsyncSession):
+        stmt = (
+            select(
+                Permiso.id_rol,
+                Modulo.nombre,
+                Permiso.puede_crear,
+                Permiso.puede_leer,
+                Permiso.puede_actualizar,
+                Permiso.puede_eliminar,
+            )
+            .join(Rol, Permiso.id_rol == Rol.id)
+            .join(Modulo, Permiso.id_modulo == Modulo.id)
+            .where(Permiso.estado == True)
+        )
+        # Se marca vigente antes de consultar: un commit concurrente vuelve a
+        # marcarla obsoleta y no se pierde
+        self._obsoleta = False
+        result = await db.execute(stmt)
+
+        nueva: dict[tuple[int, str], int] = {}
+        for id_rol, modulo, crear, leer, actualizar, eliminar in result.all():
+            mascara = (
+                (BITS_ACCION["crear"] if crear else 0)
+                | (BITS_ACCION["leer"] if leer else 0)
+                | (BITS_ACCION["actualizar"] if actualizar else 0)
+                | (BITS_ACCION["eliminar"] if eliminar else 0)
+            )
+            nueva[(id_rol, modulo)] = mascara
+
+        self._matriz = nueva
+        contenido = repr(sorted(nueva.items())).encode()
+        self.huella = hashlib.sha1(contenido).hexdigest()[:12]
+        self._cargada_en = time.monotonic()
+        self.version += 1
+        logger.info(
+            f"Matriz de permisos cargada: {len(nueva)} entradas (versión {self.version})"
+        )
+
+    async def asegurar(self, db: AsyncSession):
+        """Recarga la matriz solo si no está vigente."""
+        if not self.vigente:
+            await self.recargar(db)
+
+    def mascara(self, id_rol: int, modulo_nombre: str) -> int:
+        return self._matriz.get((id_rol, modulo_nombre), 0)
+
+    def permisos_de_rol(self, id_rol: int) -> dict[str, int]:
+        """Máscaras {modulo_nombre: máscara} del rol, para embeber en tokens."""
+        return {
+            modulo: mascara
+            for (rol, modulo), mascara in self._matriz.items()
+            if rol == id_rol and mascara
+        }
+
+    def permite(self, id_rol: int, modulo_nombre: str, accion: str) -> bool:
+        bit = BITS_ACCION.get(accion)
+        if bit is None:
+            return False
+        return bool(self._matriz.get((id_rol, modulo_nombre), 0) & bit)
+
+
+matriz_permisos = MatrizPermisos(ttl=settings.PERMISOS_MATRIZ_TTL_SEGUNDOS)
+
+
+# --- Invalidación de la matriz al confirmar cambios en Permiso/Rol/Modulo ---
+_MODELOS_MATRIZ = (Permiso, Rol, Modulo)
+
+
+@event.listens_for(Session, "after_flush")
+def _marcar_cambios_de_permisos(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _MODELOS_MATRIZ):
+            session.info["matriz_permisos_modificada"] = True
+            # La propia sesión puede consultar la matriz antes del commit
+            matriz_permisos.invalidar()
+            return
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_soft_rollback")
+def _invalidar_matriz_permisos(session, *args):
+    if session.info.pop("matriz_permisos_modificada", False):
+        matriz_permisos.invalidar()
 
 
 async def asignar_permiso(db: AsyncSession, data: PermisoCreate):  # <-- ¡Recibe schema!
@@ -163,8 +286,11 @@ async def verificar_permiso(
         bool: True si tiene permiso, False en caso contrario
     """
     try:
-        # Obtener el miembro por su ID
-        miembro = await db.get(Miembro, id_miembro)
+        # Obtener el miembro por su ID (reutilizando el ya resuelto en la
+        # petición en curso si es el mismo)
+        miembro = miembro_actual_en_contexto()
+        if miembro is None or miembro.id != id_miembro:
+            miembro = await db.get(Miembro, id_miembro)
 
         # Verificar si el miembro existe y está activo
         if not miembro or not miembro.estado:
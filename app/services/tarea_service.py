@@ -1,11 +1,13 @@
 # services/tarea_service.py
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, and_, or_
+from datetime import date, datetime
 from models.tarea import Tarea
 from models.comentario_tarea import ComentarioTarea
 from models.miembro import Miembro
 import time
 from utils.logger import setup_logger
+from utils.paginacion import codificar_cursor, decodificar_cursor
 
 # --- ¡LOS IMPORTS DE LOS PARCHES! ---
 from services.notificacion_service import crear_notificacion
@@ -51,12 +53,12 @@ async def crear_tarea(db: AsyncSession, data: TareaCreate, creador_id: int):
 
 async def obtener_tarea_por_id(db: AsyncSession, tarea_id: int):
     try:
-        logger.info(f"Buscando tarea con ID: {tarea_id}")
+        logger.debug("Buscando tarea con ID: %s", tarea_id)
         tarea = await db.get(Tarea, tarea_id)
         if not tarea or not tarea.estado:
-            logger.warning(f"Tarea con ID {tarea_id} no encontrada o inactiva")
+            logger.warning("Tarea con ID %s no encontrada o inactiva", tarea_id)
             return None
-        logger.info(f"Tarea encontrada: {tarea.titulo}")
+        logger.info("Tarea encontrada: %s", tarea.titulo)
         return tarea
     except Exception as e:
         logger.error(f"Error al obtener tarea {tarea_id}: {str(e)}")
@@ -69,12 +71,14 @@ async def obtener_tarea_por_id(db: AsyncSession, tarea_id: int):
 
 async def listar_tareas_por_miembro(db: AsyncSession, miembro_id: int):
     try:
-        logger.info(f"Listando tareas asignadas al miembro ID: {miembro_id}")
+        logger.debug("Listando tareas asignadas al miembro ID: %s", miembro_id)
         stmt = select(Tarea).where(Tarea.asignado_a == miembro_id, Tarea.estado == True)
         result = await db.execute(stmt)
         tareas = result.scalars().all()
         logger.info(
-            f"Se encontraron {len(tareas)} tareas activas para el miembro {miembro_id}"
+            "Se encontraron %s tareas activas para el miembro %s",
+            len(tareas),
+            miembro_id,
         )
         return tareas
     except Exception as e:
@@ -82,13 +86,129 @@ async def listar_tareas_por_miembro(db: AsyncSession, miembro_id: int):
         raise
 
 
+# Órdenes admitidos en el listado paginado: columna de keyset y sentido.
+# fecha_limite ascendente (las sin fecha primero, como ordenan MySQL y SQLite);
+# fecha_creacion descendente (las más recientes primero). Desempate por id.
+ORDENES_TAREAS = {"fecha_limite": "asc", "fecha_creacion": "desc"}
+
+
+def _condicion_keyset(orden: str, cursor: dict):
+    columna = getattr(Tarea, orden)
+    ultimo_id = cursor["id"]
+    valor = cursor["v"]
+
+    if ORDENES_TAREAS[orden] == "desc":
+        # En descendente las filas sin fecha van al final (NULL es el menor)
+        if valor is None:
+            return and_(columna.is_(None), Tarea.id < ultimo_id)
+        valor = datetime.fromisoformat(valor)
+        return or_(
+            columna < valor,
+            and_(columna == valor, Tarea.id < ultimo_id),
+            columna.is_(None),
+        )
+
+    if valor is None:
+        # Seguimos dentro del bloque sin fecha límite, luego todas las demás
+        return or_(
+            and_(columna.is_(None), Tarea.id > ultimo_id), columna.is_not(None)
+        )
+    valor = date.fromisoformat(valor)
+    return or_(columna > valor, and_(columna == valor, Tarea.id > ultimo_id))
+
+
+async def listar_tareas_por_miembro_paginado(
+    db: AsyncSession,
+    miembro_id: int,
+    orden: str = "fecha_limite",
+    cursor: str | None = None,
+    limite: int = 50,
+    estado_actual: str | None = None,
+    categoria: str | None = None,
+    repeticion: str | None = None,
+    fecha_limite_desde: date | None = None,
+    fecha_limite_hasta: date | None = None,
+):
+    """
+    Página de tareas activas del miembro con paginación por keyset sobre
+    (orden, id): el coste no depende de cuántas páginas quedan detrás.
+    Devuelve (tareas, siguiente_cursor); siguiente_cursor es None en la última.
+    Lanza ValueError si el orden o el cursor no son válidos.
+    """
+    try:
+        if orden not in ORDENES_TAREAS:
+            raise ValueError(f"Orden no soportado: {orden}")
+
+        condiciones = [Tarea.asignado_a == miembro_id, Tarea.estado == True]
+        if estado_actual is not None:
+            condiciones.append(Tarea.estado_actual == estado_actual)
+        if categoria is not None:
+            condiciones.append(Tarea.categoria == categoria)
+        if repeticion is not None:
+            condiciones.append(Tarea.repeticion == repeticion)
+        if fecha_limite_desde is not None:
+            condiciones.append(Tarea.fecha_limite >= fecha_limite_desde)
+        if fecha_limite_hasta is not None:
+            condiciones.append(Tarea.fecha_limite <= fecha_limite_hasta)
+
+        if cursor is not None:
+            datos = decodificar_cursor(cursor)
+            if datos.get("o") != orden or "id" not in datos or "v" not in datos:
+                raise ValueError("Cursor inválido para este orden")
+            try:
+                condiciones.append(_condicion_keyset(orden, datos))
+            except (TypeError, ValueError) as e:
+                raise ValueError("Cursor inválido") from e
+
+        columna = getattr(Tarea, orden)
+        if ORDENES_TAREAS[orden] == "desc":
+            orden_sql = (columna.desc(), Tarea.id.desc())
+        else:
+            orden_sql = (columna.asc(), Tarea.id.asc())
+
+        # Se pide una fila de más para saber si hay página siguiente
+        stmt = select(Tarea).where(*condiciones).order_by(*orden_sql).limit(limite + 1)
+        result = await db.execute(stmt)
+        tareas = result.scalars().all()
+
+        siguiente = None
+        if len(tareas) > limite:
+            tareas = tareas[:limite]
+            ultima = tareas[-1]
+            valor = getattr(ultima, orden)
+            siguiente = codificar_cursor(
+                {
+                    "o": orden,
+                    "v": valor.isoformat() if valor is not None else None,
+                    "id": ultima.id,
+                }
+            )
+
+        logger.info(
+            "Página de %s tareas para el miembro %s (orden=%s, hay_mas=%s)",
+            len(tareas),
+            miembro_id,
+            orden,
+            siguiente is not None,
+        )
+        return tareas, siguiente
+    except ValueError as e:
+        logger.warning(f"Paginación de tareas rechazada: {str(e)}")
+        raise
+    except Exception as e:
+        logger.error(f"Error al paginar tareas del miembro {miembro_id}: {str(e)}")
+        raise
+
+
 async def listar_tareas_por_evento(db: AsyncSession, evento_id: int):
     try:
-        logger.info(f"Listando tareas vinculadas al evento ID: {evento_id}")
+        logger.debug("Listando tareas vinculadas al evento ID: %s", evento_id)
         stmt = select(Tarea).where(Tarea.id_evento == evento_id, Tarea.estado == True)
         result = await db.execute(stmt)
         tareas = result.scalars().all()
-        logger.info(f"Se encontraron {len(tareas)} tareas para el evento {evento_id}")
+        logger.info(
+            "Se encontraron %s tareas para el evento %s", len(tareas), evento_id
+        )
         return tareas
     except Exception as e:
         logger.error(f"Error al listar tareas del evento {evento_id}: {str(e)}")
@@ -97,7 +217,7 @@ async def listar_tareas_por_evento(db: AsyncSession, evento_id: int):
 
 async def listar_tareas_por_tipo(db: AsyncSession, tipo_tarea: str, hogar_id: int):
     try:
-        logger.info(f"Listando tareas de tipo '{tipo_tarea}' en hogar {hogar_id}")
+        logger.debug("Listando tareas de tipo '%s' en hogar %s", tipo_tarea, hogar_id)
         # ¡OJO! Su DDL no tiene 'tipo_tarea' en la tabla 'tareas', tiene 'categoria'
         # Voy a asumir que se refería a 'categoria'
         stmt = select(Tarea).where(
@@ -107,7 +227,7 @@ async def listar_tareas_por_tipo(db: AsyncSession, tipo_tarea: str, hogar_id: in
         )
         result = await db.execute(stmt)
         tareas = result.scalars().all()
-        logger.info(f"Se encontraron {len(tareas)} tareas de tipo '{tipo_tarea}'")
+        logger.info("Se encontraron %s tareas de tipo '%s'", len(tareas), tipo_tarea)
         return tareas
     except Exception as e:
         logger.error(f"Error al filtrar tareas por tipo '{tipo_tarea}': {str(e)}")
@@ -0,0 +1,89 @@
+"""
+Cliente WebSocket en proceso para las pruebas y los benchmarks: habla ASGI
+directamente con la app (sin servidor ni sockets reales), así que miles de
+conexiones cuestan solo unas colas y una tarea cada una.
+"""
+
+import asyncio
+from urllib.parse import urlencode
+
+
+class ConexionRechazada(Exception):
+    def __init__(self, codigo: int):
+        super().__init__(f"WebSocket rechazado con código {codigo}")
+        self.codigo = codigo
+
+
+class ClienteWS:
+    def __init__(self, app, ruta: str = "/ws/chat", subprotocolos=(), **query):
+        self.app = app
+        self.ruta = ruta
+        self.query = query
+        self.subprotocolos = list(subprotocolos)
+        self.subprotocolo = None
+        self._entrada: asyncio.Queue = asyncio.Queue()
+        self._salida: asyncio.Queue = asyncio.Queue()
+        self._tarea = None
+        self.cerrado = False
+        self.codigo_cierre = None
+
+    async def conectar(self):
+        scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": self.ruta,
+            "raw_path": self.ruta.encode(),
+            "query_string": urlencode(self.query).encode(),
+            "headers": [(b"host", b"testserver")],
+            "client": ("127.0.0.1", 0),
+            "server": ("testserver", 80),
+            "subprotocols": self.subprotocolos,
+            "state": {},
+        }
+        self._tarea = asyncio.create_task(
+            self.app(scope, self._entrada.get, self._salida.put)
+        )
+        await self._entrada.put({"type": "websocket.connect"})
+        evento = await self._siguiente_evento()
+        if evento["type"] == "websocket.close":
+            self.cerrado = True
+            self.codigo_cierre = evento.get("code", 1000)
+            raise ConexionRechazada(self.codigo_cierre)
+        assert evento["type"] == "websocket.accept", evento
+        self.subprotocolo = evento.get("subprotocol")
+
+    async def _siguiente_evento(self) -> dict:
+        # Si la app termina (o falla) sin enviar nada, se propaga su error
+        lectura = asyncio.ensure_future(self._salida.get())
+        await asyncio.wait({lectura, self._tarea}, return_when=asyncio.FIRST_COMPLETED)
+        if lectura.done():
+            return lectura.result()
+        lectura.cancel()
+        self._tarea.result()
+        return {"type": "websocket.close", "code": 1006}
+
+    async def enviar(self, texto: str):
+        await self._entrada.put({"type": "websocket.receive", "text": texto})
+
+    async def recibir(self, timeout: float | None = None):
+        """Siguiente frame enviado por el servidor (texto o bytes)."""
+        evento = await asyncio.wait_for(self._siguiente_evento(), timeout)
+        if evento["type"] == "websocket.close":
+            self.cerrado = True
+            self.codigo_cierre = evento.get("code", 1000)
+            raise ConexionRechazada(self.codigo_cierre)
+        if evento.get("bytes") is not None:
+            return evento["bytes"]
+        return evento.get("text")
+
+    async def cerrar(self):
+        if self._tarea is None:
+            return
+        await self._entrada.put({"type": "websocket.disconnect", "code": 1000})
+        try:
+            await asyncio.wait_for(self._tarea, 5)
+        except Exception:
+            self._tarea.cancel()
+        self._tarea = None
+        self.cerrado = True
@@ -1,5 +1,6 @@
 import pytest
 import pytest_asyncio
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
@@ -48,6 +49,27 @@ async def db():
 # --- FIN DE LA MODIFICACIÓN ---
 
 
+@pytest.fixture(autouse=True)
+def limpiar_caches():
+    """
+    Las cachés en memoria sobreviven entre tests (son por proceso), pero cada
+    test recrea la BD con los mismos IDs: se vacían antes de cada test.
+    """
+    from utils.auth import cache_principales
+    from services.permiso_service import matriz_permisos
+    from services.atributo_service import cache_catalogos
+    from services.mensaje_service import cache_sesiones_tarea
+    from websocket.chat_manager import manager
+
+    cache_principales.limpiar()
+    cache_sesiones_tarea.limpiar()
+    matriz_permisos.invalidar()
+    cache_catalogos.limpiar()
+    manager.recientes.limpiar()
+    manager.presencia.limpiar()
+    yield
+
+
 @pytest_asyncio.fixture(scope="function")
 async def setup_rol_hogar(db: AsyncSession):  # ¡Recibe la nueva fixture 'db'!
     """Fixture compartida para crear Rol y Hogar base en cada test"""
@@ -79,6 +101,23 @@ async def setup_rol_hogar(db: AsyncSession):  # ¡Recibe la nueva fixture 'db'!
     return {"rol": rol, "hogar": hogar}
 
 
+@pytest.fixture
+def contador_consultas():
+    """
+    Hook para contar las sentencias SQL que llegan al motor de test.
+    Devuelve la lista de sentencias ejecutadas; se puede vaciar con .clear()
+    entre peticiones para medir solo un tramo (p. ej. el camino de auth).
+    """
+    consultas = []
+
+    def _registrar(conn, cursor, statement, parameters, context, executemany):
+        consultas.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _registrar)
+    yield consultas
+    event.remove(engine.sync_engine, "before_cursor_execute", _registrar)
+
+
 # -----------------------------------------------------------------------------------------------------
 # # tests/conftest.py generado por cursor
 # import pytest
@@ -0,0 +1,85 @@
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import main
+import db.database as database
+from config.config import settings
+from db.database import crear_motor, calentar_pool
+from db.migraciones import aplicar_migraciones, esquema_al_dia
+
+
+@pytest.mark.asyncio
+async def test_huella_del_esquema(tmp_path):
+    motor = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'huella.db'}")
+    try:
+        # BD anterior a la huella: no está al día
+        async with motor.connect() as conn:
+            assert await conn.run_sync(esquema_al_dia) is False
+
+        async with motor.begin() as conn:
+            await conn.run_sync(aplicar_migraciones)
+        async with motor.connect() as conn:
+            assert await conn.run_sync(esquema_al_dia) is True
+
+        # Huella distinta (p. ej. modelos cambiados sin migrar): no está al día
+        async with motor.begin() as conn:
+            await conn.execute(text("UPDATE schema_huella SET huella = 'otra'"))
+        async with motor.connect() as conn:
+            assert await conn.run_sync(esquema_al_dia) is False
+    finally:
+        await motor.dispose()
+
+
+@pytest.mark.asyncio
+async def test_calentar_pool_abre_las_conexiones_minimas(tmp_path):
+    motor = crear_motor(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", "test")
+    try:
+        assert motor.pool.checkedin() == 0
+        assert await calentar_pool(motor, minimo=2) == 2
+        assert motor.pool.checkedin() == 2
+        assert motor.pool.checkedout() == 0
+    finally:
+        await motor.dispose()
+
+
+@pytest.mark.asyncio
+async def test_arranque_rapido_omite_el_ddl(tmp_path, monkeypatch):
+    motor = crear_motor(f"sqlite+aiosqlite:///{tmp_path / 'arranque.db'}", "test")
+    sesiones = sessionmaker(motor, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(main, "engine", motor)
+    monkeypatch.setattr(main, "AsyncSessionLocal", sesiones)
+    monkeypatch.setattr(database, "engine", motor)
+    monkeypatch.setattr(settings, "ARRANQUE_MODO", "rapido")
+
+    sentencias = []
+
+    def _registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement.lstrip().upper())
+
+    event.listen(motor.sync_engine, "before_cursor_execute", _registrar)
+    app = FastAPI()
+    try:
+        # Primer arranque: BD vacía, se crea el esquema y se guarda la huella
+        await main.arrancar(app)
+        assert any(s.startswith("CREATE") for s in sentencias)
+
+        # Segundo arranque: huella al día, ni DDL ni reflexión (PRAGMA)
+        sentencias.clear()
+        await main.arrancar(app)
+        assert not any(s.startswith(("CREATE", "PRAGMA")) for s in sentencias)
+    finally:
+        event.remove(motor.sync_engine, "before_cursor_execute", _registrar)
+        await motor.dispose()
+
+    assert set(app.state.arranque) == {
+        "modo",
+        "esquema",
+        "pool",
+        "permisos",
+        "catalogos",
+        "chat",
+        "total",
+    }
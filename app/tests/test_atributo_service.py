@@ -46,3 +46,17 @@ async def test_eliminar_atributo_logico(db):
     assert all(a.id != creado.id for a in activos)
 
 
+@pytest.mark.asyncio
+async def test_catalogo_de_atributos_en_cache(db, contador_consultas):
+    creado = await crear_atributo(db, "Color", "Color favorito", "VARCHAR")
+    await listar_atributos_activos(db)
+
+    # Segunda lectura: servida desde la caché, sin SQL
+    contador_consultas.clear()
+    lista = await listar_atributos_activos(db)
+    assert [a.id for a in lista] == [creado.id]
+    assert contador_consultas == []
+
+    # Un cambio invalida el catálogo
+    await eliminar_atributo_logico(db, creado.id)
+    assert await listar_atributos_activos(db) == []
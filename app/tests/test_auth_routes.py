@@ -173,3 +173,166 @@ async def test_registro_validacion_contrasena_corta(client, setup_datos_auth):
 
     # FastAPI debería validar el schema y retornar 422
     assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_emite_nuevo_access_token(client, setup_datos_auth):
+    """El refresh token del login se canjea por un access token válido"""
+    login = await client.post(
+        "/auth/login",
+        json={
+            "correo_electronico": "test_auth@example.com",
+            "contrasena": setup_datos_auth["contrasena"],
+        },
+    )
+    assert login.status_code == 200
+    refresh_token = login.json()["refresh_token"]
+    assert refresh_token
+
+    response = await client.post("/auth/refresh", json={"refresh_token": refresh_token})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["access_token"]
+    assert data["id_miembro"] == setup_datos_auth["miembro"].id
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_no_sirve_como_access_token(client, setup_datos_auth):
+    """Un refresh token no autentica rutas protegidas, y un access no refresca"""
+    login = await client.post(
+        "/auth/login",
+        json={
+            "correo_electronico": "test_auth@example.com",
+            "contrasena": setup_datos_auth["contrasena"],
+        },
+    )
+    tokens = login.json()
+
+    headers = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+    response = await client.get("/tareas/mias/", headers=headers)
+    assert response.status_code == 401
+
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": tokens["access_token"]}
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_refresh_rechazado_si_miembro_inactivo(client, db, setup_datos_auth):
+    """La revocación se aplica al refrescar: un miembro desactivado no renueva"""
+    login = await client.post(
+        "/auth/login",
+        json={
+            "correo_electronico": "test_auth@example.com",
+            "contrasena": setup_datos_auth["contrasena"],
+        },
+    )
+    refresh_token = login.json()["refresh_token"]
+
+    setup_datos_auth["miembro"].estado = False
+    await db.flush()
+
+    response = await client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_token_con_permisos_embebidos(client, db, setup_datos_auth, monkeypatch):
+    """En modo 'permisos' el token trae máscaras y huella y autoriza con ellas"""
+    from jose import jwt
+    from config.config import settings
+    from models.modulo import Modulo
+    from models.permiso import Permiso
+
+    monkeypatch.setattr(settings, "TOKEN_MODO", "permisos")
+    modulo = Modulo(nombre="Tareas", descripcion="Módulo de Tareas")
+    db.add(modulo)
+    await db.flush()
+    db.add(Permiso(id_rol=1, id_modulo=modulo.id, puede_leer=True))
+    await db.flush()
+
+    login = await client.post(
+        "/auth/login",
+        json={
+            "correo_electronico": "test_auth@example.com",
+            "contrasena": setup_datos_auth["contrasena"],
+        },
+    )
+    token = login.json()["access_token"]
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+    assert payload["perm"] == {"Tareas": 2}
+    assert payload["pv"]
+    assert payload["id_rol"] == 1
+
+    # Autorizado por el token (404 porque la tarea no existe, no 403)
+    headers = {"Authorization": f"Bearer {token}"}
+    response = await client.get("/tareas/999", headers=headers)
+    assert response.status_code == 404
+
+    # Si la matriz cambia, la huella del token deja de coincidir y se decide
+    # con la matriz recargada: el permiso retirado ya no autoriza
+    from sqlalchemy import update
+    from services.permiso_service import matriz_permisos
+
+    await db.execute(update(Permiso).values(puede_leer=False))
+    await db.flush()
+    matriz_permisos.invalidar()
+    response = await client.get("/tareas/999", headers=headers)
+    assert response.status_code == 403
+    assert matriz_permisos.vigente
+    assert payload["pv"] != matriz_permisos.huella
+
+
+@pytest.mark.asyncio
+async def test_token_con_permisos_de_miembro_desactivado(
+    client, db, setup_datos_auth, monkeypatch
+):
+    """Un token en modo 'permisos' no sirve a un miembro ya desactivado"""
+    from config.config import settings
+    from utils.auth import invalidar_principal
+
+    monkeypatch.setattr(settings, "TOKEN_MODO", "permisos")
+    login = await client.post(
+        "/auth/login",
+        json={
+            "correo_electronico": "test_auth@example.com",
+            "contrasena": setup_datos_auth["contrasena"],
+        },
+    )
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    miembro = setup_datos_auth["miembro"]
+    miembro.estado = False
+    await db.flush()
+    invalidar_principal(miembro.id)
+
+    response = await client.get("/tareas/999", headers=headers)
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_es_de_un_solo_uso(client, setup_datos_auth):
+    """Al canjearlo queda revocado: reutilizarlo no emite más tokens"""
+    login = await client.post(
+        "/auth/login",
+        json={
+            "correo_electronico": "test_auth@example.com",
+            "contrasena": setup_datos_auth["contrasena"],
+        },
+    )
+    refresh_token = login.json()["refresh_token"]
+
+    primera = await client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert primera.status_code == 200
+    nuevo = primera.json()["refresh_token"]
+    assert nuevo != refresh_token
+
+    repetida = await client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert repetida.status_code == 401
+
+    # El refresh rotado sí sirve
+    response = await client.post("/auth/refresh", json={"refresh_token": nuevo})
+    assert response.status_code == 200
@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+
+from websocket.broker import Broker, BrokerEnProceso, BrokerSQLite, crear_broker
+from websocket.chat_manager import ConnectionManager
+from tests.test_chat_manager import SocketFalso
+
+
+async def _esperar(condicion, segundos: float = 2.0):
+    for _ in range(int(segundos / 0.01)):
+        if condicion():
+            return
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_broker_sqlite_entrega_entre_workers(tmp_path):
+    """Dos managers (dos "workers") sobre el mismo relay: todos reciben una vez"""
+    ruta = str(tmp_path / "relay.db")
+    worker_a = ConnectionManager(broker=BrokerSQLite(ruta, intervalo_sondeo=0.01))
+    worker_b = ConnectionManager(broker=BrokerSQLite(ruta, intervalo_sondeo=0.01))
+    await worker_a.iniciar()
+    await worker_b.iniciar()
+    try:
+        en_a, en_b, otro_hogar = SocketFalso(), SocketFalso(), SocketFalso()
+        await worker_a.connect(en_a, 1)
+        await worker_b.connect(en_b, 1)
+        await worker_b.connect(otro_hogar, 2)
+
+        await worker_a.broadcast({"id": 1, "contenido": "hola"}, 1)
+        await _esperar(lambda: en_a.recibidos and en_b.recibidos)
+        await asyncio.sleep(0.05)
+
+        assert en_a.recibidos == [{"id": 1, "contenido": "hola"}]
+        assert en_b.recibidos == [{"id": 1, "contenido": "hola"}]
+        assert otro_hogar.recibidos == []
+    finally:
+        await worker_a.cerrar()
+        await worker_b.cerrar()
+
+
+@pytest.mark.asyncio
+async def test_presencia_compartida_entre_workers(tmp_path):
+    ruta = str(tmp_path / "relay.db")
+    worker_a = ConnectionManager(broker=BrokerSQLite(ruta, intervalo_sondeo=0.01))
+    worker_b = ConnectionManager(broker=BrokerSQLite(ruta, intervalo_sondeo=0.01))
+    await worker_a.iniciar()
+    await worker_b.iniciar()
+    try:
+        socket = SocketFalso()
+        await worker_a.connect(socket, 1, miembro_id=7)
+        await _esperar(lambda: worker_b.presencia.de_hogar(1))
+        assert worker_b.presencia.de_hogar(1)[0]["en_linea"] is True
+
+        worker_a.disconnect(socket, 1)
+        await _esperar(lambda: not worker_b.presencia.de_hogar(1)[0]["en_linea"])
+        assert worker_b.presencia.de_hogar(1)[0]["en_linea"] is False
+    finally:
+        await worker_a.cerrar()
+        await worker_b.cerrar()
+
+
+@pytest.mark.asyncio
+async def test_broker_sqlite_no_reemite_lo_anterior_al_arranque(tmp_path):
+    ruta = str(tmp_path / "relay.db")
+    previo = BrokerSQLite(ruta)
+    await previo.iniciar(lambda hogar_id, mensaje: None)
+    await previo.publicar(1, {"id": 1})
+    await previo.cerrar()
+
+    recibidos = []
+    nuevo = BrokerSQLite(ruta, intervalo_sondeo=0.01)
+    await nuevo.iniciar(lambda hogar_id, mensaje: recibidos.append(mensaje))
+    await asyncio.sleep(0.05)
+    await nuevo.cerrar()
+
+    assert recibidos == []
+
+
+def test_crear_broker():
+    assert isinstance(crear_broker("proceso"), BrokerEnProceso)
+    with pytest.raises(ValueError):
+        crear_broker("redis")
+
+
+def test_un_broker_debe_implementar_toda_la_interfaz():
+    class SinPublicar(Broker):
+        async def iniciar(self, entregar):
+            pass
+
+        async def cerrar(self):
+            pass
+
+    with pytest.raises(TypeError):
+        SinPublicar()
@@ -0,0 +1,79 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.miembro import Miembro
+from services.miembro_service import desactivar_miembro, actualizar_miembro
+from utils.auth import resolver_principal, cache_principales
+from utils.cache import CacheTTL
+
+
+def test_cache_ttl_lru_y_contadores():
+    cache = CacheTTL(max_entradas=2, ttl=60)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    assert cache.obtener("a") == 1  # 'a' pasa a ser la más reciente
+    cache.guardar("c", 3)  # desaloja 'b'
+
+    assert cache.obtener("b") is None
+    assert cache.obtener("c") == 3
+    metricas = cache.metricas()
+    assert metricas["hits"] == 2
+    assert metricas["misses"] == 1
+    assert metricas["desalojos"] == 1
+
+
+def test_cache_ttl_expira():
+    cache = CacheTTL(max_entradas=10, ttl=-1)
+    cache.guardar("a", 1)
+    assert cache.obtener("a") is None
+    assert len(cache) == 0
+
+
+@pytest_asyncio.fixture
+async def miembro_activo(db: AsyncSession, setup_rol_hogar):
+    miembro = Miembro(
+        id=1,
+        nombre_completo="Principal Test",
+        correo_electronico="principal@example.com",
+        contrasena_hash="123",
+        id_rol=1,
+        id_hogar=1,
+        estado=True,
+    )
+    db.add(miembro)
+    await db.flush()
+    return miembro
+
+
+@pytest.mark.asyncio
+async def test_resolver_principal_usa_cache(db: AsyncSession, miembro_activo):
+    """La segunda resolución sale de la caché sin tocar la BD"""
+    principal = await resolver_principal(db, 1)
+    assert principal.id == 1 and principal.id_hogar == 1 and principal.id_rol == 1
+    hits = cache_principales.metricas()["hits"]
+
+    # Si se consultara la BD veríamos el cambio; la caché devuelve la instantánea
+    miembro_activo.id_hogar = 99
+    await db.flush()
+    cacheado = await resolver_principal(db, 1)
+
+    assert cacheado is principal
+    assert cache_principales.metricas()["hits"] == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_desactivar_miembro_invalida_principal(db: AsyncSession, miembro_activo):
+    assert await resolver_principal(db, 1) is not None
+
+    assert await desactivar_miembro(db, 1) is True
+
+    assert await resolver_principal(db, 1) is None
+
+
+@pytest.mark.asyncio
+async def test_actualizar_miembro_invalida_principal(db: AsyncSession, miembro_activo):
+    assert (await resolver_principal(db, 1)).nombre_completo == "Principal Test"
+
+    await actualizar_miembro(db, 1, {"nombre_completo": "Nombre Nuevo"})
+
+    assert (await resolver_principal(db, 1)).nombre_completo == "Nombre Nuevo"
@@ -0,0 +1,24 @@
+import pytest
+
+from benchmarks.bench_carga_chat import ejecutar
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("modo", ["sincrona", "diferida"])
+async def test_prueba_de_carga_entrega_todo_y_mide(tmp_path, modo):
+    r = await ejecutar(
+        clientes=60,
+        hogares=3,
+        tasa=100,
+        duracion=0.3,
+        ruta_bd=str(tmp_path / "carga.db"),
+        modo_persistencia=modo,
+    )
+
+    assert r["mensajes"] == 30
+    # Cada mensaje llega a los 20 miembros de su hogar, remitente incluido
+    assert r["entregas"] == r["entregas_esperadas"] == 30 * 20
+    assert r["descartados"] == 0
+    assert 0 < r["latencia_ms"][50] <= r["latencia_ms"][99] <= r["latencia_ms"]["max"]
+    assert r["lag_ms"]["max"] >= 0
+    assert r["rss_mb"]["max"] > 0
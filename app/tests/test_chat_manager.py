@@ -0,0 +1,391 @@
+import asyncio
+import json
+import time
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from main import app
+from websocket.chat_manager import ConnectionManager
+
+
+class SocketFalso:
+    """Sustituto mínimo de WebSocket: registra lo enviado y simula latencia o fallos"""
+
+    def __init__(self, retraso: float = 0.0, roto: bool = False, subprotocolos=()):
+        self.retraso = retraso
+        self.roto = roto
+        self.recibidos = []
+        self.frames = []
+        self.cerrado = False
+        self.scope = {"subprotocols": list(subprotocolos)}
+        self.subprotocolo = None
+
+    async def accept(self, subprotocol=None):
+        self.subprotocolo = subprotocol
+
+    async def send_text(self, texto):
+        if self.roto:
+            raise RuntimeError("socket roto")
+        await asyncio.sleep(self.retraso)
+        self.frames.append(texto)
+        self.recibidos.append(json.loads(texto))
+
+    async def send_bytes(self, datos):
+        await asyncio.sleep(self.retraso)
+        self.frames.append(datos)
+
+    async def close(self, code: int = 1000):
+        self.cerrado = True
+
+
+class SocketAtascado(SocketFalso):
+    """Cliente que deja de leer: el primer envío no termina nunca"""
+
+    async def send_text(self, texto):
+        await asyncio.Event().wait()
+
+
+async def _drenar(manager):
+    """Espera a que las tareas escritoras vacíen todas las colas"""
+    for _ in range(100):
+        if not any(s.cola for s in manager._salientes.values()):
+            break
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_llega_a_toda_la_sala_y_no_a_otras():
+    manager = ConnectionManager()
+    a, b, otro = SocketFalso(), SocketFalso(), SocketFalso()
+    await manager.connect(a, 1)
+    await manager.connect(b, 1)
+    await manager.connect(otro, 2)
+
+    await manager.broadcast({"contenido": "hola"}, 1)
+    await _drenar(manager)
+
+    assert a.recibidos == b.recibidos == [{"contenido": "hola"}]
+    assert otro.recibidos == []
+
+
+@pytest.mark.asyncio
+async def test_broadcast_codifica_una_vez_por_formato(monkeypatch):
+    import websocket.codificacion as codificacion
+
+    llamadas = []
+
+    def contar(formato):
+        original = codificacion.CODIFICADORES[formato]
+
+        def codificador(mensaje):
+            llamadas.append(formato)
+            return original(mensaje)
+
+        monkeypatch.setitem(codificacion.CODIFICADORES, formato, codificador)
+
+    contar("json")
+    contar("msgpack")
+    manager = ConnectionManager()
+    texto = [SocketFalso() for _ in range(5)]
+    binario = [SocketFalso(subprotocolos=["msgpack"]) for _ in range(5)]
+    for ws in texto + binario:
+        await manager.connect(ws, 1)
+
+    await manager.broadcast({"id": 1, "contenido": "hola"}, 1)
+    await _drenar(manager)
+
+    assert sorted(llamadas) == ["json", "msgpack"]
+    # El mismo objeto para toda la sala, no una copia por socket
+    assert len({id(ws.frames[0]) for ws in texto}) == 1
+    assert len({id(ws.frames[0]) for ws in binario}) == 1
+    assert texto[0].frames[0] == '{"id":1,"contenido":"hola"}'
+    assert binario[0].frames[0] == b"\x82\xa2id\x01\xa9contenido\xa4hola"
+
+
+@pytest.mark.asyncio
+async def test_subprotocolo_negociado_al_conectar():
+    manager = ConnectionManager()
+    binario = SocketFalso(subprotocolos=["otro", "msgpack"])
+    texto = SocketFalso(subprotocolos=["json"])
+    sin_subprotocolo = SocketFalso()
+    for ws in (binario, texto, sin_subprotocolo):
+        await manager.connect(ws, 1)
+
+    assert binario.subprotocolo == "msgpack"
+    assert texto.subprotocolo == "json"
+    assert sin_subprotocolo.subprotocolo is None
+
+
+@pytest.mark.asyncio
+async def test_socket_lento_no_retrasa_a_los_demas():
+    manager = ConnectionManager(timeout_envio=0.2)
+    lento = SocketFalso(retraso=5)
+    rapidos = [SocketFalso() for _ in range(5)]
+    for ws in [lento, *rapidos]:
+        await manager.connect(ws, 1)
+
+    inicio = time.perf_counter()
+    await manager.broadcast({"contenido": "hola"}, 1)
+    duracion = time.perf_counter() - inicio
+
+    # El emisor solo encola: no espera a ningún socket
+    assert duracion < 0.05
+    await _drenar(manager)
+    assert all(ws.recibidos for ws in rapidos)
+    # El lento agota el timeout en su tarea escritora: se poda y se cierra
+    await asyncio.sleep(0.3)
+    assert lento not in manager.active_connections[1]
+    assert lento.cerrado
+
+
+@pytest.mark.asyncio
+async def test_socket_roto_se_poda_sin_cortar_el_broadcast():
+    manager = ConnectionManager()
+    roto, sano = SocketFalso(roto=True), SocketFalso()
+    await manager.connect(roto, 1)
+    await manager.connect(sano, 1)
+
+    await manager.broadcast({"contenido": "hola"}, 1)
+    await _drenar(manager)
+
+    assert sano.recibidos == [{"contenido": "hola"}]
+    assert manager.active_connections[1] == {sano}
+    assert manager.metricas()[1]["podadas"] == 1
+
+    # Desconectar algo ya podado no falla, y la sala vacía desaparece
+    manager.disconnect(roto, 1)
+    manager.disconnect(sano, 1)
+    assert 1 not in manager.active_connections
+
+
+async def _saturar(politica):
+    manager = ConnectionManager(
+        timeout_envio=10, max_cola=3, politica_cola_llena=politica
+    )
+    atascado, sano = SocketAtascado(), SocketFalso()
+    await manager.connect(atascado, 1)
+    await manager.connect(sano, 1)
+    for n in range(10):
+        await manager.broadcast({"id": n}, 1)
+        # Un cliente sano va al día; el atascado acumula
+        await asyncio.sleep(0.005)
+    await _drenar_sano(manager, sano)
+    return manager, atascado, sano
+
+
+async def _drenar_sano(manager, sano):
+    for _ in range(100):
+        if len(sano.recibidos) == 10:
+            return
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_cola_llena_descarta_los_mas_antiguos():
+    manager, atascado, sano = await _saturar("descartar_antiguo")
+
+    # El cliente sano recibe todo; el atascado conserva solo los 3 últimos
+    assert [m["id"] for m in sano.recibidos] == list(range(10))
+    cola = manager._salientes[atascado].cola
+    assert [m["id"] for m in cola] == [7, 8, 9]
+    metricas = manager.metricas()[1]
+    assert metricas["descartados"] == 6  # el mensaje 0 está "en vuelo"
+    assert metricas["cola_max"] == 3
+    manager.disconnect(atascado, 1)
+
+
+@pytest.mark.asyncio
+async def test_cola_llena_fusiona_en_aviso_de_resincronizacion():
+    manager, atascado, _ = await _saturar("fusionar")
+
+    cola = list(manager._salientes[atascado].cola)
+    assert len(cola) <= 3
+    assert cola[0]["tipo"] == "resincronizar"
+    assert cola[0]["descartados"] == manager.metricas()[1]["descartados"] > 0
+    assert cola[-1] == {"id": 9}
+    manager.disconnect(atascado, 1)
+
+
+@pytest.mark.asyncio
+async def test_cola_llena_desconecta_al_cliente_lento():
+    manager, atascado, sano = await _saturar("desconectar")
+    await asyncio.sleep(0.01)
+
+    assert manager.active_connections[1] == {sano}
+    assert atascado.cerrado
+    assert manager.metricas()[1]["desconexiones_lentas"] == 1
+
+
+@pytest.mark.asyncio
+async def test_tarea_escritora_termina_al_desconectar_durante_un_envio():
+    """La escritora no queda viva aunque la desconexión coincida con un envío"""
+    manager = ConnectionManager()
+
+    class SocketQueSeVa(SocketFalso):
+        async def send_text(self, texto):
+            await super().send_text(texto)
+            manager.disconnect(self, 1)
+
+    socket = SocketQueSeVa()
+    await manager.connect(socket, 1)
+    escritora = manager._salientes[socket].tarea
+    await manager.broadcast({"id": 1}, 1)
+    await manager.broadcast({"id": 2}, 1)
+
+    await asyncio.wait_for(escritora, 1)
+    assert socket.recibidos == [{"id": 1}]
+
+
+@pytest.mark.asyncio
+async def test_reconexion_reenvia_lo_perdido_desde_el_bufer():
+    manager = ConnectionManager()
+    presente = SocketFalso()
+    await manager.connect(presente, 1)
+    for n in (1, 2, 3):
+        await manager.broadcast({"id": n, "contenido": f"m{n}"}, 1)
+
+    async def recuperar(*args):
+        raise AssertionError("no debería consultar la BD")
+
+    vuelve = SocketFalso()
+    await manager.connect(vuelve, 1, ultimo_id=1, recuperar=recuperar)
+    await _drenar(manager)
+
+    assert [m["id"] for m in vuelve.recibidos] == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_reconexion_sin_el_id_en_memoria_recupera_de_la_bd():
+    """Lo recuperado va antes que lo que llega en vivo mientras se consulta"""
+    manager = ConnectionManager()
+    llamadas = []
+
+    async def recuperar(hogar_id, ultimo_id, limite):
+        llamadas.append((hogar_id, ultimo_id, limite))
+        await manager.broadcast({"id": 52}, 1)
+        return [{"id": 50}, {"id": 51}, {"id": 52}]
+
+    vuelve = SocketFalso()
+    await manager.connect(vuelve, 1, ultimo_id=49, recuperar=recuperar)
+    await _drenar(manager)
+
+    assert llamadas == [(1, 49, manager.max_cola + 1)]
+    assert [m["id"] for m in vuelve.recibidos] == [50, 51, 52]
+
+
+@pytest.mark.asyncio
+async def test_reconexion_con_hueco_mayor_que_la_cola_avisa_de_resincronizar():
+    manager = ConnectionManager(max_cola=3)
+
+    async def recuperar(hogar_id, ultimo_id, limite):
+        return [{"id": n} for n in range(limite)]
+
+    vuelve = SocketFalso()
+    await manager.connect(vuelve, 1, ultimo_id=7, recuperar=recuperar)
+    await _drenar(manager)
+
+    assert vuelve.recibidos == [
+        {"id": 0},
+        {"id": 1},
+        {"tipo": "resincronizar", "descartados": 2},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_reconexion_sin_recuperacion_posible_avisa_de_resincronizar():
+    manager = ConnectionManager()
+    vuelve = SocketFalso()
+    await manager.connect(vuelve, 1, ultimo_id=7)
+    await _drenar(manager)
+
+    assert vuelve.recibidos == [{"tipo": "resincronizar", "descartados": 0}]
+
+
+@pytest.mark.asyncio
+async def test_latido_solo_a_quien_lleva_un_intervalo_callado():
+    manager = ConnectionManager(intervalo_latido=10, timeout_inactividad=30)
+    callado, activo = SocketFalso(), SocketFalso()
+    await manager.connect(callado, 1)
+    await manager.connect(activo, 1)
+    ahora = time.monotonic() + 15
+    manager._salientes[activo].ultima_actividad = ahora
+
+    manager.revisar_inactividad(ahora)
+    await _drenar(manager)
+
+    assert callado.recibidos == [{"tipo": "ping"}]
+    assert activo.recibidos == []
+
+
+@pytest.mark.asyncio
+async def test_conexion_inactiva_se_desaloja_aunque_los_envios_funcionen():
+    manager = ConnectionManager(intervalo_latido=10, timeout_inactividad=30)
+    medio_abierto = SocketFalso()
+    await manager.connect(medio_abierto, 1, miembro_id=7)
+
+    manager.revisar_inactividad(time.monotonic() + 31)
+    await asyncio.sleep(0.01)
+
+    assert 1 not in manager.active_connections
+    assert medio_abierto.cerrado
+    assert manager.metricas()[1]["inactivas"] == 1
+    assert manager.presencia.de_hogar(1)[0]["en_linea"] is False
+
+
+@pytest.mark.asyncio
+async def test_vigilante_desaloja_en_segundo_plano():
+    manager = ConnectionManager(intervalo_latido=0.02, timeout_inactividad=0.05)
+    await manager.iniciar()
+    try:
+        socket = SocketFalso()
+        await manager.connect(socket, 1)
+        await asyncio.sleep(0.2)
+        assert {"tipo": "ping"} in socket.recibidos
+        assert 1 not in manager.active_connections
+    finally:
+        await manager.cerrar()
+
+
+@pytest.mark.asyncio
+async def test_presencia_por_miembro_con_varias_conexiones():
+    manager = ConnectionManager()
+    movil, portatil, otro = SocketFalso(), SocketFalso(), SocketFalso()
+    await manager.connect(movil, 1, miembro_id=7)
+    await manager.connect(portatil, 1, miembro_id=7)
+    await manager.connect(otro, 1, miembro_id=8)
+
+    manager.disconnect(movil, 1)
+    manager.disconnect(otro, 1)
+    manager.disconnect(otro, 1)  # idempotente: no descuenta dos veces
+    presencia = {m["id_miembro"]: m for m in manager.presencia.de_hogar(1)}
+
+    assert presencia[7]["en_linea"] is True
+    assert presencia[8]["en_linea"] is False
+    assert manager.presencia.de_hogar(1)[0]["id_miembro"] == 7
+    assert manager.presencia.de_hogar(2) == []
+
+
+@pytest.mark.asyncio
+async def test_memoria_por_conexion():
+    manager = ConnectionManager()
+    for _ in range(3):
+        await manager.connect(SocketFalso(), 1)
+
+    memoria = manager.memoria()
+    assert memoria["conexiones"] == 3
+    assert 0 < memoria["bytes_por_conexion"] < 10_000
+
+
+def test_politica_desconocida_falla():
+    with pytest.raises(ValueError):
+        ConnectionManager(politica_cola_llena="ignorar")
+
+
+def test_endpoint_de_chat_montado_rechaza_token_invalido():
+    with TestClient(app) as client:
+        with pytest.raises(WebSocketDisconnect) as exc:
+            with client.websocket_connect("/ws/chat?token=invalido") as ws:
+                ws.receive_text()
+    assert exc.value.code == 4001
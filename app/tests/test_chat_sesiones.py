@@ -0,0 +1,108 @@
+import asyncio
+import json
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+import websocket.chat as chat
+from tests.cliente_ws import ClienteWS
+from db.database import Base, crear_motor
+from main import app
+from models.hogar import Hogar
+from models.mensaje import Mensaje
+from models.miembro import Miembro
+from models.rol import Rol
+from models.secuencia import Secuencia  # noqa: F401  (tabla en Base.metadata)
+from utils.security import crear_token_acceso
+
+SOCKETS = 20
+
+
+@pytest_asyncio.fixture
+async def motor(tmp_path, monkeypatch):
+    """BD en fichero con el pool del perfil "test" (2 conexiones, sin overflow)"""
+    motor = crear_motor(f"sqlite+aiosqlite:///{tmp_path / 'ws.db'}", "test")
+    async with motor.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Rol.__table__), [{"id": 1, "nombre": "Usuario"}])
+        await conn.execute(insert(Hogar.__table__), [{"id": 1, "nombre": "Hogar"}])
+        await conn.execute(
+            insert(Miembro.__table__),
+            [
+                {
+                    "id": n,
+                    "nombre_completo": f"Miembro {n}",
+                    "correo_electronico": f"m{n}@test.com",
+                    "contrasena_hash": "x",
+                    "id_rol": 1,
+                    "id_hogar": 1,
+                    "estado": True,
+                }
+                for n in range(1, SOCKETS + 1)
+            ],
+        )
+    sesiones = sessionmaker(motor, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(chat, "AsyncSessionLocal", sesiones)
+    monkeypatch.setattr(chat.persistencia, "fabrica_sesiones", sesiones)
+    yield motor
+    await motor.dispose()
+
+
+@pytest.mark.asyncio
+async def test_sockets_inactivos_no_retienen_conexiones_del_pool(motor):
+    clientes = [
+        ClienteWS(app, token=crear_token_acceso({"sub": str(n)}))
+        for n in range(1, SOCKETS + 1)
+    ]
+    # Más sockets que conexiones en el pool: antes el tercero agotaba el pool
+    await asyncio.gather(*(c.conectar() for c in clientes))
+    try:
+        assert motor.pool.checkedout() == 0
+
+        await clientes[0].enviar(json.dumps({"contenido": "hola"}))
+        recibidos = [json.loads(await c.recibir(timeout=5)) for c in clientes]
+
+        assert {m["contenido"] for m in recibidos} == {"hola"}
+        assert motor.pool.checkedout() == 0
+        async with motor.connect() as conn:
+            assert await conn.scalar(select(func.count(Mensaje.id))) == 1
+    finally:
+        await asyncio.gather(*(c.cerrar() for c in clientes))
+
+    assert not chat.manager.active_connections.get(1)
+
+
+@pytest.mark.asyncio
+async def test_reconexion_con_last_id_desde_memoria_y_desde_la_bd(motor):
+    emisor = ClienteWS(app, token=crear_token_acceso({"sub": "1"}))
+    await emisor.conectar()
+    try:
+        enviados = []
+        for texto in ("uno", "dos", "tres"):
+            await emisor.enviar(json.dumps({"contenido": texto}))
+            enviados.append(json.loads(await emisor.recibir(timeout=5)))
+
+        primero = enviados[0]["id"]
+        desde_memoria = ClienteWS(
+            app, token=crear_token_acceso({"sub": "2"}), last_id=primero
+        )
+        await desde_memoria.conectar()
+        recibidos = [json.loads(await desde_memoria.recibir(timeout=5)) for _ in "12"]
+        await desde_memoria.cerrar()
+        assert recibidos == enviados[1:]
+
+        # Sin búfer (p. ej. otro worker recién arrancado): consulta keyset a la BD
+        chat.manager.recientes.limpiar()
+        desde_bd = ClienteWS(
+            app, token=crear_token_acceso({"sub": "2"}), last_id=primero
+        )
+        await desde_bd.conectar()
+        recibidos = [json.loads(await desde_bd.recibir(timeout=5)) for _ in "12"]
+        await desde_bd.cerrar()
+        assert [m["id"] for m in recibidos] == [m["id"] for m in enviados[1:]]
+        assert recibidos[0]["remitente"] == "Miembro 1"
+        assert recibidos[0]["id_remitente"] == 1
+    finally:
+        await emisor.cerrar()
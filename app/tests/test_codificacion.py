@@ -0,0 +1,36 @@
+import json
+import msgpack
+
+from websocket.codificacion import (
+    Trama,
+    codificar,
+    codificar_json,
+    codificar_msgpack,
+    negociar_subprotocolo,
+)
+
+
+def test_msgpack_ida_y_vuelta():
+    mensaje = {"id": 7, "remitente": "Ana Muñoz", "contenido": "¿Hola?", "fecha": None}
+    assert msgpack.unpackb(codificar_msgpack(mensaje)) == mensaje
+    assert codificar(Trama(mensaje), "msgpack") == codificar_msgpack(mensaje)
+
+
+def test_json_igual_que_send_json_de_starlette():
+    mensaje = {"id": 7, "remitente": "Ana Muñoz", "contenido": "¿Hola?", "fecha": None}
+    esperado = json.dumps(mensaje, separators=(",", ":"), ensure_ascii=False)
+    assert codificar_json(mensaje) == esperado
+    assert codificar(Trama(mensaje)) == esperado
+
+
+def test_trama_reutiliza_su_codificacion():
+    trama = Trama({"id": 1})
+    assert codificar(trama) is codificar(trama)
+    assert codificar(trama, "msgpack") is codificar(trama, "msgpack")
+
+
+def test_negociar_subprotocolo():
+    assert negociar_subprotocolo(["json", "msgpack"]) == "msgpack"
+    assert negociar_subprotocolo(["json"]) == "json"
+    assert negociar_subprotocolo(["v2.chat"]) is None
+    assert negociar_subprotocolo(None) is None
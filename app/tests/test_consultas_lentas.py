@@ -0,0 +1,161 @@
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+
+from db.consultas_lentas import RegistroConsultasLentas, consultas_lentas, normalizar
+from db.database import get_db
+from db.instrumentacion import instrumentar_motor
+from main import app
+from models.miembro import Miembro
+from models.rol import Rol
+from services import hogar_service
+from utils.security import crear_token_acceso
+
+
+def test_normaliza_literales_parametros_y_listas_in():
+    a = normalizar("SELECT *  FROM tareas\n WHERE id = 5 AND titulo = 'x''y'")
+    b = normalizar("SELECT * FROM tareas WHERE id = 17 AND titulo = 'otro'")
+    assert a == b == "SELECT * FROM tareas WHERE id = ? AND titulo = ?"
+
+    assert normalizar("SELECT x FROM t WHERE id IN (?, ?, ?)") == normalizar(
+        "SELECT x FROM t WHERE id IN (1, 2)"
+    )
+    assert normalizar("SELECT x FROM t WHERE id IN (__[POSTCOMPILE_id_1])") == (
+        "SELECT x FROM t WHERE id IN (?...)"
+    )
+
+
+def test_top_por_tiempo_total_y_p95():
+    registro = RegistroConsultasLentas(activo=True, umbral_ms=0, muestras=100)
+    # Rápida pero muy frecuente: domina el total
+    for n in range(100):
+        registro.registrar(f"SELECT * FROM miembros WHERE id = {n}", 0.002)
+    # Rara pero lenta: domina el p95
+    for _ in range(3):
+        registro.registrar("SELECT * FROM tareas WHERE id_hogar = 1", 0.05)
+
+    informe = registro.informe(top=1)
+    assert informe["huellas"] == 2
+    assert informe["ejecuciones"] == 103
+    assert informe["por_tiempo_total"][0]["sentencia"].endswith(
+        "FROM miembros WHERE id = ?"
+    )
+    assert informe["por_tiempo_total"][0]["ejecuciones"] == 100
+    assert informe["por_p95"][0]["sentencia"].endswith("FROM tareas WHERE id_hogar = ?")
+    assert informe["por_p95"][0]["p95_ms"] == pytest.approx(50)
+
+
+def test_desaloja_la_huella_con_menos_tiempo():
+    registro = RegistroConsultasLentas(activo=True, umbral_ms=0, max_huellas=2)
+    registro.registrar("SELECT a FROM t", 0.3)
+    registro.registrar("SELECT b FROM t", 0.1)
+    registro.registrar("SELECT c FROM t", 0.2)
+
+    sentencias = {h["sentencia"] for h in registro.informe()["por_tiempo_total"]}
+    assert sentencias == {"SELECT a FROM t", "SELECT c FROM t"}
+    assert registro.informe()["descartadas"] == 1
+
+
+@pytest.mark.asyncio
+async def test_registra_la_funcion_de_servicio_que_origina_la_sentencia(
+    db, setup_rol_hogar, monkeypatch
+):
+    instrumentar_motor(db.bind)
+    monkeypatch.setattr(consultas_lentas, "activo", True)
+    consultas_lentas.limpiar()
+
+    await hogar_service.listar_hogares_activos(db)
+
+    informe = consultas_lentas.informe()
+    origenes = {
+        o["funcion"] for h in informe["por_tiempo_total"] for o in h["origenes"]
+    }
+    assert "hogar_service.listar_hogares_activos" in origenes
+    consultas_lentas.limpiar()
+
+
+@pytest.mark.asyncio
+async def test_desactivado_no_registra(db, setup_rol_hogar):
+    instrumentar_motor(db.bind)
+    consultas_lentas.limpiar()
+    await hogar_service.listar_hogares_activos(db)
+    assert consultas_lentas.informe()["huellas"] == 0
+
+
+@pytest_asyncio.fixture
+async def client(db):
+    async def override_get_db():
+        yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        yield ac
+    app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def miembros(db, setup_rol_hogar):
+    db.add(Rol(id=2, nombre="Invitado", descripcion="Rol sin privilegios", estado=True))
+    for id_miembro, id_rol in ((1, 1), (2, 2)):
+        db.add(
+            Miembro(
+                id=id_miembro,
+                nombre_completo=f"Miembro {id_miembro}",
+                correo_electronico=f"m{id_miembro}@example.com",
+                contrasena_hash="x",
+                id_rol=id_rol,
+                id_hogar=1,
+                estado=True,
+            )
+        )
+    await db.flush()
+
+
+@pytest.mark.asyncio
+async def test_endpoint_solo_para_administradores(client, miembros):
+    invitado = {"Authorization": f"Bearer {crear_token_acceso({'sub': '2'})}"}
+    admin = {"Authorization": f"Bearer {crear_token_acceso({'sub': '1'})}"}
+
+    response = await client.get("/metricas/consultas-lentas", headers=invitado)
+    assert response.status_code == 403
+
+    response = await client.get("/metricas/consultas-lentas?top=5", headers=admin)
+    assert response.status_code == 200
+    assert {
+        "activo",
+        "huellas",
+        "por_tiempo_total",
+        "por_p95",
+    } <= response.json().keys()
+
+
+@pytest.mark.asyncio
+async def test_logs_en_caliente_solo_para_administradores(
+    client, miembros, monkeypatch
+):
+    from config.config import settings
+    import utils.logger as logger_mod
+
+    monkeypatch.setattr(settings, "LOG_MUESTREO", settings.LOG_MUESTREO)
+    invitado = {"Authorization": f"Bearer {crear_token_acceso({'sub': '2'})}"}
+    admin = {"Authorization": f"Bearer {crear_token_acceso({'sub': '1'})}"}
+    cambios = {"LOG_MUESTREO": "permissions=50"}
+
+    response = await client.put("/metricas/logs", json=cambios, headers=invitado)
+    assert response.status_code == 403
+
+    try:
+        response = await client.put("/metricas/logs", json=cambios, headers=admin)
+        assert response.status_code == 200
+        assert response.json()["LOG_MUESTREO"] == "permissions=50"
+        assert logger_mod._filtros_muestreo["permissions"].muestreo == 50
+
+        response = await client.put(
+            "/metricas/logs", json={"LOG_NIVEL": "HABLADOR"}, headers=admin
+        )
+        assert response.status_code == 400
+    finally:
+        monkeypatch.undo()
+        logger_mod.configurar_logs()
@@ -0,0 +1,101 @@
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import AsyncSession
+from main import app
+from db.database import get_db
+from models.miembro import Miembro
+from models.modulo import Modulo
+from models.permiso import Permiso
+from utils.security import crear_token_acceso
+
+
+@pytest_asyncio.fixture
+async def client(db):
+    async def override_get_db():
+        yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        yield ac
+
+    app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def headers_con_permiso(db: AsyncSession, setup_rol_hogar):
+    """Miembro 1 con permisos CRUD sobre 'Tareas'; la sesión queda vacía"""
+    modulo = Modulo(nombre="Tareas", descripcion="Módulo de Tareas")
+    db.add(modulo)
+    db.add(
+        Miembro(
+            id=1,
+            nombre_completo="Contexto Test",
+            correo_electronico="contexto@example.com",
+            contrasena_hash="123",
+            id_rol=1,
+            id_hogar=1,
+            estado=True,
+        )
+    )
+    await db.flush()
+    db.add(
+        Permiso(
+            id_rol=1,
+            id_modulo=modulo.id,
+            puede_crear=True,
+            puede_leer=True,
+        )
+    )
+    await db.flush()
+    # Vaciar el identity map para que db.get() tenga que ir a la BD
+    db.expunge_all()
+
+    token = crear_token_acceso({"sub": "1", "id_hogar": 1, "id_rol": 1})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _consultas_a(consultas, tabla):
+    return [c for c in consultas if f"FROM {tabla}" in c]
+
+
+@pytest.mark.asyncio
+async def test_identidad_se_resuelve_una_vez_por_peticion(
+    client: AsyncClient, headers_con_permiso, contador_consultas
+):
+    """POST /tareas/ usa obtener_miembro_actual y require_permission: un solo load"""
+    response = await client.post(
+        "/tareas/",
+        json={
+            "titulo": "Tarea contexto",
+            "categoria": "limpieza",
+            "asignado_a": 1,
+            "id_hogar": 1,
+        },
+        headers=headers_con_permiso,
+    )
+
+    assert response.status_code == 201
+    assert len(_consultas_a(contador_consultas, "miembros")) == 1
+
+
+@pytest.mark.asyncio
+async def test_camino_de_auth_sin_consultas_en_caliente(
+    client: AsyncClient, headers_con_permiso, contador_consultas
+):
+    """Con principal y matriz en memoria, la autorización no ejecuta SQL"""
+    # Primera petición: carga el principal y la matriz de permisos
+    response = await client.get("/tareas/999", headers=headers_con_permiso)
+    assert response.status_code == 404
+    assert len(_consultas_a(contador_consultas, "miembros")) == 1
+    assert len(_consultas_a(contador_consultas, "permisos")) == 1
+
+    # Segunda petición: solo la consulta propia de la ruta (la tarea)
+    contador_consultas.clear()
+    response = await client.get("/tareas/999", headers=headers_con_permiso)
+    assert response.status_code == 404
+    assert len(contador_consultas) == 1
+    assert "FROM tareas" in contador_consultas[0]
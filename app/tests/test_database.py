@@ -0,0 +1,71 @@
+import pytest
+from db.database import PERFILES_MOTOR, crear_motor, estadisticas_pool
+
+
+def test_perfil_desconocido():
+    with pytest.raises(ValueError, match="Perfil de motor desconocido"):
+        crear_motor("sqlite+aiosqlite:///:memory:", "turbo")
+
+
+def test_perfiles_no_imprimen_sql_fuera_de_dev():
+    assert PERFILES_MOTOR["dev"]["echo"] is True
+    for perfil in ("test", "prod", "low-memory"):
+        assert PERFILES_MOTOR[perfil]["echo"] is False
+
+
+@pytest.mark.asyncio
+async def test_estadisticas_pool_reportan_conexiones_prestadas(tmp_path):
+    """Con un pool real se ven las conexiones prestadas y los checkouts"""
+    motor = crear_motor(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", "test")
+    try:
+        antes = estadisticas_pool(motor)["checkouts"]
+
+        async with motor.connect() as c1, motor.connect() as c2:
+            datos = estadisticas_pool(motor)
+            assert datos["pool"] == "PoolInstrumentado"
+            assert datos["tamano"] == PERFILES_MOTOR["test"]["pool_size"]
+            assert datos["prestadas"] == 2
+
+        datos = estadisticas_pool(motor)
+        assert datos["prestadas"] == 0
+        assert datos["checkouts"] == antes + 2
+        assert datos["espera_max_s"] >= 0
+    finally:
+        await motor.dispose()
+
+
+@pytest.mark.asyncio
+async def test_cada_motor_lleva_sus_estadisticas(tmp_path):
+    uno = crear_motor(f"sqlite+aiosqlite:///{tmp_path / 'uno.db'}", "test")
+    otro = crear_motor(f"sqlite+aiosqlite:///{tmp_path / 'otro.db'}", "test")
+    try:
+        async with uno.connect():
+            pass
+        assert estadisticas_pool(uno)["checkouts"] == 1
+        assert estadisticas_pool(otro)["checkouts"] == 0
+    finally:
+        await uno.dispose()
+        await otro.dispose()
+
+
+@pytest.mark.asyncio
+async def test_abrir_conexion_no_cuenta_como_espera(tmp_path, monkeypatch):
+    import time as modulo_time
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    motor = crear_motor(f"sqlite+aiosqlite:///{tmp_path / 'lenta.db'}", "test")
+    crear = AsyncAdaptedQueuePool._create_connection
+
+    def crear_lenta(self):
+        modulo_time.sleep(0.2)
+        return crear(self)
+
+    monkeypatch.setattr(AsyncAdaptedQueuePool, "_create_connection", crear_lenta)
+    try:
+        async with motor.connect():
+            pass
+        datos = estadisticas_pool(motor)
+        assert datos["checkouts"] == 1
+        assert datos["espera_max_s"] < 0.1
+    finally:
+        await motor.dispose()
@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+from utils.hashing import ServicioHash, ServicioHashSaturado
+from utils.security import verificar_contrasena
+
+
+@pytest.mark.asyncio
+async def test_hash_y_verificacion_en_pool():
+    """El hash generado en el pool es verificable (dentro y fuera del pool)"""
+    servicio = ServicioHash(tipo="thread", max_workers=2, max_pendientes=4)
+    try:
+        hash_generado = await servicio.hash("password123")
+
+        assert verificar_contrasena("password123", hash_generado)
+        assert await servicio.verificar("password123", hash_generado) is True
+        assert await servicio.verificar("otra_clave", hash_generado) is False
+
+        metricas = servicio.metricas()
+        assert metricas["completadas"] == 3
+        assert metricas["pendientes"] == 0
+        assert metricas["tiempo_ejecucion_total"] > 0
+    finally:
+        servicio.cerrar()
+
+
+@pytest.mark.asyncio
+async def test_pool_rechaza_al_superar_max_pendientes():
+    """Por encima de max_pendientes se rechaza en vez de encolar sin límite"""
+    servicio = ServicioHash(tipo="thread", max_workers=1, max_pendientes=2)
+    try:
+        resultados = await asyncio.gather(
+            *[servicio.hash("password123") for _ in range(4)],
+            return_exceptions=True,
+        )
+
+        rechazadas = [r for r in resultados if isinstance(r, ServicioHashSaturado)]
+        assert len(rechazadas) == 2
+        assert servicio.metricas()["rechazadas"] == 2
+        assert servicio.metricas()["pico_pendientes"] == 2
+    finally:
+        servicio.cerrar()
+
+
+def test_tipo_de_pool_invalido():
+    with pytest.raises(ValueError):
+        ServicioHash(tipo="gpu")
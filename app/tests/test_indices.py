@@ -0,0 +1,163 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from db.migraciones import aplicar_migraciones
+
+from models.notificacion import Notificacion
+from services.tarea_service import (
+    listar_tareas_por_miembro,
+    listar_tareas_por_tipo,
+    listar_tareas_por_evento,
+    listar_tareas_por_miembro_paginado,
+)
+from services.mensaje_service import (
+    enviar_mensaje_en_sesion,
+    obtener_mensajes_por_hogar,
+)
+from services.miembro_service import (
+    listar_miembros_activos_por_hogar,
+    obtener_miembros_por_rol,
+)
+from services.evento_service import listar_eventos_por_hogar
+from services.atributo_miembro_service import obtener_atributos_de_miembro
+from services.permiso_service import obtener_permisos_por_rol
+
+
+async def _consultar_notificaciones_no_leidas(db, miembro_id):
+    # No hay servicio de lectura todavía: esta es la forma de la consulta
+    stmt = select(Notificacion).where(
+        Notificacion.id_miembro_destino == miembro_id, Notificacion.leido == False
+    )
+    return (await db.execute(stmt)).scalars().all()
+
+
+async def _enviar_en_sesion_inexistente(db, sesion_id):
+    with pytest.raises(ValueError):
+        await enviar_mensaje_en_sesion(db, sesion_id, 1, "hola")
+
+
+# listar_tareas_por_miembro filtra por (asignado_a, estado) sin ordenar: le
+# sirve ix_tareas_asignado_a_estado o cualquiera de los de keyset, que lo
+# tienen como prefijo. A igual coste SQLite elige según el orden de creación.
+INDICES_ASIGNADO_ESTADO = (
+    "ix_tareas_asignado_a_estado",
+    "ix_tareas_asignado_estado_fecha_limite",
+    "ix_tareas_asignado_estado_fecha_creacion",
+)
+
+# (consulta del servicio, tabla, índice o índices aceptables)
+CASOS = [
+    (
+        lambda db: listar_tareas_por_miembro(db, 1),
+        "tareas",
+        INDICES_ASIGNADO_ESTADO,
+    ),
+    (
+        lambda db: listar_tareas_por_tipo(db, "cocina", 1),
+        "tareas",
+        "ix_tareas_hogar_categoria_estado",
+    ),
+    (
+        lambda db: _enviar_en_sesion_inexistente(db, "sesion-x"),
+        "tareas",
+        "ix_tareas_id_sesion_mensaje",
+    ),
+    (lambda db: listar_tareas_por_evento(db, 1), "tareas", "ix_tareas_evento_estado"),
+    (
+        lambda db: listar_tareas_por_miembro_paginado(db, 1, orden="fecha_limite"),
+        "tareas",
+        "ix_tareas_asignado_estado_fecha_limite",
+    ),
+    (
+        lambda db: listar_tareas_por_miembro_paginado(db, 1, orden="fecha_creacion"),
+        "tareas",
+        "ix_tareas_asignado_estado_fecha_creacion",
+    ),
+    (
+        lambda db: obtener_mensajes_por_hogar(db, 1),
+        "mensajes",
+        "ix_mensajes_hogar_estado_fecha_id",
+    ),
+    (
+        lambda db: obtener_mensajes_por_hogar(db, 1, antes=10),
+        "mensajes",
+        "ix_mensajes_hogar_estado_fecha_id",
+    ),
+    (
+        lambda db: obtener_mensajes_por_hogar(db, 1, despues=10),
+        "mensajes",
+        "ix_mensajes_hogar_estado_fecha_id",
+    ),
+    (
+        lambda db: listar_miembros_activos_por_hogar(db, 1),
+        "miembros",
+        "ix_miembros_hogar_estado",
+    ),
+    (lambda db: obtener_miembros_por_rol(db, 1), "miembros", "ix_miembros_rol_estado"),
+    (lambda db: listar_eventos_por_hogar(db, 1), "eventos", "ix_eventos_hogar_estado"),
+    (
+        lambda db: _consultar_notificaciones_no_leidas(db, 1),
+        "notificaciones",
+        "ix_notificaciones_destino_leido",
+    ),
+    (
+        lambda db: obtener_atributos_de_miembro(db, 1),
+        "atributo_miembro",
+        "ux_atributo_miembro_miembro_atributo",
+    ),
+    (lambda db: obtener_permisos_por_rol(db, 1), "permisos", "ux_permisos_rol_modulo"),
+]
+
+
+@pytest_asyncio.fixture
+async def db_migrada(tmp_path):
+    """Sesión sobre el esquema tal como lo deja aplicar_migraciones"""
+    motor = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'migrada.db'}")
+    async with motor.begin() as conn:
+        await conn.run_sync(aplicar_migraciones)
+    sesiones = sessionmaker(motor, class_=AsyncSession, expire_on_commit=False)
+    async with sesiones() as session:
+        yield session
+    await motor.dispose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "consulta,tabla,indices",
+    CASOS,
+    ids=[c[2] if isinstance(c[2], str) else "ix_tareas_asignado_*" for c in CASOS],
+)
+async def test_consulta_de_servicio_usa_su_indice(
+    db_migrada: AsyncSession, consulta, tabla, indices
+):
+    """EXPLAIN QUERY PLAN de la SQL que emite el servicio debe usar el índice"""
+    db = db_migrada
+    if isinstance(indices, str):
+        indices = (indices,)
+    capturadas = []
+
+    def _capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            capturadas.append((statement, parameters))
+
+    motor = db.bind.sync_engine
+    event.listen(motor, "before_cursor_execute", _capturar)
+    try:
+        await consulta(db)
+    finally:
+        event.remove(motor, "before_cursor_execute", _capturar)
+
+    sentencias = [c for c in capturadas if f"FROM {tabla}" in c[0]]
+    assert sentencias, f"El servicio no consultó la tabla {tabla}"
+
+    conn = await db.connection()
+    statement, parameters = sentencias[0]
+    plan = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    detalle = " | ".join(fila[-1] for fila in plan.all())
+
+    assert any(f"INDEX {indice} " in f"{detalle} " for indice in indices), detalle
+    # Las consultas ordenadas deben salir del índice ya ordenadas
+    assert "TEMP B-TREE" not in detalle, detalle
@@ -0,0 +1,78 @@
+import logging
+
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+
+from db.instrumentacion import (
+    MedicionSQLMiddleware,
+    estadisticas_sql,
+    instrumentar_motor,
+    medicion_actual,
+)
+from models.hogar import Hogar
+
+app_prueba = FastAPI()
+app_prueba.add_middleware(MedicionSQLMiddleware)
+
+
+@app_prueba.get("/hogares/repetir/{veces}")
+async def repetir(veces: int):
+    # Una consulta por iteración: la forma típica de un N+1
+    async with app_prueba.state.motor.connect() as conn:
+        for n in range(veces):
+            await conn.execute(select(Hogar).where(Hogar.id == n))
+    return {"consultas": medicion_actual().consultas}
+
+
+@pytest_asyncio.fixture
+async def cliente(db):
+    # El motor de test de conftest (el de la sesión 'db')
+    app_prueba.state.motor = db.bind
+    instrumentar_motor(db.bind)
+    instrumentar_motor(db.bind)  # idempotente: no duplica los contadores
+    estadisticas_sql.limpiar()
+    async with AsyncClient(
+        transport=ASGITransport(app=app_prueba), base_url="http://test"
+    ) as ac:
+        yield ac
+
+
+@pytest.mark.asyncio
+async def test_cuenta_sentencias_y_tiempo_por_peticion(cliente, caplog):
+    response = await cliente.get("/hogares/repetir/3")
+
+    assert response.json() == {"consultas": 3}
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert 'desc="3 consultas"' in response.headers["server-timing"]
+    assert not [r for r in caplog.records if "N+1" in r.getMessage()]
+
+    datos = estadisticas_sql.metricas()["GET /hogares/repetir/{veces}"]
+    assert datos["peticiones"] == 1
+    assert datos["consultas"] == 3
+    assert datos["n_mas_1"] == 0
+
+
+@pytest.mark.asyncio
+async def test_avisa_n_mas_1_con_la_ruta(cliente, caplog, monkeypatch):
+    from config.config import settings
+
+    monkeypatch.setattr(settings, "SQL_N_MAS_1_UMBRAL", 5)
+    with caplog.at_level(logging.WARNING, logger="sql"):
+        await cliente.get("/hogares/repetir/8")
+
+    avisos = [r.getMessage() for r in caplog.records if "N+1" in r.getMessage()]
+    assert len(avisos) == 1
+    assert "GET /hogares/repetir/{veces}" in avisos[0]
+    assert "8 ejecuciones" in avisos[0]
+    assert "FROM hogares" in avisos[0]
+    assert estadisticas_sql.metricas()["GET /hogares/repetir/{veces}"]["n_mas_1"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fuera_de_una_peticion_no_se_mide(db):
+    instrumentar_motor(db.bind)
+    await db.execute(select(Hogar))
+    assert medicion_actual() is None
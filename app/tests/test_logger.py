@@ -0,0 +1,168 @@
+import logging
+import logging.handlers
+import threading
+
+import pytest
+
+import utils.logger as logger_mod
+from utils.contexto import ContextoPeticion, _contexto_actual
+from utils.logger import setup_logger, vaciar_logs
+
+
+@pytest.fixture
+def directorio_logs(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger_mod, "log_directory", str(tmp_path))
+    return tmp_path
+
+
+def test_setup_logger_es_idempotente(directorio_logs):
+    primero = setup_logger("prueba_idempotente")
+    segundo = setup_logger("prueba_idempotente")
+
+    assert primero is segundo
+    assert len(primero.handlers) == 1
+
+
+def test_modo_cola_solo_encola_en_el_hilo_que_registra(directorio_logs, monkeypatch):
+    logger = setup_logger("prueba_cola")
+    assert [type(h) for h in logger.handlers] == [logging.handlers.QueueHandler]
+
+    # Nada de E/S en el hilo que registra: el fichero lo escribe el listener
+    hilos = []
+    fichero = logger_mod._enrutador.ficheros["prueba_cola"]
+    emitir = fichero.emit
+    monkeypatch.setattr(
+        fichero, "emit", lambda r: (hilos.append(threading.current_thread()), emitir(r))
+    )
+
+    token = _contexto_actual.set(ContextoPeticion(request_id="abc123"))
+    try:
+        logger.info("Tarea %s leída", 7)
+    finally:
+        _contexto_actual.reset(token)
+    assert vaciar_logs()
+
+    assert hilos and threading.current_thread() not in hilos
+    contenido = (directorio_logs / "prueba_cola.log").read_text(encoding="utf-8")
+    assert "Tarea 7 leída" in contenido
+    assert "[req=abc123 miembro=-]" in contenido
+
+
+def test_excepciones_llegan_con_traza(directorio_logs):
+    logger = setup_logger("prueba_excepcion")
+    try:
+        raise RuntimeError("fallo de prueba")
+    except RuntimeError:
+        logger.exception("Error al procesar")
+    assert vaciar_logs()
+
+    contenido = (directorio_logs / "prueba_excepcion.log").read_text(encoding="utf-8")
+    assert "Error al procesar" in contenido
+    assert "RuntimeError: fallo de prueba" in contenido
+    assert contenido.count("Traceback") == 1
+
+
+@pytest.fixture
+def config_logs(monkeypatch):
+    """Cambia settings de logging y los aplica; al terminar restaura los previos"""
+    from config.config import settings
+
+    def aplicar(**valores):
+        for nombre, valor in valores.items():
+            monkeypatch.setattr(settings, nombre, valor)
+        logger_mod.configurar_logs()
+
+    yield aplicar
+    monkeypatch.undo()
+    logger_mod.configurar_logs()
+
+
+def test_muestreo_deja_pasar_uno_de_cada_n_y_todos_los_avisos(
+    directorio_logs, config_logs
+):
+    logger = setup_logger("prueba_muestreo")
+    config_logs(LOG_MUESTREO="prueba_muestreo=10", LOG_LIMITE_POR_SEGUNDO="")
+    filtro = logger_mod._filtros_muestreo["prueba_muestreo"]
+
+    for n in range(100):
+        logger.info("Acceso autorizado %s", n)
+        if n % 25 == 0:
+            logger.warning("Acceso denegado %s", n)
+    assert vaciar_logs()
+
+    contenido = (directorio_logs / "prueba_muestreo.log").read_text(encoding="utf-8")
+    assert contenido.count("Acceso autorizado") == 10
+    assert "Acceso autorizado 0\n" in contenido
+    assert contenido.count("Acceso denegado") == 4
+    assert filtro.muestreados == 90
+
+
+def test_limite_por_segundo(directorio_logs, config_logs):
+    logger = setup_logger("prueba_limite")
+    config_logs(LOG_MUESTREO="", LOG_LIMITE_POR_SEGUNDO="*=5")
+    filtro = logger_mod._filtros_muestreo["prueba_limite"]
+    filtro._segundo = 0
+
+    registros = [
+        logging.LogRecord("prueba_limite", logging.INFO, "", 0, "x", None, None)
+        for _ in range(8)
+    ]
+    for registro in registros:
+        registro.created = 1000.5
+    error = logging.LogRecord("prueba_limite", logging.ERROR, "", 0, "x", None, None)
+    error.created = 1000.5
+    siguiente = logging.LogRecord("prueba_limite", logging.INFO, "", 0, "x", None, None)
+    siguiente.created = 1001.0
+
+    assert [filtro.filter(r) for r in registros] == [True] * 5 + [False] * 3
+    assert filtro.filter(error)
+    assert filtro.filter(siguiente)
+    assert filtro.limitados == 3
+    assert logger_mod.metricas_logs()["prueba_limite"]["limitados"] == 3
+
+
+def test_niveles_en_caliente_y_formateo_perezoso(directorio_logs, config_logs):
+    logger = setup_logger("prueba_nivel")
+    formateados = []
+
+    class Caro:
+        def __init__(self, nombre):
+            self.nombre = nombre
+
+        def __str__(self):
+            formateados.append(self.nombre)
+            return self.nombre
+
+    config_logs(LOG_NIVELES="prueba_nivel=WARNING")
+    logger.info("Descartado: %s", Caro("descartado"))
+    assert not logger.isEnabledFor(logging.INFO)
+
+    config_logs(LOG_NIVELES="prueba_nivel=DEBUG")
+    logger.debug("Ahora sí: %s", Caro("registrado"))
+    assert vaciar_logs()
+
+    # Un nivel deshabilitado no formatea sus argumentos
+    assert "descartado" not in formateados
+    contenido = (directorio_logs / "prueba_nivel.log").read_text(encoding="utf-8")
+    assert "Ahora sí: registrado" in contenido
+    assert "Descartado" not in contenido
+
+
+def test_actualizar_config_logs_valida_antes_de_aplicar(directorio_logs, config_logs):
+    from config.config import settings
+
+    logger = setup_logger("prueba_en_caliente")
+    config_logs()  # deshace los cambios al terminar
+
+    logger_mod.actualizar_config_logs(LOG_NIVELES="prueba_en_caliente=DEBUG")
+    assert logger.level == logging.DEBUG
+
+    with pytest.raises(ValueError):
+        logger_mod.actualizar_config_logs(
+            LOG_NIVELES="prueba_en_caliente=ERROR", LOG_MUESTREO="*=mucho"
+        )
+    assert settings.LOG_NIVELES == "prueba_en_caliente=DEBUG"
+    assert logger.level == logging.DEBUG
+
+    with pytest.raises(ValueError):
+        logger_mod.actualizar_config_logs(LOG_NIVEL="HABLADOR")
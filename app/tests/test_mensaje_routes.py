@@ -133,3 +133,87 @@ async def test_listar_mensajes_sin_token(client: AsyncClient):
     """Prueba que la ruta de mensajes está protegida (401)"""
     response = await client.get("/mensajes/hogar/1")
     assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_listar_mensajes_paginado(client: AsyncClient, setup_miembros_y_mensajes):
+    """limite y antes recorren el historial del más reciente al más antiguo"""
+    headers = {"Authorization": f"Bearer {crear_token_test()}"}
+
+    response = await client.get("/mensajes/hogar/1?limite=1", headers=headers)
+    assert response.status_code == 200
+    primera = response.json()
+    assert len(primera) == 1
+
+    response = await client.get(
+        f"/mensajes/hogar/1?limite=1&antes={primera[0]['id']}", headers=headers
+    )
+    segunda = response.json()
+    assert len(segunda) == 1
+    assert segunda[0]["id"] != primera[0]["id"]
+
+    response = await client.get("/mensajes/hogar/1?antes=1&despues=2", headers=headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_primera_pagina_servida_desde_el_bufer_del_chat(
+    client: AsyncClient, setup_miembros_y_mensajes, contador_consultas, monkeypatch
+):
+    """Con un broker compartido la primera página sale de memoria, sin SQL"""
+    from websocket.chat_manager import manager
+
+    headers = {"Authorization": f"Bearer {crear_token_test()}"}
+
+    # "proceso": el búfer de un worker no ve a los demás, siempre a la BD
+    await client.get("/mensajes/hogar/1", headers=headers)
+    contador_consultas.clear()
+    await client.get("/mensajes/hogar/1", headers=headers)
+    assert [c for c in contador_consultas if "FROM mensajes" in c]
+
+    monkeypatch.setattr(manager.broker, "compartido", True)
+    primera = await client.get("/mensajes/hogar/1", headers=headers)
+    contador_consultas.clear()
+    segunda = await client.get("/mensajes/hogar/1", headers=headers)
+
+    assert segunda.status_code == 200
+    assert segunda.json() == primera.json()
+    assert not [c for c in contador_consultas if "FROM mensajes" in c]
+
+
+@pytest.mark.asyncio
+async def test_presencia_del_hogar(client: AsyncClient, setup_miembros_y_mensajes):
+    from websocket.chat_manager import manager
+    from tests.test_chat_manager import SocketFalso
+
+    socket = SocketFalso()
+    await manager.connect(socket, 1, miembro_id=1)
+    try:
+        headers = {"Authorization": f"Bearer {crear_token_test()}"}
+        response = await client.get("/mensajes/hogar/1/presencia", headers=headers)
+        assert response.status_code == 200
+        assert response.json()[0]["id_miembro"] == 1
+        assert response.json()[0]["en_linea"] is True
+
+        response = await client.get("/mensajes/hogar/2/presencia", headers=headers)
+        assert response.status_code == 403
+    finally:
+        manager.disconnect(socket, 1)
+
+
+@pytest.mark.asyncio
+async def test_server_timing_y_metricas_sql_por_ruta(
+    client: AsyncClient, db: AsyncSession, setup_miembros_y_mensajes
+):
+    from db.instrumentacion import estadisticas_sql, instrumentar_motor
+
+    instrumentar_motor(db.bind)
+    estadisticas_sql.limpiar()
+    headers = {"Authorization": f"Bearer {crear_token_test()}"}
+
+    response = await client.get("/mensajes/hogar/1?antes=1", headers=headers)
+    assert response.status_code == 200
+    assert "consultas" in response.headers["server-timing"]
+
+    metricas = (await client.get("/metricas/sql")).json()
+    assert metricas["GET /mensajes/hogar/{hogar_id}"]["consultas"] >= 1
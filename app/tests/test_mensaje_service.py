@@ -0,0 +1,177 @@
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.config import settings
+from models.mensaje import Mensaje
+from models.miembro import Miembro
+from services.mensaje_service import obtener_mensajes_por_hogar
+
+
+@pytest_asyncio.fixture
+async def historial(db: AsyncSession, setup_rol_hogar):
+    """30 mensajes en el hogar 1, de dos en dos con la misma fecha de envío"""
+    db.add(
+        Miembro(
+            id=1,
+            nombre_completo="Chat Test",
+            correo_electronico="chat@example.com",
+            contrasena_hash="123",
+            id_rol=1,
+            id_hogar=1,
+        )
+    )
+    await db.flush()
+    base = datetime(2025, 1, 1, 12, 0, 0)
+    mensajes = [
+        Mensaje(
+            id_hogar=1,
+            id_remitente=1,
+            contenido=f"m{i}",
+            fecha_envio=base + timedelta(minutes=i // 2),
+        )
+        for i in range(30)
+    ]
+    db.add_all(mensajes)
+    await db.flush()
+    return [m.id for m in mensajes]
+
+
+@pytest.mark.asyncio
+async def test_ultima_pagina_son_los_mas_recientes_en_orden(db, historial):
+    pagina = await obtener_mensajes_por_hogar(db, 1, limite=5)
+    # Los 5 últimos, del más antiguo al más reciente (el orden de siempre)
+    assert [m.id for m in pagina] == historial[-5:]
+    assert pagina[0].remitente.nombre_completo == "Chat Test"
+
+
+@pytest.mark.asyncio
+async def test_recorrer_hacia_atras_con_antes(db, historial):
+    vistos = []
+    pagina = await obtener_mensajes_por_hogar(db, 1, limite=7)
+    while pagina:
+        vistos = [m.id for m in pagina] + vistos
+        pagina = await obtener_mensajes_por_hogar(db, 1, antes=pagina[0].id, limite=7)
+
+    assert vistos == historial
+
+
+@pytest.mark.asyncio
+async def test_despues_devuelve_los_siguientes_al_ancla(db, historial):
+    pagina = await obtener_mensajes_por_hogar(db, 1, despues=historial[10], limite=4)
+    # Los 4 inmediatamente posteriores, en orden
+    assert [m.id for m in pagina] == historial[11:15]
+
+
+@pytest.mark.asyncio
+async def test_limite_recortado_al_maximo(db, historial, monkeypatch):
+    monkeypatch.setattr(settings, "MENSAJES_PAGINA_MAX", 8)
+    pagina = await obtener_mensajes_por_hogar(db, 1, limite=1000)
+    assert len(pagina) == 8
+
+
+@pytest.mark.asyncio
+async def test_antes_y_despues_a_la_vez_falla(db, historial):
+    with pytest.raises(ValueError):
+        await obtener_mensajes_por_hogar(db, 1, antes=historial[5], despues=1)
+
+
+@pytest_asyncio.fixture
+async def tarea_con_sesion(db: AsyncSession, historial):
+    from models.tarea import Tarea
+    from services.mensaje_service import crear_sesion_mensaje_para_tarea
+
+    tarea = Tarea(
+        id=1,
+        titulo="Lavar platos",
+        categoria="cocina",
+        asignado_a=1,
+        id_hogar=1,
+        creado_por=1,
+    )
+    db.add(tarea)
+    await db.commit()
+    sesion_id = await crear_sesion_mensaje_para_tarea(db, 1)
+    return tarea, sesion_id
+
+
+@pytest.mark.asyncio
+async def test_enviar_en_sesion_es_un_solo_insert(
+    db, tarea_con_sesion, contador_consultas
+):
+    from db.secuencias import ids_mensajes
+    from services.mensaje_service import enviar_mensaje_en_sesion
+
+    _, sesion_id = tarea_con_sesion
+    # Con el bloque de ids ya reservado (se reserva uno cada CHAT_BLOQUE_IDS)
+    await ids_mensajes(db.bind).siguiente()
+    contador_consultas.clear()
+    mensaje = await enviar_mensaje_en_sesion(db, sesion_id, 1, "hecho")
+
+    sentencias = [c.split()[0].upper() for c in contador_consultas]
+    assert sentencias.count("INSERT") == 1
+    assert "SELECT" not in sentencias
+    assert mensaje.id and mensaje.id_hogar == 1 and mensaje.fecha_envio
+
+
+@pytest.mark.asyncio
+async def test_sesion_se_resuelve_desde_la_bd_si_no_esta_en_cache(
+    db, tarea_con_sesion
+):
+    from services.mensaje_service import cache_sesiones_tarea, enviar_mensaje_en_sesion
+
+    _, sesion_id = tarea_con_sesion
+    cache_sesiones_tarea.limpiar()
+
+    await enviar_mensaje_en_sesion(db, sesion_id, 1, "uno")
+    assert cache_sesiones_tarea.obtener(sesion_id).tarea_id == 1
+
+
+@pytest.mark.asyncio
+async def test_desactivar_la_tarea_invalida_la_sesion(db, tarea_con_sesion):
+    from services.mensaje_service import cache_sesiones_tarea, enviar_mensaje_en_sesion
+
+    tarea, sesion_id = tarea_con_sesion
+    tarea.estado = False
+    await db.commit()
+
+    assert cache_sesiones_tarea.obtener(sesion_id) is None
+    with pytest.raises(ValueError):
+        await enviar_mensaje_en_sesion(db, sesion_id, 1, "tarde")
+
+
+@pytest.mark.asyncio
+async def test_nueva_sesion_invalida_la_anterior(db, tarea_con_sesion):
+    from services.mensaje_service import (
+        crear_sesion_mensaje_para_tarea,
+        enviar_mensaje_en_sesion,
+    )
+
+    _, anterior = tarea_con_sesion
+    nueva = await crear_sesion_mensaje_para_tarea(db, 1)
+
+    assert (await enviar_mensaje_en_sesion(db, nueva, 1, "ok")).id_hogar == 1
+    with pytest.raises(ValueError):
+        await enviar_mensaje_en_sesion(db, anterior, 1, "vieja")
+
+
+@pytest.mark.asyncio
+async def test_fallo_al_avisar_no_falla_el_envio(db, tarea_con_sesion, monkeypatch):
+    from services import mensaje_service
+
+    avisados = []
+
+    async def avisar(hogar_id):
+        avisados.append(hogar_id)
+
+    async def fallar(hogar_id):
+        raise ConnectionError("broker caído")
+
+    monkeypatch.setattr(mensaje_service, "_al_guardar_fuera_del_chat", [fallar, avisar])
+    _, sesion_id = tarea_con_sesion
+
+    mensaje = await mensaje_service.enviar_mensaje_en_sesion(db, sesion_id, 1, "hola")
+
+    assert avisados == [1]
+    assert await db.get(Mensaje, mensaje.id) is not None
@@ -0,0 +1,76 @@
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+
+from db.database import get_db
+from main import app
+from utils.metricas import Histograma, duracion_peticiones, familia, peticiones
+
+
+def test_histograma_acumula_buckets_suma_y_cuenta():
+    histograma = Histograma("latencia_segundos", "Latencia", ("ruta",), (0.1, 1.0))
+    for valor in (0.05, 0.1, 0.5, 3.0):
+        histograma.observar(valor, "/x")
+
+    lineas = histograma.exponer()
+    assert lineas[:2] == [
+        "# HELP latencia_segundos Latencia",
+        "# TYPE latencia_segundos histogram",
+    ]
+    assert 'latencia_segundos_bucket{ruta="/x",le="0.1"} 2' in lineas
+    assert 'latencia_segundos_bucket{ruta="/x",le="1.0"} 3' in lineas
+    assert 'latencia_segundos_bucket{ruta="/x",le="+Inf"} 4' in lineas
+    assert 'latencia_segundos_sum{ruta="/x"} 3.65' in lineas
+    assert 'latencia_segundos_count{ruta="/x"} 4' in lineas
+
+
+def test_familia_escapa_las_etiquetas():
+    lineas = familia("x_total", "counter", "X", [({"ruta": 'a"b\\c'}, 3)])
+    assert lineas[-1] == 'x_total{ruta="a\\"b\\\\c"} 3'
+
+
+@pytest_asyncio.fixture
+async def client(db):
+    async def override_get_db():
+        yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        yield ac
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_metrics_por_plantilla_de_ruta_y_estado(client):
+    antes = duracion_peticiones.cuenta("GET", "/tareas/{tarea_id}")
+    no_autorizadas = peticiones.valor("GET", "/tareas/{tarea_id}", "401")
+
+    await client.get("/tareas/7")
+    await client.get("/tareas/8")
+    await client.get("/no-existe")
+
+    assert duracion_peticiones.cuenta("GET", "/tareas/{tarea_id}") == antes + 2
+    assert peticiones.valor("GET", "/tareas/{tarea_id}", "401") == no_autorizadas + 2
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    texto = response.text
+    assert (
+        'hometasks_http_peticiones_total{metodo="GET",ruta="(sin ruta)",estado="404"}'
+        in texto
+    )
+    assert "/tareas/7" not in texto
+    for nombre in (
+        "hometasks_http_duracion_segundos_bucket",
+        "hometasks_db_pool_espera_checkout_segundos_count",
+        "hometasks_ws_difusion_segundos_count",
+        "hometasks_ws_conexiones_activas",
+        "hometasks_hash_pendientes",
+        'hometasks_cache_hit_ratio{cache="principales"}',
+        'hometasks_cache_hit_ratio{cache="sesiones_tarea"}',
+        "hometasks_chat_persistencia_pendientes",
+    ):
+        assert nombre in texto, nombre
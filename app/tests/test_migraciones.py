@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from db.migraciones import MIGRACIONES, aplicar_migraciones, version_actual
+
+
+@pytest.mark.asyncio
+async def test_bd_vacia_crea_esquema_y_marca_versiones(tmp_path):
+    motor = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'nueva.db'}")
+    try:
+        async with motor.begin() as conn:
+            aplicadas = await conn.run_sync(aplicar_migraciones)
+            assert aplicadas == [m[0] for m in MIGRACIONES]
+
+        # Segunda ejecución: nada pendiente
+        async with motor.begin() as conn:
+            assert await conn.run_sync(aplicar_migraciones) == []
+            assert await conn.run_sync(version_actual) == MIGRACIONES[-1][0]
+    finally:
+        await motor.dispose()
+
+
+@pytest.mark.asyncio
+async def test_bd_existente_recibe_los_indices(tmp_path):
+    """Una BD creada antes de las migraciones (sin índices) se pone al día"""
+    motor = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'legado.db'}")
+    try:
+        async with motor.begin() as conn:
+            await conn.execute(
+                text(
+                    "CREATE TABLE permisos (id INTEGER PRIMARY KEY, id_rol INTEGER, "
+                    "id_modulo INTEGER, puede_crear BOOLEAN, puede_leer BOOLEAN, "
+                    "puede_actualizar BOOLEAN, puede_eliminar BOOLEAN, estado BOOLEAN)"
+                )
+            )
+
+        async with motor.begin() as conn:
+            aplicadas = await conn.run_sync(aplicar_migraciones)
+            indices = await conn.run_sync(
+                lambda c: {i["name"] for i in inspect(c).get_indexes("permisos")}
+            )
+
+        assert aplicadas == [m[0] for m in MIGRACIONES]
+        assert "ux_permisos_rol_modulo" in indices
+    finally:
+        await motor.dispose()
+
+
+@pytest.mark.asyncio
+async def test_migracion_4_retira_indices_sustituidos(tmp_path):
+    motor = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'v3.db'}")
+    try:
+        async with motor.begin() as conn:
+            await conn.run_sync(aplicar_migraciones)
+            # Simula una BD que se quedó en la versión 3 con los índices antiguos
+            await conn.execute(text("DELETE FROM schema_version WHERE version >= 4"))
+            await conn.execute(
+                text(
+                    "CREATE INDEX ix_mensajes_hogar_estado_fecha "
+                    "ON mensajes (id_hogar, estado, fecha_envio)"
+                )
+            )
+
+        async with motor.begin() as conn:
+            assert 4 in await conn.run_sync(aplicar_migraciones)
+            indices = await conn.run_sync(
+                lambda c: {i["name"] for i in inspect(c).get_indexes("mensajes")}
+            )
+            indices_tareas = await conn.run_sync(
+                lambda c: {i["name"] for i in inspect(c).get_indexes("tareas")}
+            )
+
+        assert "ix_mensajes_hogar_estado_fecha" not in indices
+        assert "ix_mensajes_hogar_estado_fecha_id" in indices
+        # listar_tareas_por_miembro sigue usando el índice de la migración 2
+        assert "ix_tareas_asignado_a_estado" in indices_tareas
+    finally:
+        await motor.dispose()
+
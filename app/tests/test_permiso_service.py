@@ -119,3 +119,65 @@ async def test_verificar_permiso_exitoso_y_fallido(
         db, id_miembro=miembro_id, modulo_nombre="TestModulo", accion="actualizar"
     )
     assert tiene_permiso_actualizar is False
+
+
+@pytest.mark.asyncio
+async def test_matriz_permisos_compila_mascaras(db: AsyncSession, setup_datos_permisos):
+    """La matriz en memoria responde igual que la consulta a la BD"""
+    from services.permiso_service import matriz_permisos
+
+    await asignar_permiso(
+        db,
+        PermisoCreate(
+            id_rol=setup_datos_permisos["rol"].id,
+            id_modulo=setup_datos_permisos["modulo"].id,
+            puede_crear=True,
+            puede_leer=False,
+        ),
+    )
+    await matriz_permisos.asegurar(db)
+
+    rol_id = setup_datos_permisos["rol"].id
+    assert matriz_permisos.permite(rol_id, "TestModulo", "crear") is True
+    assert matriz_permisos.permite(rol_id, "TestModulo", "leer") is False
+    assert matriz_permisos.permite(rol_id, "OtroModulo", "crear") is False
+    assert matriz_permisos.permite(rol_id, "TestModulo", "volar") is False
+
+
+@pytest.mark.asyncio
+async def test_matriz_permisos_se_invalida_al_actualizar(
+    db: AsyncSession, setup_datos_permisos
+):
+    """Tras actualizar un permiso la matriz se recarga con el valor nuevo"""
+    from services.permiso_service import matriz_permisos
+
+    permiso = await asignar_permiso(
+        db,
+        PermisoCreate(
+            id_rol=setup_datos_permisos["rol"].id,
+            id_modulo=setup_datos_permisos["modulo"].id,
+        ),
+    )
+    await db.commit()
+    await matriz_permisos.asegurar(db)
+    version = matriz_permisos.version
+    assert matriz_permisos.vigente
+    assert not matriz_permisos.permite(permiso.id_rol, "TestModulo", "eliminar")
+
+    await actualizar_permiso(
+        db,
+        permiso.id,
+        PermisoUpdate(
+            **{
+                "id_rol": permiso.id_rol,
+                "id_modulo": permiso.id_modulo,
+                "puede_eliminar": True,
+            }
+        ),
+    )
+    await db.commit()
+
+    assert not matriz_permisos.vigente
+    await matriz_permisos.asegurar(db)
+    assert matriz_permisos.version == version + 1
+    assert matriz_permisos.permite(permiso.id_rol, "TestModulo", "eliminar")
@@ -0,0 +1,156 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from db.database import Base
+from models.mensaje import Mensaje
+from models.secuencia import Secuencia  # noqa: F401  (tabla en Base.metadata)
+from db.secuencias import ids_mensajes
+from websocket.persistencia import (
+    AsignadorIds,
+    PersistenciaDiferida,
+    PersistenciaSincrona,
+    crear_persistencia,
+)
+
+
+@pytest_asyncio.fixture
+async def sesiones(tmp_path):
+    """BD en fichero propia: el flusher hace commits con sus propias sesiones"""
+    motor = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'chat.db'}")
+    async with motor.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield sessionmaker(motor, class_=AsyncSession, expire_on_commit=False)
+    await motor.dispose()
+
+
+async def _contar(sesiones):
+    async with sesiones() as db:
+        return await db.scalar(select(func.count(Mensaje.id)))
+
+
+@pytest.mark.asyncio
+async def test_diferida_asigna_id_y_fecha_y_persiste_en_lote(sesiones):
+    persistencia = PersistenciaDiferida(sesiones, intervalo=10, max_lote=100)
+    guardados = [
+        await persistencia.guardar(1, 1, f"mensaje {i}") for i in range(5)
+    ]
+
+    ids = [mensaje_id for mensaje_id, _ in guardados]
+    assert ids == list(range(ids[0], ids[0] + 5))
+    assert all(fecha.microsecond == 0 for _, fecha in guardados)
+    # Aún no está en la BD: se difunde antes de persistir
+    assert await _contar(sesiones) == 0
+
+    await persistencia.cerrar()
+
+    async with sesiones() as db:
+        filas = (await db.execute(select(Mensaje).order_by(Mensaje.id))).scalars().all()
+    assert [m.id for m in filas] == ids
+    assert [m.fecha_envio for m in filas] == [fecha for _, fecha in guardados]
+    assert persistencia.metricas()["lotes"] == 1
+    assert persistencia.metricas()["pendientes"] == 0
+
+
+@pytest.mark.asyncio
+async def test_diferida_vacia_al_llenar_el_lote(sesiones):
+    persistencia = PersistenciaDiferida(sesiones, intervalo=10, max_lote=3)
+    for i in range(3):
+        await persistencia.guardar(1, 1, f"mensaje {i}")
+
+    for _ in range(100):
+        if persistencia.persistidos == 3:
+            break
+        await asyncio.sleep(0.01)
+
+    assert await _contar(sesiones) == 3
+    await persistencia.cerrar()
+
+
+@pytest.mark.asyncio
+async def test_bloques_de_ids_disjuntos_y_por_encima_de_los_existentes(sesiones):
+    async with sesiones() as db:
+        db.add(Mensaje(id=41, id_hogar=1, id_remitente=1, contenido="previo"))
+        await db.commit()
+
+    worker_a = AsignadorIds(sesiones, "mensajes", tamano_bloque=10)
+    worker_b = AsignadorIds(sesiones, "mensajes", tamano_bloque=10)
+    ids_a = [await worker_a.siguiente() for _ in range(12)]
+    ids_b = [await worker_b.siguiente() for _ in range(5)]
+
+    assert ids_a[0] == 42
+    assert not set(ids_a) & set(ids_b)
+
+
+@pytest.mark.asyncio
+async def test_persistencia_usa_el_asignador_del_motor_actual(sesiones, tmp_path):
+    # Un asignador por motor, compartido con services/mensaje_service.py, y
+    # resuelto al usarlo: cambiar la fábrica cambia de dónde salen los bloques
+    persistencia = PersistenciaSincrona(sesiones)
+    assert persistencia.ids is ids_mensajes(sesiones.kw["bind"])
+
+    otro_motor = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'otro.db'}")
+    async with otro_motor.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    persistencia.fabrica_sesiones = sessionmaker(
+        otro_motor, class_=AsyncSession, expire_on_commit=False
+    )
+    mensaje_id, _ = await persistencia.guardar(1, 1, "hola")
+    await otro_motor.dispose()
+
+    assert persistencia.ids is ids_mensajes(otro_motor)
+    assert mensaje_id == 1
+    assert await _contar(sesiones) == 0
+
+
+@pytest.mark.asyncio
+async def test_sincrona_hace_commit_antes_de_devolver(sesiones):
+    mensaje_id, fecha = await PersistenciaSincrona(sesiones).guardar(1, 1, "hola")
+
+    assert mensaje_id is not None and fecha is not None
+    assert await _contar(sesiones) == 1
+
+
+@pytest.mark.asyncio
+async def test_sincrona_y_diferida_no_chocan_en_ids(sesiones):
+    # Otro worker en modo síncrono inserta mientras hay un bloque diferido abierto
+    diferida = PersistenciaDiferida(sesiones, intervalo=10, max_lote=100)
+    sincrona = PersistenciaSincrona(sesiones)
+    ids_diferida = [(await diferida.guardar(1, 1, f"d{i}"))[0] for i in range(3)]
+    ids_sincrona = [(await sincrona.guardar(1, 1, f"s{i}"))[0] for i in range(3)]
+
+    await diferida.cerrar()
+
+    assert not set(ids_diferida) & set(ids_sincrona)
+    assert diferida.metricas()["rechazados"] == 0
+    assert await _contar(sesiones) == 6
+
+
+@pytest.mark.asyncio
+async def test_diferida_descarta_solo_la_fila_rechazada(sesiones):
+    persistencia = PersistenciaDiferida(sesiones, intervalo=10, max_lote=100)
+    ids = [(await persistencia.guardar(1, 1, f"mensaje {i}"))[0] for i in range(5)]
+    # Una fila con el mismo id entra por otro camino antes del flush
+    async with sesiones() as db:
+        db.add(Mensaje(id=ids[2], id_hogar=1, id_remitente=1, contenido="intrusa"))
+        await db.commit()
+
+    await persistencia.vaciar()
+    siguiente, _ = await persistencia.guardar(1, 1, "posterior")
+    await persistencia.cerrar()
+
+    metricas = persistencia.metricas()
+    assert metricas["rechazados"] == 1
+    assert metricas["persistidos"] == 5
+    assert metricas["pendientes"] == 0
+    async with sesiones() as db:
+        guardados = set((await db.execute(select(Mensaje.id))).scalars())
+    assert guardados == set(ids) | {siguiente}
+
+
+def test_modo_desconocido_falla():
+    with pytest.raises(ValueError):
+        crear_persistencia("a_veces")
@@ -0,0 +1,91 @@
+from websocket import recientes as modulo_recientes
+from websocket.recientes import MensajesRecientes
+
+
+def _evento(n: int, fecha: str = "2025-01-01T10:00:00") -> dict:
+    return {
+        "id": n,
+        "id_remitente": 1,
+        "remitente": "Ana",
+        "contenido": f"m{n}",
+        "fecha": fecha,
+    }
+
+
+def test_desde_devuelve_lo_posterior_en_orden_de_entrega():
+    recientes = MensajesRecientes(tamano=5, max_hogares=10)
+    # Ids no crecientes: bloques de distintos workers
+    for n in (1000, 2000, 1001, 2001):
+        recientes.anotar(1, _evento(n))
+
+    assert [e["id"] for e in recientes.desde(1, 2000)] == [1001, 2001]
+    assert recientes.desde(1, 2001) == []
+    assert recientes.desde(1, 999) is None
+    assert recientes.desde(2, 1000) is None
+
+
+def test_el_bufer_esta_acotado():
+    recientes = MensajesRecientes(tamano=3, max_hogares=10)
+    for n in range(10):
+        recientes.anotar(1, _evento(n))
+
+    assert recientes.desde(1, 6) is None
+    assert [e["id"] for e in recientes.desde(1, 7)] == [8, 9]
+
+
+def test_pagina_solo_si_esta_sembrado():
+    recientes = MensajesRecientes(tamano=5, max_hogares=10)
+    recientes.anotar(1, _evento(10))
+    assert recientes.pagina(1, 2) is None
+
+    # Mientras se consultaba la BD llegó el 10, aún sin guardar
+    recientes.sembrar(1, [_evento(8), _evento(9)], historial_entero=True)
+
+    assert [e["id"] for e in recientes.pagina(1, 2)] == [9, 10]
+    # Todo el historial cabe: cualquier límite se puede servir
+    assert [e["id"] for e in recientes.pagina(1, 50)] == [8, 9, 10]
+
+
+def test_pagina_no_sirve_mas_de_lo_que_garantiza():
+    recientes = MensajesRecientes(tamano=3, max_hogares=10)
+    recientes.sembrar(1, [_evento(1), _evento(2)], historial_entero=True)
+    for n in (3, 4):
+        recientes.anotar(1, _evento(n))
+
+    # Se salió el 1 del búfer: ya no es el historial entero
+    assert [e["id"] for e in recientes.pagina(1, 3)] == [2, 3, 4]
+    assert recientes.pagina(1, 4) is None
+
+
+def test_pagina_en_orden_de_la_bd_y_no_de_entrega():
+    recientes = MensajesRecientes(tamano=5, max_hogares=10)
+    recientes.sembrar(1, [_evento(1)], historial_entero=True)
+    # Entregados fuera de orden: ids de bloques de distintos workers
+    recientes.anotar(1, _evento(2000, "2025-01-01T10:00:02"))
+    recientes.anotar(1, _evento(1001, "2025-01-01T10:00:01"))
+    recientes.anotar(1, _evento(1002, "2025-01-01T10:00:02"))
+
+    assert [e["id"] for e in recientes.pagina(1, 3)] == [1001, 1002, 2000]
+
+
+def test_la_siembra_caduca(monkeypatch):
+    ahora = [100.0]
+    monkeypatch.setattr(modulo_recientes.time, "monotonic", lambda: ahora[0])
+    recientes = MensajesRecientes(tamano=5, max_hogares=10, ttl=30)
+    recientes.sembrar(1, [_evento(1), _evento(2)], historial_entero=True)
+    assert recientes.pagina(1, 2) is not None
+
+    ahora[0] += 31
+    assert recientes.pagina(1, 2) is None
+    # Hasta volver a sembrar desde la BD
+    recientes.sembrar(1, [_evento(1), _evento(2)], historial_entero=True)
+    assert recientes.pagina(1, 2) is not None
+
+
+def test_descarta_los_hogares_menos_usados():
+    recientes = MensajesRecientes(tamano=3, max_hogares=2)
+    for hogar_id in (1, 2, 3):
+        recientes.anotar(hogar_id, _evento(hogar_id))
+
+    assert recientes.desde(1, 1) is None
+    assert recientes.metricas()["hogares"] == 2
@@ -122,6 +122,42 @@ async def test_crear_tarea_con_autenticacion(
     assert data["creado_por"] == admin.id  # ¡Verificamos que el endpoint lo asignó!
 
 
+@pytest.mark.asyncio
+async def test_listar_mis_tareas_paginado(
+    client: AsyncClient, setup_miembro_con_permiso_tareas
+):
+    headers = {"Authorization": f"Bearer {crear_token_test()}"}
+    for i in range(3):
+        await client.post(
+            "/tareas/",
+            json={
+                "titulo": f"Tarea {i}",
+                "categoria": "cocina",
+                "asignado_a": 1,
+                "id_hogar": 1,
+                "fecha_limite": f"2025-03-0{i + 1}",
+            },
+            headers=headers,
+        )
+
+    # El cuerpo sigue siendo una lista; el cursor viaja en una cabecera
+    response = await client.get("/tareas/mias/?limite=2", headers=headers)
+    assert response.status_code == 200
+    assert [t["titulo"] for t in response.json()] == ["Tarea 0", "Tarea 1"]
+    cursor = response.headers["X-Siguiente-Cursor"]
+
+    response = await client.get(
+        "/tareas/mias/",
+        params={"limite": 2, "cursor": cursor},
+        headers=headers,
+    )
+    assert [t["titulo"] for t in response.json()] == ["Tarea 2"]
+    assert "X-Siguiente-Cursor" not in response.headers
+
+    response = await client.get("/tareas/mias/?cursor=roto", headers=headers)
+    assert response.status_code == 400
+
+
 @pytest_asyncio.fixture
 async def setup_miembro(db, setup_rol_hogar):
     from sqlalchemy import select
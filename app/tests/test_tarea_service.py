@@ -5,10 +5,16 @@ from models.miembro import Miembro
 from models.hogar import Hogar
 from models.rol import Rol
 from models.notificacion import Notificacion
-from sqlalchemy import select
+from sqlalchemy import select, update
 from schemas.tarea import TareaCreate
 
-from services.tarea_service import crear_tarea, actualizar_estado_tarea
+from datetime import date, datetime, timedelta
+from models.tarea import Tarea
+from services.tarea_service import (
+    crear_tarea,
+    actualizar_estado_tarea,
+    listar_tareas_por_miembro_paginado,
+)
 
 
 @pytest_asyncio.fixture
@@ -70,3 +76,107 @@ async def test_actualizar_estado_a_completada(db: AsyncSession, setup_miembro_ad
 
     assert tarea_actualizada.estado_actual == "completada"
     assert tarea_actualizada.tiempo_total_segundos is not None
+
+
+async def _crear_historial(db, cantidad):
+    """Tareas del miembro 1 con fechas repetidas y algunas sin fecha límite"""
+    base = datetime(2025, 1, 1, 8, 0, 0)
+    for i in range(cantidad):
+        db.add(
+            Tarea(
+                titulo=f"Tarea {i}",
+                categoria="cocina" if i % 2 else "limpieza",
+                repeticion="semanal" if i % 3 == 0 else "ninguna",
+                fecha_limite=None if i % 5 == 0 else date(2025, 2, 1 + i % 4),
+                fecha_creacion=base + timedelta(hours=i // 2),
+                asignado_a=1,
+                id_hogar=1,
+            )
+        )
+    await db.flush()
+
+
+async def _recorrer(db, **kwargs):
+    vistas, cursor, paginas = [], None, 0
+    while True:
+        tareas, cursor = await listar_tareas_por_miembro_paginado(
+            db, 1, cursor=cursor, limite=4, **kwargs
+        )
+        vistas.extend(tareas)
+        paginas += 1
+        if cursor is None:
+            return vistas, paginas
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("orden", ["fecha_limite", "fecha_creacion"])
+async def test_paginacion_keyset_recorre_todo_sin_repetir(
+    db: AsyncSession, setup_miembro_admin, orden
+):
+    await _crear_historial(db, 23)
+
+    vistas, paginas = await _recorrer(db, orden=orden)
+
+    assert len(vistas) == 23
+    assert len({t.id for t in vistas}) == 23
+    assert paginas == 6
+    if orden == "fecha_creacion":
+        claves = [(t.fecha_creacion, t.id) for t in vistas]
+        assert claves == sorted(claves, reverse=True)
+    else:
+        claves = [(t.fecha_limite is not None, t.fecha_limite, t.id) for t in vistas]
+        assert claves == sorted(claves, key=lambda c: (c[0], c[1] or date.min, c[2]))
+
+
+@pytest.mark.asyncio
+async def test_paginacion_por_fecha_creacion_con_filas_sin_fecha(
+    db: AsyncSession, setup_miembro_admin
+):
+    # Filas antiguas sin fecha_creacion: van al final y el cursor que cae en
+    # ellas sigue siendo válido
+    await _crear_historial(db, 10)
+    await db.execute(
+        update(Tarea).where(Tarea.id.in_([2, 3, 5, 7])).values(fecha_creacion=None)
+    )
+    await db.flush()
+    db.expire_all()
+
+    vistas, paginas = await _recorrer(db, orden="fecha_creacion")
+
+    assert sorted(t.id for t in vistas) == list(range(1, 11))
+    assert paginas == 3
+    assert [t.id for t in vistas[-4:]] == [7, 5, 3, 2]
+
+
+@pytest.mark.asyncio
+async def test_paginacion_con_filtros(db: AsyncSession, setup_miembro_admin):
+    await _crear_historial(db, 23)
+
+    vistas, _ = await _recorrer(
+        db,
+        categoria="cocina",
+        repeticion="ninguna",
+        fecha_limite_desde=date(2025, 2, 2),
+        fecha_limite_hasta=date(2025, 2, 3),
+    )
+
+    assert vistas
+    for tarea in vistas:
+        assert tarea.categoria == "cocina"
+        assert tarea.repeticion == "ninguna"
+        assert date(2025, 2, 2) <= tarea.fecha_limite <= date(2025, 2, 3)
+
+
+@pytest.mark.asyncio
+async def test_paginacion_rechaza_cursor_ajeno(db: AsyncSession, setup_miembro_admin):
+    await _crear_historial(db, 6)
+    _, cursor = await listar_tareas_por_miembro_paginado(
+        db, 1, orden="fecha_creacion", limite=2
+    )
+
+    with pytest.raises(ValueError):
+        await listar_tareas_por_miembro_paginado(
+            db, 1, orden="fecha_limite", cursor=cursor
+        )
+    with pytest.raises(ValueError):
+        await listar_tareas_por_miembro_paginado(db, 1, cursor="no-es-un-cursor")
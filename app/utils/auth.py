@@ -1,3 +1,4 @@
+from dataclasses import dataclass, replace
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
@@ -5,13 +6,95 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from db.database import get_db
 from models.miembro import Miembro
 from config.config import settings
+from utils.cache import CacheTTL
+from utils.contexto import obtener_contexto
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+
+@dataclass(frozen=True)
+class MiembroPrincipal:
+    """Instantánea ligera del miembro autenticado (lo que usan rutas y permisos)."""
+
+    id: int
+    id_hogar: int
+    id_rol: int
+    estado: bool
+    nombre_completo: str
+    # Solo en tokens con TOKEN_MODO="permisos": máscaras por módulo y huella
+    # de la matriz con la que se emitieron. Las máscaras solo se usan mientras
+    # la huella coincida con la de la matriz vigente
+    permisos: dict | None = None
+    version_permisos: str | None = None
+
+
+# Caché de principales por 'sub' del token: evita un db.get(Miembro) por petición
+cache_principales = CacheTTL(
+    max_entradas=settings.PRINCIPAL_CACHE_MAX_ENTRADAS,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SEGUNDOS,
+)
+
+
+def invalidar_principal(miembro_id: int):
+    """Descarta el principal cacheado; llamar cuando cambie o se desactive el miembro."""
+    cache_principales.invalidar(int(miembro_id))
+
+
+async def resolver_principal(db: AsyncSession, miembro_id: int):
+    """
+    Devuelve el MiembroPrincipal activo para el id dado, primero desde la caché
+    y si no desde la base de datos. Retorna None si no existe o está inactivo.
+    """
+    principal = cache_principales.obtener(miembro_id)
+    if principal is not None:
+        return principal
+
+    miembro = await db.get(Miembro, miembro_id)
+    if miembro is None or not miembro.estado:
+        return None
+
+    principal = MiembroPrincipal(
+        id=miembro.id,
+        id_hogar=miembro.id_hogar,
+        id_rol=miembro.id_rol,
+        estado=miembro.estado,
+        nombre_completo=miembro.nombre_completo,
+    )
+    cache_principales.guardar(miembro_id, principal)
+    return principal
+
+
+def principal_desde_claims(payload: dict, principal: MiembroPrincipal):
+    """
+    Añade al principal (resuelto desde caché o BD, que es quien sabe si el
+    miembro sigue activo y con qué rol) las máscaras de un token emitido en
+    modo "permisos". Si el token no trae esos claims, o se emitió para otro
+    rol, el principal se devuelve tal cual y se decide con la matriz.
+    """
+    if settings.TOKEN_MODO != "permisos" or "perm" not in payload:
+        return principal
+    try:
+        if int(payload["id_rol"]) != principal.id_rol:
+            return principal
+        return replace(
+            principal,
+            permisos=dict(payload["perm"]),
+            version_permisos=payload.get("pv"),
+        )
+    except (KeyError, TypeError, ValueError):
+        return principal
+
+
 async def obtener_miembro_actual(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db)
 ):
+    # Si la identidad ya se resolvió en esta petición (otra dependencia,
+    # require_permission...), se reutiliza tal cual
+    contexto = obtener_contexto()
+    if contexto is not None and contexto.miembro is not None:
+        return contexto.miembro
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credenciales inválidas",
@@ -20,12 +103,16 @@ async def obtener_miembro_actual(
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         miembro_id: str = payload.get("sub")
-        if miembro_id is None:
+        if miembro_id is None or payload.get("typ") == "refresh":
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    miembro = await db.get(Miembro, int(miembro_id))
-    if miembro is None or not miembro.estado:
+    miembro = await resolver_principal(db, int(miembro_id))
+    if miembro is None:
         raise credentials_exception
-    return miembro
\ No newline at end of file
+    miembro = principal_desde_claims(payload, miembro)
+
+    if contexto is not None:
+        contexto.miembro = miembro
+    return miembro
@@ -0,0 +1,65 @@
+import time
+from collections import OrderedDict
+
+
+class CacheTTL:
+    """
+    Caché en memoria (por proceso) con expiración por TTL y desalojo LRU.
+
+    No es thread-safe: está pensada para usarse desde el event loop.
+
+    Args:
+        max_entradas (int): Número máximo de entradas antes de desalojar la más antigua
+        ttl (float): Segundos de vida de cada entrada
+    """
+
+    def __init__(self, max_entradas: int = 1024, ttl: float = 60.0):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.desalojos = 0
+
+    def obtener(self, clave):
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            self.misses += 1
+            return None
+
+        valor, expira = entrada
+        if expira < time.monotonic():
+            del self._datos[clave]
+            self.misses += 1
+            return None
+
+        self._datos.move_to_end(clave)
+        self.hits += 1
+        return valor
+
+    def guardar(self, clave, valor):
+        self._datos[clave] = (valor, time.monotonic() + self.ttl)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.max_entradas:
+            self._datos.popitem(last=False)
+            self.desalojos += 1
+
+    def invalidar(self, clave):
+        self._datos.pop(clave, None)
+
+    def limpiar(self):
+        self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+    def metricas(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entradas": len(self._datos),
+            "max_entradas": self.max_entradas,
+            "hits": self.hits,
+            "misses": self.misses,
+            "desalojos": self.desalojos,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,51 @@
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from uuid import uuid4
+
+
+@dataclass
+class ContextoPeticion:
+    """
+    Estado compartido durante una petición HTTP: identidad resuelta una sola
+    vez y disponible para permisos, servicios y logging.
+    """
+
+    request_id: str = field(default_factory=lambda: uuid4().hex[:12])
+    ruta: str = ""
+    miembro: object = None  # MiembroPrincipal una vez autenticado
+
+
+_contexto_actual: ContextVar[ContextoPeticion | None] = ContextVar(
+    "contexto_peticion", default=None
+)
+
+
+def obtener_contexto() -> ContextoPeticion | None:
+    """Contexto de la petición en curso (None fuera de una petición HTTP)."""
+    return _contexto_actual.get()
+
+
+def miembro_actual_en_contexto():
+    """Principal ya resuelto en esta petición, o None."""
+    contexto = _contexto_actual.get()
+    return contexto.miembro if contexto else None
+
+
+class ContextoPeticionMiddleware:
+    """Middleware ASGI que abre un ContextoPeticion por cada petición HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        contexto = ContextoPeticion(ruta=scope.get("path", ""))
+        scope.setdefault("state", {})["contexto"] = contexto
+        token = _contexto_actual.set(contexto)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _contexto_actual.reset(token)
@@ -0,0 +1,141 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException, status
+from config.config import settings
+from utils.security import obtener_hash_contrasena, verificar_contrasena
+from utils.logger import setup_logger
+
+logger = setup_logger("hashing")
+
+
+class ServicioHashSaturado(RuntimeError):
+    """Se lanza cuando la cola del pool de hashing supera su límite."""
+
+
+def error_servicio_saturado(e: ServicioHashSaturado) -> HTTPException:
+    """503 con Retry-After para las rutas que hashean contraseñas."""
+    # El pool de bcrypt está lleno: pedimos al cliente que reintente
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": "1"},
+    )
+
+
+class ServicioHash:
+    """
+    Ejecuta bcrypt (hash y verificación) en un pool acotado para no bloquear
+    el event loop de uvicorn.
+
+    Args:
+        tipo (str): "thread", "process" o "inline" (ejecuta en el propio loop)
+        max_workers (int): Número de workers del pool
+        max_pendientes (int): Máximo de operaciones en cola + en ejecución;
+            por encima de ese límite se rechaza con ServicioHashSaturado
+    """
+
+    def __init__(
+        self, tipo: str = "thread", max_workers: int = 4, max_pendientes: int = 64
+    ):
+        if tipo not in ("thread", "process", "inline"):
+            raise ValueError(f"Tipo de pool de hashing no válido: {tipo}")
+        self.tipo = tipo
+        self.max_workers = max_workers
+        self.max_pendientes = max_pendientes
+        self._executor: Executor | None = None
+
+        # Métricas
+        self.pendientes = 0
+        self.pico_pendientes = 0
+        self.completadas = 0
+        self.rechazadas = 0
+        self.errores = 0
+        self.tiempo_espera_total = 0.0
+        self.tiempo_ejecucion_total = 0.0
+
+    def _obtener_executor(self) -> Executor | None:
+        if self.tipo == "inline":
+            return None
+        if self._executor is None:
+            if self.tipo == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="hash"
+                )
+            logger.info(
+                f"Pool de hashing iniciado: tipo={self.tipo}, workers={self.max_workers}"
+            )
+        return self._executor
+
+    async def _ejecutar(self, funcion, *args):
+        if self.pendientes >= self.max_pendientes:
+            self.rechazadas += 1
+            logger.warning(
+                f"Pool de hashing saturado ({self.pendientes} pendientes), operación rechazada"
+            )
+            raise ServicioHashSaturado("Servicio de autenticación saturado")
+
+        self.pendientes += 1
+        self.pico_pendientes = max(self.pico_pendientes, self.pendientes)
+        encolado = time.perf_counter()
+        try:
+            executor = self._obtener_executor()
+            if executor is None:
+                resultado, duracion = _cronometrar(funcion, *args)
+            else:
+                loop = asyncio.get_running_loop()
+                resultado, duracion = await loop.run_in_executor(
+                    executor, _cronometrar, funcion, *args
+                )
+            total = time.perf_counter() - encolado
+            self.tiempo_ejecucion_total += duracion
+            self.tiempo_espera_total += max(total - duracion, 0.0)
+            self.completadas += 1
+            return resultado
+        except Exception:
+            self.errores += 1
+            raise
+        finally:
+            self.pendientes -= 1
+
+    async def hash(self, contrasena: str) -> str:
+        return await self._ejecutar(obtener_hash_contrasena, contrasena)
+
+    async def verificar(self, contrasena: str, hash_contrasena: str) -> bool:
+        return await self._ejecutar(verificar_contrasena, contrasena, hash_contrasena)
+
+    def metricas(self) -> dict:
+        return {
+            "tipo": self.tipo,
+            "workers": self.max_workers,
+            "max_pendientes": self.max_pendientes,
+            "pendientes": self.pendientes,
+            "pico_pendientes": self.pico_pendientes,
+            "completadas": self.completadas,
+            "rechazadas": self.rechazadas,
+            "errores": self.errores,
+            "tiempo_espera_total": self.tiempo_espera_total,
+            "tiempo_ejecucion_total": self.tiempo_ejecucion_total,
+        }
+
+    def cerrar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info("Pool de hashing cerrado")
+
+
+def _cronometrar(funcion, *args):
+    # Se ejecuta dentro del worker: devuelve el resultado y lo que tardó en él
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+servicio_hash = ServicioHash(
+    tipo=settings.HASH_POOL_TIPO,
+    max_workers=settings.HASH_POOL_WORKERS,
+    max_pendientes=settings.HASH_POOL_MAX_PENDIENTES,
+)
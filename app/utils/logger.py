@@ -1,26 +1,89 @@
+import atexit
 import logging
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import os
+from config.config import settings
+from utils.contexto import obtener_contexto
 
 # Configurar el directorio de logs
 log_directory = "logs"
 if not os.path.exists(log_directory):
     os.makedirs(log_directory)
 
+# Formateador más detallado
+formatter = logging.Formatter(
+    "%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - "
+    "[req=%(request_id)s miembro=%(miembro_id)s] - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
 
-# Configurar el logger
-def setup_logger(name):
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)  # Cambiar a DEBUG para capturar más detalles
 
-    # Crear formateador más detallado
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
+class ContextoPeticionFilter(logging.Filter):
+    """Añade el request_id y el miembro autenticado de la petición en curso."""
+
+    def filter(self, record):
+        contexto = obtener_contexto()
+        miembro = contexto.miembro if contexto else None
+        record.request_id = contexto.request_id if contexto else "-"
+        record.miembro_id = miembro.id if miembro else "-"
+        return True
+
+
+contexto_filter = ContextoPeticionFilter()
+
+
+class MuestreoFilter(logging.Filter):
+    """
+    Recorta el volumen de un logger por debajo de WARNING: deja pasar 1 de
+    cada ``muestreo`` registros y como mucho ``limite`` por segundo. Avisos y
+    errores nunca se descartan. Va en el logger, así que lo descartado no se
+    formatea ni se encola.
+    """
+
+    def __init__(self, muestreo: int = 1, limite: int = 0):
+        super().__init__()
+        self.muestreo = max(muestreo, 1)
+        self.limite = limite
+        self._vistos = 0
+        self._segundo = 0
+        self._en_segundo = 0
+        # Métricas
+        self.muestreados = 0
+        self.limitados = 0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        self._vistos += 1
+        # El primero de cada N pasa (no el N-ésimo)
+        if (self._vistos - 1) % self.muestreo:
+            self.muestreados += 1
+            return False
+        if self.limite > 0:
+            segundo = int(record.created)
+            if segundo != self._segundo:
+                self._segundo, self._en_segundo = segundo, 0
+            if self._en_segundo >= self.limite:
+                self.limitados += 1
+                return False
+            self._en_segundo += 1
+        return True
+
+
+def _por_logger(texto: str) -> dict[str, str]:
+    """'a=1,b=2' → {'a': '1', 'b': '2'} (entradas vacías ignoradas)."""
+    pares = {}
+    for entrada in texto.split(","):
+        if "=" in entrada:
+            nombre, valor = entrada.split("=", 1)
+            pares[nombre.strip()] = valor.strip()
+    return pares
 
-    # Configurar handler para archivo
+
+def _handler_fichero(name: str) -> RotatingFileHandler:
     file_handler = RotatingFileHandler(
         os.path.join(log_directory, f"{name}.log"),
         maxBytes=10 * 1024 * 1024,  # 10MB
@@ -29,12 +92,185 @@ def setup_logger(name):
     )
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    return file_handler
+
 
-    # Configurar handler para consola
+def _handler_consola() -> logging.StreamHandler:
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)  # Mantener INFO en consola para no saturar
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    return console_handler
+
+
+class EnrutadorLogs(logging.Handler):
+    """
+    Único handler del hilo listener: manda cada registro al fichero de su
+    logger y, desde INFO, a la consola.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.ficheros: dict[str, logging.Handler] = {}
+        self.consola = _handler_consola()
+
+    def handle(self, record):
+        vaciado = getattr(record, "vaciado", None)
+        if vaciado is not None:
+            # Marca de vaciar_logs(): todo lo anterior ya está escrito
+            vaciado.set()
+            return True
+        fichero = self.ficheros.get(record.name)
+        if fichero is not None and record.levelno >= fichero.level:
+            fichero.handle(record)
+        if record.levelno >= self.consola.level:
+            self.consola.handle(record)
+        return True
+
+
+# Cola compartida por todos los loggers y su único listener (modo "cola")
+_cola: queue.SimpleQueue = queue.SimpleQueue()
+_enrutador: EnrutadorLogs | None = None
+_listener: QueueListener | None = None
+_configurados: set[str] = set()
+_filtros_muestreo: dict[str, MuestreoFilter] = {}
+_lock = threading.Lock()
+
+
+def _iniciar_listener():
+    global _enrutador, _listener
+    if _listener is None:
+        _enrutador = _enrutador or EnrutadorLogs()
+        _listener = QueueListener(_cola, _enrutador)
+        _listener.start()
+
+
+def detener_logging():
+    """Escribe lo que quede en la cola y para el hilo listener."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(detener_logging)
+
+
+def configurar_logger(name: str):
+    """
+    Aplica a un logger ya creado el nivel, el muestreo y el límite de
+    settings (LOG_NIVEL, LOG_NIVELES, LOG_MUESTREO, LOG_LIMITE_POR_SEGUNDO).
+    """
+    logger = logging.getLogger(name)
+    niveles = _por_logger(settings.LOG_NIVELES)
+    muestreo = _por_logger(settings.LOG_MUESTREO)
+    limites = _por_logger(settings.LOG_LIMITE_POR_SEGUNDO)
+
+    nivel = niveles.get(name, niveles.get("*", settings.LOG_NIVEL)).upper()
+    logger.setLevel(nivel)
+
+    muestreo_filter = _filtros_muestreo.get(name)
+    if muestreo_filter is None:
+        muestreo_filter = _filtros_muestreo[name] = MuestreoFilter()
+        logger.addFilter(muestreo_filter)
+    muestreo_filter.muestreo = max(int(muestreo.get(name, muestreo.get("*", 1))), 1)
+    muestreo_filter.limite = int(limites.get(name, limites.get("*", 0)))
+
+
+def configurar_logs():
+    """
+    Vuelve a leer la configuración de settings para todos los loggers: tras
+    cambiar settings en caliente, los niveles y límites nuevos se aplican
+    sin reiniciar. La llama actualizar_config_logs (PUT /metricas/logs).
+    """
+    with _lock:
+        for name in _configurados:
+            configurar_logger(name)
+
+
+# Opciones de settings que se pueden cambiar en caliente (PUT /metricas/logs)
+OPCIONES_LOGS = ("LOG_NIVEL", "LOG_NIVELES", "LOG_MUESTREO", "LOG_LIMITE_POR_SEGUNDO")
+
+
+def actualizar_config_logs(**cambios) -> dict:
+    """
+    Cambia en settings las opciones de OPCIONES_LOGS indicadas (None = no
+    tocar) y las aplica con configurar_logs(). Valida todo antes de cambiar
+    nada: lanza ValueError si un nivel o un número no es válido. Solo afecta
+    al proceso actual. Devuelve la configuración resultante.
+    """
+    nuevos = {opcion: getattr(settings, opcion) for opcion in OPCIONES_LOGS}
+    for opcion, valor in cambios.items():
+        if opcion not in nuevos:
+            raise ValueError(f"Opción de logs desconocida: {opcion}")
+        if valor is not None:
+            nuevos[opcion] = valor
+
+    for nivel in [nuevos["LOG_NIVEL"], *_por_logger(nuevos["LOG_NIVELES"]).values()]:
+        if not isinstance(logging.getLevelName(nivel.upper()), int):
+            raise ValueError(f"Nivel de log desconocido: {nivel}")
+    for opcion in ("LOG_MUESTREO", "LOG_LIMITE_POR_SEGUNDO"):
+        for valor in _por_logger(nuevos[opcion]).values():
+            if not valor.isdigit():
+                raise ValueError(f"{opcion}: '{valor}' no es un entero")
+
+    for opcion, valor in nuevos.items():
+        setattr(settings, opcion, valor)
+    configurar_logs()
+    return nuevos
+
+
+def metricas_logs() -> dict:
+    """Por logger: registros descartados por muestreo y por límite."""
+    return {
+        name: {"muestreados": f.muestreados, "limitados": f.limitados}
+        for name, f in _filtros_muestreo.items()
+    }
+
+
+def vaciar_logs(timeout: float = 2.0) -> bool:
+    """Espera a que el listener haya escrito todo lo encolado hasta ahora."""
+    if _listener is None:
+        return True
+    evento = threading.Event()
+    _cola.put_nowait(logging.makeLogRecord({"vaciado": evento}))
+    return evento.wait(timeout)
+
+
+# Configurar el logger
+def setup_logger(name):
+    """
+    Devuelve el logger ``name`` con sus handlers. Es idempotente: llamarlo
+    varias veces con el mismo nombre no duplica handlers. El nivel, el
+    muestreo y el límite salen de settings (ver configurar_logger).
+
+    Con settings.LOG_MODO="cola" el logger solo tiene un QueueHandler: quien
+    registra (p. ej. una petición) añade el contexto y encola, y el listener
+    formatea, escribe en ``logs/<name>.log`` (y consola) y rota.
+    """
+    logger = logging.getLogger(name)
+    with _lock:
+        if name in _configurados:
+            return logger
+        configurar_logger(name)
+
+        if settings.LOG_MODO == "cola":
+            _iniciar_listener()
+            _enrutador.ficheros[name] = _handler_fichero(name)
+            # El contexto de la petición se lee aquí: el listener no lo tiene
+            cola_handler = QueueHandler(_cola)
+            cola_handler.addFilter(contexto_filter)
+            logger.addHandler(cola_handler)
+        elif settings.LOG_MODO == "sincrono":
+            file_handler = _handler_fichero(name)
+            file_handler.addFilter(contexto_filter)
+            logger.addHandler(file_handler)
+
+            console_handler = _handler_consola()
+            console_handler.addFilter(contexto_filter)
+            logger.addHandler(console_handler)
+        else:
+            raise ValueError(f"Modo de logging desconocido: {settings.LOG_MODO}")
 
+        _configurados.add(name)
     return logger
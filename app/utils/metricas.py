@@ -0,0 +1,202 @@
+"""
+Métricas en formato de texto de Prometheus (GET /metrics), sin dependencias.
+
+- Contador e Histograma: series con etiquetas que se actualizan en el camino
+  caliente (latencia HTTP por plantilla de ruta, espera de checkout del pool,
+  tiempo de difusión del chat). Se crean con ``registro.contador()`` /
+  ``registro.histograma()`` en el módulo que mide.
+- familia(): el resto de series se calcula al exponer a partir de las
+  métricas que ya tiene cada componente (ver routes/metricas_routes.py).
+
+Como CacheTTL, no es thread-safe: se actualiza desde el event loop.
+"""
+
+import time
+from bisect import bisect_left
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+# Segundos: de 5 ms a 10 s para peticiones, de 0,1 ms a 5 s para esperas cortas
+BUCKETS_PETICION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CORTOS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _numero(valor) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    if isinstance(valor, bool):
+        return "1" if valor else "0"
+    return repr(valor) if isinstance(valor, float) else str(int(valor))
+
+
+def _serie(nombre: str, etiquetas: dict, valor) -> str:
+    if not etiquetas:
+        return f"{nombre} {_numero(valor)}"
+    pares = ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas.items())
+    return f"{nombre}{{{pares}}} {_numero(valor)}"
+
+
+def familia(nombre: str, tipo: str, ayuda: str, muestras) -> list[str]:
+    """
+    Líneas de una familia de métricas: cabeceras HELP/TYPE y una serie por
+    muestra ``(etiquetas, valor)``.
+    """
+    lineas = [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"]
+    lineas.extend(_serie(nombre, etiquetas, valor) for etiquetas, valor in muestras)
+    return lineas
+
+
+class Contador:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._valores: dict[tuple, float] = {}
+
+    def incrementar(self, *valores, cantidad: float = 1):
+        self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def valor(self, *valores) -> float:
+        return self._valores.get(valores, 0)
+
+    def exponer(self) -> list[str]:
+        return familia(
+            self.nombre,
+            "counter",
+            self.ayuda,
+            (
+                (dict(zip(self.etiquetas, valores)), total)
+                for valores, total in self._valores.items()
+            ),
+        )
+
+
+class Histograma:
+    def __init__(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: tuple = (),
+        buckets: tuple = BUCKETS_PETICION,
+    ):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.buckets = tuple(sorted(buckets))
+        # { valores de etiquetas: [cuentas por bucket (+Inf al final), suma] }
+        self._series: dict[tuple, list] = {}
+        if not etiquetas:
+            # Sin etiquetas la serie existe desde el principio (a cero)
+            self._series[()] = [[0] * (len(self.buckets) + 1), 0.0]
+
+    def observar(self, valor: float, *valores):
+        serie = self._series.get(valores)
+        if serie is None:
+            serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0]
+        serie[0][bisect_left(self.buckets, valor)] += 1
+        serie[1] += valor
+
+    def cuenta(self, *valores) -> int:
+        serie = self._series.get(valores)
+        return sum(serie[0]) if serie else 0
+
+    def exponer(self) -> list[str]:
+        lineas = [
+            f"# HELP {self.nombre} {self.ayuda}",
+            f"# TYPE {self.nombre} histogram",
+        ]
+        for valores, (cuentas, suma) in self._series.items():
+            etiquetas = dict(zip(self.etiquetas, valores))
+            acumulado = 0
+            for limite, cuenta in zip(self.buckets + (float("inf"),), cuentas):
+                acumulado += cuenta
+                lineas.append(
+                    _serie(
+                        f"{self.nombre}_bucket",
+                        {**etiquetas, "le": _numero(float(limite))},
+                        acumulado,
+                    )
+                )
+            lineas.append(_serie(f"{self.nombre}_sum", etiquetas, suma))
+            lineas.append(_serie(f"{self.nombre}_count", etiquetas, acumulado))
+        return lineas
+
+
+class RegistroMetricas:
+    """Contadores e histogramas del proceso, por nombre (crearlos es idempotente)."""
+
+    def __init__(self):
+        self._metricas: dict[str, Contador | Histograma] = {}
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: tuple = ()) -> Contador:
+        if nombre not in self._metricas:
+            self._metricas[nombre] = Contador(nombre, ayuda, etiquetas)
+        return self._metricas[nombre]
+
+    def histograma(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: tuple = (),
+        buckets: tuple = BUCKETS_PETICION,
+    ) -> Histograma:
+        if nombre not in self._metricas:
+            self._metricas[nombre] = Histograma(nombre, ayuda, etiquetas, buckets)
+        return self._metricas[nombre]
+
+    def exponer(self) -> list[str]:
+        lineas = []
+        for metrica in self._metricas.values():
+            lineas.extend(metrica.exponer())
+        return lineas
+
+
+registro = RegistroMetricas()
+
+duracion_peticiones = registro.histograma(
+    "hometasks_http_duracion_segundos",
+    "Latencia de las peticiones HTTP por plantilla de ruta",
+    ("metodo", "ruta"),
+)
+peticiones = registro.contador(
+    "hometasks_http_peticiones_total",
+    "Peticiones HTTP por plantilla de ruta y código de estado",
+    ("metodo", "ruta", "estado"),
+)
+
+
+class MetricasHTTPMiddleware:
+    """
+    Middleware ASGI: latencia (hasta el último byte) y código de estado de
+    cada petición, por plantilla de ruta ("/tareas/{tarea_id}") para no crear
+    una serie por URL. Las que no casan con ninguna ruta van a "(sin ruta)".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            ruta = getattr(scope.get("route"), "path", None) or "(sin ruta)"
+            metodo = scope.get("method", "")
+            duracion_peticiones.observar(time.perf_counter() - inicio, metodo, ruta)
+            peticiones.incrementar(metodo, ruta, str(estado))
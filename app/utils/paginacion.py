@@ -0,0 +1,23 @@
+import base64
+import json
+
+
+def codificar_cursor(datos: dict) -> str:
+    """
+    Cursor opaco para paginación por keyset: JSON compacto en base64 url-safe.
+    El cliente solo lo devuelve tal cual; su contenido no es parte de la API.
+    """
+    crudo = json.dumps(datos, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> dict:
+    """Lanza ValueError si el cursor está corrupto o no es un objeto."""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
+    if not isinstance(datos, dict):
+        raise ValueError("Cursor inválido")
+    return datos
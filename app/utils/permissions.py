@@ -2,13 +2,36 @@ from fastapi import Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.database import get_db
 from utils.auth import obtener_miembro_actual
-from services.permiso_service import verificar_permiso
+from services.permiso_service import matriz_permisos, BITS_ACCION
 from utils.logger import setup_logger
 
 # Configurar logger específico para el módulo de permisos
 logger = setup_logger("permissions")
 
 
+def _mascaras_al_dia(current_user) -> bool:
+    """
+    True si el token trae máscaras (TOKEN_MODO="permisos") emitidas con la
+    misma huella que la matriz vigente en este worker.
+    """
+    return (
+        getattr(current_user, "permisos", None) is not None
+        and matriz_permisos.vigente
+        and getattr(current_user, "version_permisos", None) == matriz_permisos.huella
+    )
+
+
+def _tiene_permiso(current_user, modulo_nombre: str, accion: str) -> bool:
+    """
+    Usa las máscaras embebidas en el token si siguen al día; si no (sin
+    máscaras, o la matriz cambió desde que se emitió), consulta la matriz.
+    """
+    if _mascaras_al_dia(current_user):
+        permisos = current_user.permisos
+        return bool(permisos.get(modulo_nombre, 0) & BITS_ACCION.get(accion, 0))
+    return matriz_permisos.permite(current_user.id_rol, modulo_nombre, accion)
+
+
 def require_permission(modulo_nombre: str, accion: str):
     """
     Decorador que verifica si el usuario actual tiene permisos para realizar una acción específica.
@@ -46,18 +69,30 @@ def require_permission(modulo_nombre: str, accion: str):
         """
         try:
             # Registrar el intento de verificación de permisos
-            logger.info(
-                f"Verificando permisos para usuario {current_user.id} "
-                f"en módulo '{modulo_nombre}' para acción '{accion}'"
+            logger.debug(
+                "Verificando permisos para usuario %s en módulo '%s' para acción '%s'",
+                current_user.id,
+                modulo_nombre,
+                accion,
             )
 
             # Verificar si el usuario actual tiene el permiso requerido
-            # para realizar la acción especificada en el módulo dado
-            if not await verificar_permiso(db, current_user.id, modulo_nombre, accion):
+            # para realizar la acción especificada en el módulo dado.
+            # Un token con máscaras cuya huella coincide con la matriz vigente
+            # se resuelve sin consultas. Si no, la matriz en memoria responde
+            # en O(1) y solo consulta la BD cuando hay que recargarla.
+            if not _mascaras_al_dia(current_user):
+                await matriz_permisos.asegurar(db)
+            if not current_user.estado or not _tiene_permiso(
+                current_user, modulo_nombre, accion
+            ):
                 # Registrar el acceso denegado
                 logger.warning(
-                    f"Acceso denegado: Usuario {current_user.id} "
-                    f"no tiene permisos para '{accion}' en módulo '{modulo_nombre}'"
+                    "Acceso denegado: Usuario %s no tiene permisos para '%s' "
+                    "en módulo '%s'",
+                    current_user.id,
+                    accion,
+                    modulo_nombre,
                 )
 
                 # Si no tiene permisos, lanzar excepción HTTP 403 (Forbidden)
@@ -66,10 +101,12 @@ def require_permission(modulo_nombre: str, accion: str):
                     detail="No tienes permiso para esta acción",
                 )
 
-            # Registrar el acceso exitoso
+            # Registrar el acceso exitoso (muestreado: ver settings.LOG_MUESTREO)
             logger.info(
-                f"Acceso autorizado: Usuario {current_user.id} "
-                f"tiene permisos para '{accion}' en módulo '{modulo_nombre}'"
+                "Acceso autorizado: Usuario %s tiene permisos para '%s' en módulo '%s'",
+                current_user.id,
+                accion,
+                modulo_nombre,
             )
 
             # Si tiene permisos, devolver el usuario autenticado
@@ -94,3 +131,26 @@ def require_permission(modulo_nombre: str, accion: str):
             )
 
     return _wrapper
+
+
+# Rol administrador (el mismo que asume services/auth_service.py)
+ID_ROL_ADMINISTRADOR = 1
+
+
+async def require_admin(current_user=Depends(obtener_miembro_actual)):
+    """
+    Dependencia para endpoints solo de administración (diagnóstico, métricas
+    internas): exige un miembro activo con el rol administrador.
+
+    Raises:
+        HTTPException: 403 si el miembro no es administrador
+    """
+    if not current_user.estado or current_user.id_rol != ID_ROL_ADMINISTRADOR:
+        logger.warning(
+            "Acceso denegado: Usuario %s no es administrador", current_user.id
+        )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo disponible para administradores",
+        )
+    return current_user
@@ -56,14 +56,14 @@ def crear_token_acceso(data: dict, expires_delta: timedelta = None) -> str:
 
 def decode_jwt(token: str):
     try:
-        logger.info("Decodificando token JWT")
+        logger.debug("Decodificando token JWT")
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        logger.info("Token JWT decodificado exitosamente")
+        logger.debug("Token JWT decodificado exitosamente")
         return payload
     except JWTError as e:
-        logger.warning(f"Error al decodificar token JWT: {str(e)}")
+        logger.warning("Error al decodificar token JWT: %s", e)
         return None
     except Exception as e:
         logger.error(f"Error inesperado al decodificar token JWT: {str(e)}")
@@ -0,0 +1,170 @@
+"""
+Brokers de difusión del chat entre workers.
+
+ConnectionManager.broadcast publica una vez en el broker y el broker llama a
+``entregar(hogar_id, mensaje)`` en cada worker para que reparta a sus sockets
+locales. Backends:
+
+- "proceso": un solo worker, entrega directa (comportamiento por defecto).
+- "sqlite": relay local por un fichero SQLite compartido (modo WAL). Cada
+  worker inserta lo que publica y sondea las filas nuevas de los demás cada
+  CHAT_BROKER_SONDEO_MS. Pensado para varios workers en una misma máquina.
+"""
+
+import asyncio
+import json
+from abc import ABC, abstractmethod
+import time
+import uuid
+from typing import Callable
+
+import aiosqlite
+
+from config.config import settings
+from utils.logger import setup_logger
+
+logger = setup_logger("chat_broker")
+
+Entregar = Callable[[int, dict], None]
+
+
+class Broker(ABC):
+    """Interfaz: iniciar con la función de entrega local, publicar y cerrar."""
+
+    # True si cada worker recibe lo que publican los demás
+    compartido = False
+
+    @abstractmethod
+    async def iniciar(self, entregar: Entregar):
+        """Guarda ``entregar`` y arranca lo que necesite el backend."""
+
+    @abstractmethod
+    async def publicar(self, hogar_id: int, mensaje: dict):
+        """Hace llegar ``mensaje`` a ``entregar`` en todos los workers."""
+
+    @abstractmethod
+    async def cerrar(self):
+        """Libera conexiones y tareas del backend."""
+
+
+class BrokerEnProceso(Broker):
+    def __init__(self):
+        self._entregar = None
+
+    async def iniciar(self, entregar: Entregar):
+        self._entregar = entregar
+
+    async def publicar(self, hogar_id: int, mensaje: dict):
+        self._entregar(hogar_id, mensaje)
+
+    async def cerrar(self):
+        pass
+
+
+class BrokerSQLite(Broker):
+    compartido = True
+
+    def __init__(
+        self,
+        ruta: str,
+        intervalo_sondeo: float = 0.02,
+        retencion_segundos: float = 60.0,
+    ):
+        self.ruta = ruta
+        self.intervalo_sondeo = intervalo_sondeo
+        self.retencion_segundos = retencion_segundos
+        # Identifica a este worker para no re-entregarse lo que ya entregó
+        self.origen = uuid.uuid4().hex
+        self._entregar = None
+        self._conexion = None
+        self._tarea = None
+        self._ultimo_id = 0
+        self._ultima_limpieza = 0.0
+
+    async def iniciar(self, entregar: Entregar):
+        self._entregar = entregar
+        self._conexion = await aiosqlite.connect(self.ruta, timeout=5)
+        await self._conexion.execute("PRAGMA journal_mode=WAL")
+        await self._conexion.execute("PRAGMA synchronous=NORMAL")
+        await self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS relay_chat ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, origen TEXT NOT NULL, "
+            "hogar_id INTEGER NOT NULL, carga TEXT NOT NULL, creado REAL NOT NULL)"
+        )
+        await self._conexion.commit()
+        # Solo lo publicado a partir de ahora: no se re-emite el historial
+        async with self._conexion.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM relay_chat"
+        ) as cursor:
+            (self._ultimo_id,) = await cursor.fetchone()
+        self._tarea = asyncio.create_task(self._sondear())
+        logger.info(f"Broker SQLite iniciado en {self.ruta} (origen {self.origen})")
+
+    async def publicar(self, hogar_id: int, mensaje: dict):
+        await self._conexion.execute(
+            "INSERT INTO relay_chat (origen, hogar_id, carga, creado) "
+            "VALUES (?, ?, ?, ?)",
+            (self.origen, hogar_id, json.dumps(mensaje), time.time()),
+        )
+        await self._conexion.commit()
+        # Los sockets de este worker no esperan al sondeo
+        self._entregar(hogar_id, mensaje)
+
+    async def _sondear(self):
+        while True:
+            try:
+                await self._leer_nuevos()
+                await self._limpiar()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error al sondear el relay de chat: {str(e)}")
+            await asyncio.sleep(self.intervalo_sondeo)
+
+    async def _leer_nuevos(self):
+        async with self._conexion.execute(
+            "SELECT id, origen, hogar_id, carga FROM relay_chat "
+            "WHERE id > ? ORDER BY id",
+            (self._ultimo_id,),
+        ) as cursor:
+            filas = await cursor.fetchall()
+        for id_fila, origen, hogar_id, carga in filas:
+            self._ultimo_id = id_fila
+            if origen != self.origen:
+                self._entregar(hogar_id, json.loads(carga))
+
+    async def _limpiar(self):
+        ahora = time.time()
+        if ahora - self._ultima_limpieza < self.retencion_segundos:
+            return
+        self._ultima_limpieza = ahora
+        await self._conexion.execute(
+            "DELETE FROM relay_chat WHERE creado < ?",
+            (ahora - self.retencion_segundos,),
+        )
+        await self._conexion.commit()
+
+    async def cerrar(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+        if self._conexion is not None:
+            await self._conexion.close()
+            self._conexion = None
+            logger.info("Broker SQLite cerrado")
+
+
+def crear_broker(tipo: str = None) -> Broker:
+    tipo = tipo or settings.CHAT_BROKER
+    if tipo == "proceso":
+        return BrokerEnProceso()
+    if tipo == "sqlite":
+        return BrokerSQLite(
+            settings.CHAT_BROKER_SQLITE_RUTA,
+            intervalo_sondeo=settings.CHAT_BROKER_SONDEO_MS / 1000,
+        )
+    raise ValueError(f"Broker de chat desconocido: {tipo}")
@@ -1,59 +1,122 @@
 from fastapi import WebSocket
 from sqlalchemy.ext.asyncio import AsyncSession
-from models.miembro import Miembro
-from models.mensaje import Mensaje
 from websocket.chat_manager import manager
+from websocket.persistencia import persistencia
+from websocket.recientes import evento_de_mensaje, mensaje_de_evento
 from websocket.security import decode_jwt
-from db.database import get_db
+from db.database import AsyncSessionLocal
+from utils.auth import resolver_principal
+from services.mensaje_service import (
+    obtener_mensajes_por_hogar,
+    registrar_al_guardar_fuera_del_chat,
+)
+from config.config import settings
 import json
 
+# Lo que se guarda sin pasar por el chat (mensajes en sesión de tarea) deja
+# incompleto el búfer de recientes del hogar
+registrar_al_guardar_fuera_del_chat(manager.invalidar_recientes)
+
 async def get_miembro_from_token(token: str, db: AsyncSession):
     payload = decode_jwt(token)
-    if not payload or "sub" not in payload:
+    if not payload or "sub" not in payload or payload.get("typ") == "refresh":
         return None
-    miembro_id = int(payload["sub"])
-    miembro = await db.get(Miembro, miembro_id)
-    return miembro if miembro and miembro.estado else None
+    return await resolver_principal(db, int(payload["sub"]))
+
+async def recuperar_perdidos(hogar_id: int, ultimo_id: int, limite: int):
+    """Fallback de la reanudación: lo posterior a ``ultimo_id`` desde la BD."""
+    async with AsyncSessionLocal() as db:
+        mensajes = await obtener_mensajes_por_hogar(
+            db, hogar_id, despues=ultimo_id, limite=limite
+        )
+        return [evento_de_mensaje(m) for m in mensajes]
+
+
+async def obtener_mensajes_recientes(
+    db: AsyncSession, hogar_id: int, limite: int | None = None
+):
+    """
+    Primera página del historial (sin ancla). La sirve el búfer de recientes
+    del chat si puede garantizarla; si no, consulta la BD y de paso siembra el
+    búfer con los últimos mensajes del hogar para las siguientes peticiones.
+    Con un broker que no se comparte entre workers siempre va a la BD: el
+    búfer de este worker no ve lo que difunden los demás.
+    """
+    limite = min(
+        limite or settings.MENSAJES_PAGINA_DEFECTO, settings.MENSAJES_PAGINA_MAX
+    )
+    if not manager.broker.compartido:
+        return await obtener_mensajes_por_hogar(db, hogar_id, limite=limite)
+    eventos = manager.recientes.pagina(hogar_id, limite)
+    if eventos is not None:
+        return [mensaje_de_evento(hogar_id, evento) for evento in eventos]
+
+    tamano = manager.recientes.tamano
+    consulta = min(max(limite, tamano), settings.MENSAJES_PAGINA_MAX)
+    mensajes = await obtener_mensajes_por_hogar(db, hogar_id, limite=consulta)
+    if tamano > 0:
+        manager.recientes.sembrar(
+            hogar_id,
+            [evento_de_mensaje(m) for m in mensajes[-tamano:]],
+            historial_entero=len(mensajes) < consulta,
+        )
+    return mensajes[-limite:]
+
+
+def obtener_presencia_hogar(hogar_id: int):
+    """Miembros del hogar vistos en el chat: en línea y última vez."""
+    return manager.presencia.de_hogar(hogar_id)
 
-async def chat_websocket(websocket: WebSocket, token: str):
-    async for db in get_db():
+
+async def chat_websocket(websocket: WebSocket, token: str, last_id: int | None = None):
+    # Sesión corta solo para autenticar: ninguna sesión (ni conexión del pool)
+    # queda retenida mientras el socket vive
+    async with AsyncSessionLocal() as db:
         miembro = await get_miembro_from_token(token, db)
-        if not miembro:
-            await websocket.close(code=4001, reason="Token inválido")
-            return
-
-        hogar_id = miembro.id_hogar
-        await manager.connect(websocket, hogar_id)
-
-        try:
-            while True:
-                data = await websocket.receive_text()
-                try:
-                    body = json.loads(data)
-                    contenido = body.get("contenido", "").strip()
-                    if not contenido:
-                        continue
-
-                    nuevo_mensaje = Mensaje(
-                        id_hogar=hogar_id,
-                        id_remitente=miembro.id,
-                        contenido=contenido
-                    )
-                    db.add(nuevo_mensaje)
-                    await db.commit()
-                    await db.refresh(nuevo_mensaje)
-
-                    response = {
-                        "id": nuevo_mensaje.id,
-                        "remitente": miembro.nombre_completo,
-                        "contenido": nuevo_mensaje.contenido,
-                        "fecha": nuevo_mensaje.fecha_envio.isoformat()
-                    }
-                    await manager.broadcast(response, hogar_id)
-
-                except json.JSONDecodeError:
+    if not miembro:
+        await websocket.close(code=4001, reason="Token inválido")
+        return
+
+    hogar_id = miembro.id_hogar
+    # Reconexión: ws://.../ws/chat?token=...&last_id=<último id recibido>
+    await manager.connect(
+        websocket,
+        hogar_id,
+        ultimo_id=last_id,
+        recuperar=recuperar_perdidos,
+        miembro_id=miembro.id,
+    )
+
+    try:
+        while True:
+            data = await websocket.receive_text()
+            manager.registrar_actividad(websocket)
+            try:
+                body = json.loads(data)
+                if body.get("tipo") == "pong":
+                    # Respuesta al latido: solo cuenta como actividad
+                    continue
+                contenido = body.get("contenido", "").strip()
+                if not contenido:
                     continue
 
-        except Exception:
-            manager.disconnect(websocket, hogar_id)
-        break
\ No newline at end of file
+                # Síncrona (sesión por mensaje) o diferida (sesión por lote)
+                # según settings.CHAT_PERSISTENCIA
+                mensaje_id, fecha_envio = await persistencia.guardar(
+                    hogar_id, miembro.id, contenido
+                )
+
+                response = {
+                    "id": mensaje_id,
+                    "id_remitente": miembro.id,
+                    "remitente": miembro.nombre_completo,
+                    "contenido": contenido,
+                    "fecha": fecha_envio.isoformat()
+                }
+                await manager.broadcast(response, hogar_id)
+
+            except json.JSONDecodeError:
+                continue
+
+    except Exception:
+        manager.disconnect(websocket, hogar_id)
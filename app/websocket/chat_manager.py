@@ -1,25 +1,461 @@
+import asyncio
+import sys
+import time
+from collections import deque
 from fastapi import WebSocket
-from typing import Dict, List
+from typing import Dict, Set
+from config.config import settings
+from utils.logger import setup_logger
+from utils.metricas import BUCKETS_CORTOS, registro
+from websocket.broker import Broker, crear_broker
+from websocket.codificacion import (
+    SUBPROTOCOLO_JSON,
+    Trama,
+    codificar,
+    negociar_subprotocolo,
+)
+from websocket.presencia import Presencia
+from websocket.recientes import MensajesRecientes
+
+logger = setup_logger("chat_manager")
+
+POLITICAS_COLA_LLENA = ("descartar_antiguo", "fusionar", "desconectar")
+
+# Latido del servidor: una sola Trama para todos, codificada una vez
+LATIDO = Trama({"tipo": "ping"})
+# Cierre por inactividad (código de aplicación, rango 4000-4999)
+CODIGO_INACTIVO = 4008
+
+# Lo que tarda entregar_local en encolar un mensaje a toda la sala (GET /metrics)
+duracion_difusion = registro.histograma(
+    "hometasks_ws_difusion_segundos",
+    "Tiempo de encolar un mensaje del chat en las conexiones locales de la sala",
+    buckets=BUCKETS_CORTOS,
+)
+
+
+class ConexionSaliente:
+    """
+    Cola de salida acotada de un socket, vaciada por su propia tarea escritora.
+    El emisor solo encola (sin await), así que un cliente atascado no le frena
+    ni hace crecer la memoria más allá de ``manager.max_cola`` mensajes.
+    """
+
+    # Sin __dict__ por conexión: con miles de sockets se nota
+    __slots__ = (
+        "websocket",
+        "hogar_id",
+        "miembro_id",
+        "manager",
+        "formato",
+        "cola",
+        "descartados",
+        "activa",
+        "ultima_actividad",
+        "_hay_datos",
+        "_reanudada",
+        "tarea",
+    )
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        hogar_id: int,
+        manager,
+        formato: str = SUBPROTOCOLO_JSON,
+        pausada: bool = False,
+        miembro_id: int | None = None,
+    ):
+        self.websocket = websocket
+        self.hogar_id = hogar_id
+        self.miembro_id = miembro_id
+        self.manager = manager
+        self.formato = formato
+        self.ultima_actividad = time.monotonic()
+        self.cola: deque = deque()
+        self.descartados = 0
+        self.activa = True
+        self._hay_datos = asyncio.Event()
+        # Pausada mientras se prepara la reanudación: lo que llegue en vivo se
+        # acumula detrás de lo perdido en vez de adelantarse
+        self._reanudada = asyncio.Event()
+        if not pausada:
+            self._reanudada.set()
+        self.tarea = asyncio.create_task(self._escribir())
+
+    def encolar(self, mensaje: dict) -> bool:
+        """Aplica la política si la cola está llena; False = hay que desconectar."""
+        if len(self.cola) >= self.manager.max_cola:
+            politica = self.manager.politica_cola_llena
+            if politica == "desconectar":
+                return False
+            if politica == "fusionar":
+                self._fusionar()
+            else:
+                self.cola.popleft()
+                self._descartar(1)
+        self.cola.append(mensaje)
+        self._hay_datos.set()
+        return True
+
+    def _fusionar(self):
+        # Todo lo pendiente se sustituye por un único aviso: el cliente recupera
+        # el hueco con /mensajes/hogar/{id}?despues=<último id recibido>
+        aviso = self.cola[0] if self.cola else None
+        if not (isinstance(aviso, dict) and aviso.get("tipo") == "resincronizar"):
+            aviso = {"tipo": "resincronizar", "descartados": 0}
+        else:
+            self.cola.popleft()
+        descartados = len(self.cola)
+        aviso["descartados"] += descartados
+        self.cola.clear()
+        self.cola.append(aviso)
+        self._descartar(descartados)
+
+    def anteponer(self, perdidos: list):
+        """Pone delante de la cola lo perdido (sin repetir lo ya encolado)."""
+        encolados = {m.get("id") for m in self.cola if isinstance(m, dict)}
+        perdidos = [m for m in perdidos if "id" not in m or m["id"] not in encolados]
+        maximo = self.manager.max_cola
+        if len(perdidos) > maximo:
+            # El resto se pide por REST desde el último id recibido
+            perdidos = perdidos[: maximo - 1] + [
+                {"tipo": "resincronizar", "descartados": len(perdidos) - maximo + 1}
+            ]
+        self.cola.extendleft(reversed(perdidos))
+        if self.cola:
+            self._hay_datos.set()
+
+    def reanudar(self):
+        self._reanudada.set()
+
+    def _descartar(self, cantidad: int):
+        self.descartados += cantidad
+        self.manager._sala(self.hogar_id)["descartados"] += cantidad
+
+    async def _escribir(self):
+        # Además de cancelar la tarea, disconnect() baja ``activa``: en 3.11
+        # wait_for puede tragarse la cancelación si el envío acaba a la vez
+        await self._reanudada.wait()
+        while self.activa:
+            if not self.cola:
+                self._hay_datos.clear()
+                await self._hay_datos.wait()
+                continue
+            mensaje = self.cola.popleft()
+            if not await self.manager._enviar(self.websocket, mensaje, self.formato):
+                await self.manager._retirar(self.websocket, self.hogar_id)
+                return
+
 
 class ConnectionManager:
-    def __init__(self):
-        # { hogar_id: [WebSocket] }
-        self.active_connections: Dict[int, List[WebSocket]] = {}
+    def __init__(
+        self,
+        timeout_envio: float = settings.WS_TIMEOUT_ENVIO_SEGUNDOS,
+        max_cola: int = settings.WS_COLA_MAX_MENSAJES,
+        politica_cola_llena: str = settings.WS_POLITICA_COLA_LLENA,
+        broker: Broker | None = None,
+        tamano_recientes: int = settings.WS_RECIENTES_MENSAJES,
+        max_hogares_recientes: int = settings.WS_RECIENTES_MAX_HOGARES,
+        ttl_recientes: float = settings.WS_RECIENTES_TTL_SEGUNDOS,
+        intervalo_latido: float = settings.WS_LATIDO_SEGUNDOS,
+        timeout_inactividad: float = settings.WS_INACTIVIDAD_SEGUNDOS,
+    ):
+        if politica_cola_llena not in POLITICAS_COLA_LLENA:
+            raise ValueError(f"Política de cola desconocida: {politica_cola_llena}")
+        # { hogar_id: {WebSocket} }
+        self.active_connections: Dict[int, Set[WebSocket]] = {}
+        self.timeout_envio = timeout_envio
+        self.max_cola = max_cola
+        self.politica_cola_llena = politica_cola_llena
+        self._salientes: Dict[WebSocket, ConexionSaliente] = {}
+        # Contadores acumulados por sala (sobreviven a que la sala se vacíe)
+        self._estadisticas: Dict[int, dict] = {}
+        self._cierres: Set[asyncio.Task] = set()
+        # Difusión entre workers: broadcast publica, el broker entrega en local
+        self.broker = broker if broker is not None else crear_broker()
+        self._broker_iniciado = False
+        # Últimos mensajes por hogar para reanudar y servir la primera página
+        self.recientes = MensajesRecientes(
+            tamano_recientes, max_hogares_recientes, ttl_recientes
+        )
+        # Latidos e inactividad: una sola tarea vigila todas las conexiones
+        self.intervalo_latido = intervalo_latido
+        self.timeout_inactividad = timeout_inactividad
+        self._vigilante = None
+        # Miembros en línea y última vez vistos, por hogar
+        self.presencia = Presencia()
+        self._publicaciones: Set[asyncio.Task] = set()
 
-    async def connect(self, websocket: WebSocket, hogar_id: int):
-        await websocket.accept()
-        if hogar_id not in self.active_connections:
-            self.active_connections[hogar_id] = []
-        self.active_connections[hogar_id].append(websocket)
+    async def iniciar(self):
+        if not self._broker_iniciado:
+            self._broker_iniciado = True
+            await self.broker.iniciar(self.entregar_local)
+        if self._vigilante is None and self.intervalo_latido > 0:
+            self._vigilante = asyncio.create_task(self._vigilar())
+
+    async def cerrar(self):
+        if self._vigilante is not None:
+            self._vigilante.cancel()
+            self._vigilante = None
+        if self._broker_iniciado:
+            self._broker_iniciado = False
+            await self.broker.cerrar()
+
+    def _sala(self, hogar_id: int) -> dict:
+        return self._estadisticas.setdefault(
+            hogar_id,
+            {"descartados": 0, "desconexiones_lentas": 0, "podadas": 0, "inactivas": 0},
+        )
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        hogar_id: int,
+        ultimo_id: int | None = None,
+        recuperar=None,
+        miembro_id: int | None = None,
+    ):
+        """
+        Acepta el socket y lo añade a la sala (y a la presencia del hogar si
+        se indica ``miembro_id``). Con ``ultimo_id`` (reconexión)
+        primero le envía lo publicado después de ese mensaje: desde el búfer
+        de recientes o, si ya no está ahí, con ``await recuperar(hogar_id,
+        ultimo_id, limite)``, que devuelve los mensajes del más antiguo al más
+        reciente (consulta keyset a la BD).
+        """
+        # Frames binarios msgpack si el cliente lo pide; si no, texto JSON
+        subprotocolo = negociar_subprotocolo(websocket.scope.get("subprotocols"))
+        await websocket.accept(subprotocol=subprotocolo)
+        saliente = ConexionSaliente(
+            websocket,
+            hogar_id,
+            self,
+            subprotocolo or SUBPROTOCOLO_JSON,
+            pausada=ultimo_id is not None,
+            miembro_id=miembro_id,
+        )
+        # Se registra antes de calcular lo perdido: nada cae entre medias
+        self.active_connections.setdefault(hogar_id, set()).add(websocket)
+        self._salientes[websocket] = saliente
+        if miembro_id is not None:
+            await self._publicar_presencia(
+                hogar_id, _aviso_presencia(miembro_id, "conectado")
+            )
+        if ultimo_id is None:
+            return
+        # Si no se puede recuperar, el aviso manda al cliente al historial REST
+        perdidos = [{"tipo": "resincronizar", "descartados": 0}]
+        try:
+            recuperados = self.recientes.desde(hogar_id, ultimo_id)
+            if recuperados is None and recuperar is not None:
+                recuperados = await recuperar(hogar_id, ultimo_id, self.max_cola + 1)
+            if recuperados is not None:
+                perdidos = recuperados
+        except Exception as e:
+            logger.error(f"Error al recuperar mensajes del hogar {hogar_id}: {str(e)}")
+        finally:
+            saliente.anteponer(perdidos)
+            saliente.reanudar()
 
     def disconnect(self, websocket: WebSocket, hogar_id: int):
-        self.active_connections[hogar_id].remove(websocket)
-        if not self.active_connections[hogar_id]:
+        # Idempotente: la conexión pudo haberse podado ya
+        saliente = self._salientes.pop(websocket, None)
+        if saliente is not None:
+            saliente.activa = False
+            saliente._hay_datos.set()
+            saliente.reanudar()
+            if saliente.tarea is not asyncio.current_task():
+                saliente.tarea.cancel()
+            if saliente.miembro_id is not None:
+                self._anunciar_presencia(hogar_id, saliente.miembro_id, "desconectado")
+        sala = self.active_connections.get(hogar_id)
+        if sala is None:
+            return
+        sala.discard(websocket)
+        if not sala:
             del self.active_connections[hogar_id]
 
+    async def _enviar(
+        self, websocket: WebSocket, message: dict, formato: str = SUBPROTOCOLO_JSON
+    ) -> bool:
+        try:
+            datos = codificar(message, formato)
+            if isinstance(datos, bytes):
+                envio = websocket.send_bytes(datos)
+            else:
+                envio = websocket.send_text(datos)
+            await asyncio.wait_for(envio, self.timeout_envio)
+            return True
+        except Exception:
+            # Timeout, socket cerrado o roto: se trata igual, se poda
+            return False
+
+    async def _cerrar(self, websocket: WebSocket, codigo: int = 1011):
+        try:
+            await asyncio.wait_for(websocket.close(code=codigo), self.timeout_envio)
+        except Exception:
+            pass
+
+    async def _retirar(self, websocket: WebSocket, hogar_id: int):
+        self.disconnect(websocket, hogar_id)
+        self._sala(hogar_id)["podadas"] += 1
+        logger.warning(f"Conexión muerta podada del hogar {hogar_id}")
+        await self._cerrar(websocket)
+
+    def _desconectar_lento(self, websocket: WebSocket, hogar_id: int):
+        self.disconnect(websocket, hogar_id)
+        self._sala(hogar_id)["desconexiones_lentas"] += 1
+        logger.warning(f"Cliente lento desconectado del hogar {hogar_id}")
+        self._en_segundo_plano(self._cerrar(websocket))
+
+    def _en_segundo_plano(self, corrutina):
+        tarea = asyncio.create_task(corrutina)
+        self._cierres.add(tarea)
+        tarea.add_done_callback(self._cierres.discard)
+
+    def registrar_actividad(self, websocket: WebSocket):
+        """Cualquier frame recibido del cliente (mensaje o pong) cuenta."""
+        saliente = self._salientes.get(websocket)
+        if saliente is not None:
+            saliente.ultima_actividad = time.monotonic()
+
+    async def _vigilar(self):
+        while True:
+            await asyncio.sleep(self.intervalo_latido)
+            try:
+                self.revisar_inactividad()
+            except Exception as e:
+                logger.error(f"Error al revisar conexiones inactivas: {str(e)}")
+
+    def revisar_inactividad(self, ahora: float | None = None):
+        """
+        Latido del servidor. A quien lleva un intervalo sin enviar nada se le
+        manda {"tipo": "ping"} (el cliente responde con {"tipo": "pong"}); a
+        quien supera timeout_inactividad se le da por muerto y se le saca de
+        la sala, aunque los envíos le sigan "funcionando" (TCP medio abierto).
+        """
+        ahora = time.monotonic() if ahora is None else ahora
+        for websocket, saliente in list(self._salientes.items()):
+            inactivo = ahora - saliente.ultima_actividad
+            if inactivo > self.timeout_inactividad:
+                self._desconectar_inactivo(websocket, saliente.hogar_id)
+            elif inactivo >= self.intervalo_latido and not saliente.encolar(LATIDO):
+                self._desconectar_lento(websocket, saliente.hogar_id)
+
+    def _desconectar_inactivo(self, websocket: WebSocket, hogar_id: int):
+        self.disconnect(websocket, hogar_id)
+        self._sala(hogar_id)["inactivas"] += 1
+        logger.warning(f"Conexión inactiva desalojada del hogar {hogar_id}")
+        self._en_segundo_plano(self._cerrar(websocket, CODIGO_INACTIVO))
+
+    def _anunciar_presencia(self, hogar_id: int, miembro_id: int, evento: str):
+        aviso = _aviso_presencia(miembro_id, evento)
+        if not self._broker_iniciado:
+            self.presencia.aplicar(hogar_id, aviso)
+            return
+        # disconnect() no es async: se publica en segundo plano
+        self._en_segundo_plano(self._publicar_presencia(hogar_id, aviso))
+
+    async def _publicar_presencia(self, hogar_id: int, aviso: dict):
+        if not self._broker_iniciado:
+            self.presencia.aplicar(hogar_id, aviso)
+            return
+        try:
+            await self.broker.publicar(hogar_id, aviso)
+        except Exception as e:
+            logger.error(f"Error al publicar presencia del hogar {hogar_id}: {str(e)}")
+            self.presencia.aplicar(hogar_id, aviso)
+
     async def broadcast(self, message: dict, hogar_id: int):
-        if hogar_id in self.active_connections:
-            for connection in self.active_connections[hogar_id]:
-                await connection.send_json(message)
+        """Publica en el broker: cada worker lo entrega a sus sockets de la sala."""
+        await self.iniciar()
+        await self.broker.publicar(hogar_id, message)
+
+    def entregar_local(self, hogar_id: int, message: dict):
+        """
+        Encola el mensaje en cada conexión local de la sala y vuelve enseguida:
+        cada socket lo envía desde su propia tarea. Si una cola está llena se
+        aplica politica_cola_llena. Toda la sala comparte la misma Trama, que
+        se codifica una sola vez por formato.
+        """
+        tipo = message.get("tipo")
+        if tipo == "invalidar_recientes":
+            self.recientes.invalidar(hogar_id)
+            return
+        if tipo == "presencia":
+            self.presencia.aplicar(hogar_id, message)
+            return
+        inicio = time.perf_counter()
+        trama = message if isinstance(message, Trama) else Trama(message)
+        if "id" in trama and "tipo" not in trama:
+            self.recientes.anotar(hogar_id, trama)
+        for websocket in list(self.active_connections.get(hogar_id, ())):
+            saliente = self._salientes.get(websocket)
+            if saliente is not None and not saliente.encolar(trama):
+                self._desconectar_lento(websocket, hogar_id)
+        duracion_difusion.observar(time.perf_counter() - inicio)
+
+    async def invalidar_recientes(self, hogar_id: int):
+        """
+        Descarta el búfer de recientes del hogar en todos los workers; llamar
+        cuando se guarden mensajes del hogar que no pasan por broadcast.
+        """
+        await self.iniciar()
+        await self.broker.publicar(hogar_id, {"tipo": "invalidar_recientes"})
+
+    def metricas(self) -> dict:
+        """Por sala: conexiones, profundidad de colas y descartes acumulados."""
+        datos = {}
+        for hogar_id in set(self._estadisticas) | set(self.active_connections):
+            colas = [
+                len(self._salientes[ws].cola)
+                for ws in self.active_connections.get(hogar_id, ())
+                if ws in self._salientes
+            ]
+            datos[hogar_id] = {
+                "conexiones": len(colas),
+                "cola_total": sum(colas),
+                "cola_max": max(colas, default=0),
+                **self._sala(hogar_id),
+            }
+        return datos
+
+    def memoria(self) -> dict:
+        """
+        Memoria estimada que el manager mantiene por conexión: ConexionSaliente,
+        su cola, sus eventos y su tarea escritora (las Tramas encoladas se
+        comparten con la sala y no se cuentan). No incluye el WebSocket ni la
+        tarea del endpoint; la medida completa está en bench_ws_inactivos.
+        """
+        total = sum(_bytes_conexion(s) for s in self._salientes.values())
+        conexiones = len(self._salientes)
+        return {
+            "conexiones": conexiones,
+            "bytes_total": total,
+            "bytes_por_conexion": total // conexiones if conexiones else 0,
+        }
+
+
+def _aviso_presencia(miembro_id: int, evento: str) -> dict:
+    return {
+        "tipo": "presencia",
+        "miembro": miembro_id,
+        "evento": evento,
+        "instante": time.time(),
+    }
+
+
+def _bytes_conexion(saliente: ConexionSaliente) -> int:
+    tamano = sys.getsizeof(saliente) + sys.getsizeof(saliente.cola)
+    for evento in (saliente._hay_datos, saliente._reanudada):
+        tamano += sys.getsizeof(evento) + sys.getsizeof(evento.__dict__)
+        tamano += sys.getsizeof(evento._waiters)
+    corrutina = saliente.tarea.get_coro()
+    tamano += sys.getsizeof(saliente.tarea) + sys.getsizeof(corrutina)
+    if getattr(corrutina, "cr_frame", None) is not None:
+        tamano += sys.getsizeof(corrutina.cr_frame)
+    return tamano
+
 
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
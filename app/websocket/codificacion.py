@@ -0,0 +1,79 @@
+"""
+Codificación de los frames del chat.
+
+Un mensaje difundido se codifica una sola vez por formato y todos los sockets
+de la sala reciben el mismo texto o los mismos bytes (antes send_json repetía
+json.dumps por cada destinatario). Formatos, negociados con el subprotocolo
+del WebSocket (cabecera Sec-WebSocket-Protocol):
+
+- "json" (por defecto, también sin subprotocolo): frames de texto JSON
+  compacto. Usa orjson si está instalado y si no json de la stdlib.
+- "msgpack": frames binarios MessagePack (paquete msgpack).
+
+Lo que envían los clientes sigue siendo JSON en texto en ambos casos.
+"""
+
+import json
+
+import msgpack
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+SUBPROTOCOLO_JSON = "json"
+SUBPROTOCOLO_MSGPACK = "msgpack"
+# En orden de preferencia del servidor
+SUBPROTOCOLOS = (SUBPROTOCOLO_MSGPACK, SUBPROTOCOLO_JSON)
+
+
+def negociar_subprotocolo(ofrecidos) -> str | None:
+    """Primer subprotocolo soportado de los que ofrece el cliente (o None)."""
+    for subprotocolo in SUBPROTOCOLOS:
+        if subprotocolo in (ofrecidos or ()):
+            return subprotocolo
+    return None
+
+
+def codificar_json(mensaje) -> str:
+    # Mismo resultado que send_json de Starlette: compacto y sin escapar UTF-8
+    if orjson is not None:
+        return orjson.dumps(mensaje, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(mensaje, separators=(",", ":"), ensure_ascii=False)
+
+
+def codificar_msgpack(mensaje) -> bytes:
+    return msgpack.packb(mensaje, use_bin_type=True)
+
+
+CODIFICADORES = {
+    SUBPROTOCOLO_JSON: codificar_json,
+    SUBPROTOCOLO_MSGPACK: codificar_msgpack,
+}
+
+
+class Trama(dict):
+    """
+    Mensaje difundido a una sala. Guarda su codificación por formato: la
+    primera tarea escritora que la necesita la calcula y el resto la reutiliza.
+    """
+
+    __slots__ = ("_codificada",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._codificada = {}
+
+    def codificar(self, formato: str):
+        datos = self._codificada.get(formato)
+        if datos is None:
+            datos = self._codificada[formato] = CODIFICADORES[formato](self)
+        return datos
+
+
+def codificar(mensaje: dict, formato: str = SUBPROTOCOLO_JSON):
+    """str para frames de texto, bytes para binarios."""
+    if isinstance(mensaje, Trama):
+        return mensaje.codificar(formato)
+    return CODIFICADORES[formato](mensaje)
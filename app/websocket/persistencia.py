@@ -0,0 +1,249 @@
+"""
+Persistencia de los mensajes del chat.
+
+- PersistenciaSincrona: INSERT + commit de cada mensaje antes de difundirlo,
+  con una sesión corta por mensaje.
+- PersistenciaDiferida (write-behind): el id y la fecha se asignan en el
+  servidor, el mensaje se difunde enseguida y un flusher en segundo plano lo
+  guarda en INSERTs multi-fila cada ``intervalo`` o cada ``max_lote`` mensajes.
+
+En los dos modos los ids salen de bloques reservados en la tabla
+``secuencias`` (hi/lo, db/secuencias.py), así que son únicos entre workers sin
+una ida y vuelta por mensaje y nunca chocan con los de otro modo o worker.
+Se elige con settings.CHAT_PERSISTENCIA.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from config.config import settings
+from db.database import AsyncSessionLocal
+from db.secuencias import AsignadorIds, ids_mensajes
+from models.mensaje import Mensaje
+from utils.logger import setup_logger
+
+logger = setup_logger("chat_persistencia")
+
+
+def _asignador(fabrica_sesiones, tamano_bloque: int) -> AsignadorIds:
+    """
+    Asignador del motor al que apunta ahora ``fabrica_sesiones``: se resuelve
+    en cada uso, así que sustituir la fábrica cambia también de dónde salen
+    los bloques, y es el mismo que usa services/mensaje_service.py.
+    """
+    return ids_mensajes(fabrica_sesiones.kw["bind"], tamano_bloque)
+
+
+class PersistenciaSincrona:
+    def __init__(
+        self,
+        fabrica_sesiones=AsyncSessionLocal,
+        tamano_bloque: int = settings.CHAT_BLOQUE_IDS,
+    ):
+        self.fabrica_sesiones = fabrica_sesiones
+        self.tamano_bloque = tamano_bloque
+        # Métricas
+        self.persistidos = 0
+        self.errores = 0
+
+    @property
+    def ids(self) -> AsignadorIds:
+        return _asignador(self.fabrica_sesiones, self.tamano_bloque)
+
+    async def guardar(
+        self, hogar_id: int, remitente_id: int, contenido: str
+    ) -> tuple[int, datetime]:
+        # Una sesión corta por mensaje: la conexión vuelve al pool enseguida
+        try:
+            mensaje_id = await self.ids.siguiente()
+            async with self.fabrica_sesiones() as db:
+                mensaje = Mensaje(
+                    id=mensaje_id,
+                    id_hogar=hogar_id,
+                    id_remitente=remitente_id,
+                    contenido=contenido,
+                )
+                db.add(mensaje)
+                await db.commit()
+                await db.refresh(mensaje)
+        except Exception:
+            self.errores += 1
+            raise
+        self.persistidos += 1
+        return mensaje.id, mensaje.fecha_envio
+
+    async def iniciar(self):
+        pass
+
+    async def cerrar(self):
+        pass
+
+    def metricas(self) -> dict:
+        # Mismas claves que PersistenciaDiferida: aquí nada queda pendiente
+        return {
+            "pendientes": 0,
+            "persistidos": self.persistidos,
+            "lotes": self.persistidos,
+            "descartados": 0,
+            "rechazados": 0,
+            "errores": self.errores,
+        }
+
+
+class PersistenciaDiferida:
+    def __init__(
+        self,
+        fabrica_sesiones=AsyncSessionLocal,
+        intervalo: float = settings.CHAT_LOTE_INTERVALO_MS / 1000,
+        max_lote: int = settings.CHAT_LOTE_MAX_MENSAJES,
+        max_pendientes: int = settings.CHAT_LOTE_MAX_PENDIENTES,
+        tamano_bloque: int = settings.CHAT_BLOQUE_IDS,
+    ):
+        self.fabrica_sesiones = fabrica_sesiones
+        self.intervalo = intervalo
+        self.max_lote = max_lote
+        self.max_pendientes = max_pendientes
+        self.tamano_bloque = tamano_bloque
+        self._pendientes: list[dict] = []
+        self._lote_lleno = asyncio.Event()
+        self._tarea = None
+        self._cerrando = False
+        # Métricas
+        self.persistidos = 0
+        self.lotes = 0
+        self.descartados = 0
+        self.rechazados = 0
+        self.errores = 0
+
+    @property
+    def ids(self) -> AsignadorIds:
+        return _asignador(self.fabrica_sesiones, self.tamano_bloque)
+
+    async def iniciar(self):
+        if self._tarea is None:
+            self._tarea = asyncio.create_task(self._vaciar_periodicamente())
+
+    async def guardar(
+        self, hogar_id: int, remitente_id: int, contenido: str
+    ) -> tuple[int, datetime]:
+        # Sin sesión: el flusher persiste cada lote con una sesión propia y corta
+        await self.iniciar()
+        mensaje_id = await self.ids.siguiente()
+        # Sin microsegundos: es la precisión de DATETIME en MySQL
+        fecha = datetime.now().replace(microsecond=0)
+        self._pendientes.append(
+            {
+                "id": mensaje_id,
+                "id_hogar": hogar_id,
+                "id_remitente": remitente_id,
+                "contenido": contenido,
+                "fecha_envio": fecha,
+                "fecha_creacion": fecha,
+                "fecha_actualizacion": fecha,
+                "leido": False,
+                "estado": 1,
+            }
+        )
+        if len(self._pendientes) >= self.max_lote:
+            self._lote_lleno.set()
+        return mensaje_id, fecha
+
+    async def _vaciar_periodicamente(self):
+        while not self._cerrando:
+            try:
+                await asyncio.wait_for(self._lote_lleno.wait(), self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._lote_lleno.clear()
+            await self.vaciar()
+
+    async def vaciar(self):
+        """Persiste lo pendiente en lotes de max_lote (INSERT multi-fila)."""
+        while self._pendientes:
+            lote = self._pendientes[: self.max_lote]
+            inicio = time.perf_counter()
+            try:
+                insertados = await self._insertar(lote)
+            except Exception as e:
+                # BD no disponible: el lote se queda en cabeza y se reintenta
+                self.errores += 1
+                logger.error(
+                    f"Error al persistir lote de {len(lote)} mensajes: {str(e)}"
+                )
+                self._recortar()
+                return
+            del self._pendientes[: len(lote)]
+            self.persistidos += insertados
+            self.lotes += 1
+            logger.debug(
+                f"Lote de {len(lote)} mensajes persistido en "
+                f"{(time.perf_counter() - inicio) * 1000:.1f} ms"
+            )
+
+    async def _insertar(self, lote: list[dict]) -> int:
+        """
+        INSERT del lote. Si viola una restricción se parte en mitades hasta
+        aislar las filas culpables, que se descartan: reintentar el lote entero
+        lo atascaría para siempre y con él todos los mensajes posteriores.
+        Devuelve cuántas filas se guardaron.
+        """
+        try:
+            async with self.fabrica_sesiones() as db:
+                await db.execute(insert(Mensaje.__table__), lote)
+                await db.commit()
+            return len(lote)
+        except IntegrityError as e:
+            if len(lote) == 1:
+                self.rechazados += 1
+                logger.error(
+                    f"Mensaje {lote[0]['id']} del hogar {lote[0]['id_hogar']} "
+                    f"descartado, la BD lo rechaza: {str(e.orig)}"
+                )
+                return 0
+            mitad = len(lote) // 2
+            return await self._insertar(lote[:mitad]) + await self._insertar(
+                lote[mitad:]
+            )
+
+    def _recortar(self):
+        # Con la BD caída no se acumula sin límite: se pierden los más antiguos
+        exceso = len(self._pendientes) - self.max_pendientes
+        if exceso > 0:
+            del self._pendientes[:exceso]
+            self.descartados += exceso
+            logger.error(f"Descartados {exceso} mensajes sin persistir")
+
+    async def cerrar(self):
+        # Se deja terminar al flusher (sin cancelarlo a mitad de un lote)
+        if self._tarea is not None:
+            self._cerrando = True
+            self._lote_lleno.set()
+            await self._tarea
+            self._tarea = None
+            self._cerrando = False
+        await self.vaciar()
+
+    def metricas(self) -> dict:
+        return {
+            "pendientes": len(self._pendientes),
+            "persistidos": self.persistidos,
+            "lotes": self.lotes,
+            "descartados": self.descartados,
+            "rechazados": self.rechazados,
+            "errores": self.errores,
+        }
+
+
+def crear_persistencia(modo: str = None):
+    modo = modo or settings.CHAT_PERSISTENCIA
+    if modo == "sincrona":
+        return PersistenciaSincrona()
+    if modo == "diferida":
+        return PersistenciaDiferida()
+    raise ValueError(f"Modo de persistencia del chat desconocido: {modo}")
+
+
+persistencia = crear_persistencia()
@@ -0,0 +1,64 @@
+"""
+Presencia del chat por hogar: qué miembros están conectados y cuándo se les
+vio por última vez.
+
+Cada worker aplica los eventos "conectado"/"desconectado" que publica
+ConnectionManager por el broker, así que con el broker "sqlite" la vista
+incluye las conexiones de todos los workers. Es una vista aproximada: un
+worker que arranca no conoce las conexiones abiertas antes en los demás, y
+las de un worker que muere sin cerrarlas se quedan en línea hasta su
+siguiente desconexión (los contadores nunca bajan de cero).
+"""
+
+import time
+from datetime import datetime
+from typing import Dict
+
+
+class EstadoMiembro:
+    __slots__ = ("conexiones", "ultima_vez")
+
+    def __init__(self):
+        self.conexiones = 0
+        self.ultima_vez = 0.0
+
+
+class Presencia:
+    def __init__(self):
+        # { hogar_id: { miembro_id: EstadoMiembro } }
+        self._hogares: Dict[int, Dict[int, EstadoMiembro]] = {}
+
+    def _estado(self, hogar_id: int, miembro_id: int) -> EstadoMiembro:
+        miembros = self._hogares.setdefault(hogar_id, {})
+        estado = miembros.get(miembro_id)
+        if estado is None:
+            estado = miembros[miembro_id] = EstadoMiembro()
+        return estado
+
+    def aplicar(self, hogar_id: int, evento: dict):
+        """Aplica un evento {"tipo": "presencia", "miembro", "evento", "instante"}."""
+        estado = self._estado(hogar_id, evento["miembro"])
+        if evento["evento"] == "conectado":
+            estado.conexiones += 1
+        else:
+            estado.conexiones = max(estado.conexiones - 1, 0)
+        estado.ultima_vez = max(estado.ultima_vez, evento["instante"])
+
+    def de_hogar(self, hogar_id: int) -> list[dict]:
+        """Miembros vistos en el hogar: en línea primero, luego por última vez."""
+        ahora = time.time()
+        miembros = [
+            {
+                "id_miembro": miembro_id,
+                "en_linea": estado.conexiones > 0,
+                "ultima_vez": datetime.fromtimestamp(
+                    ahora if estado.conexiones > 0 else estado.ultima_vez
+                ),
+            }
+            for miembro_id, estado in self._hogares.get(hogar_id, {}).items()
+        ]
+        miembros.sort(key=lambda m: (not m["en_linea"], -m["ultima_vez"].timestamp()))
+        return miembros
+
+    def limpiar(self):
+        self._hogares.clear()
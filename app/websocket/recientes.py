@@ -0,0 +1,167 @@
+"""
+Búfer en memoria de los últimos mensajes del chat por hogar.
+
+ConnectionManager.entregar_local anota en él cada mensaje que difunde, así que
+(con cualquier broker) contiene en orden de entrega todo lo publicado en el
+hogar desde que se creó su búfer. Sirve para:
+
+- reanudar tras una reconexión: lo posterior a ``last_id`` sale de memoria y
+  solo se va a la BD si ese id ya no está en el búfer;
+- la primera página de /mensajes/hogar/{id} sin consultar la BD, una vez que
+  el búfer se ha "sembrado" con los últimos mensajes guardados y durante
+  ``ttl`` segundos. Solo es fiable si el broker comparte la difusión entre
+  workers (ver Broker.compartido): con "proceso" y varios workers cada uno
+  solo ve lo que difunde él.
+
+Se guardan hasta ``tamano`` mensajes por hogar y ``max_hogares`` hogares
+(los menos usados se descartan primero).
+"""
+
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from websocket.codificacion import Trama
+
+
+def evento_de_mensaje(mensaje) -> dict:
+    """Mensaje (modelo, con remitente cargado) → frame del chat."""
+    return {
+        "id": mensaje.id,
+        "id_remitente": mensaje.id_remitente,
+        "remitente": mensaje.remitente.nombre_completo if mensaje.remitente else None,
+        "contenido": mensaje.contenido,
+        "fecha": mensaje.fecha_envio.isoformat(),
+    }
+
+
+def mensaje_de_evento(hogar_id: int, evento: dict) -> dict:
+    """Frame del chat → dict con la forma de MensajeResponse."""
+    remitente = None
+    if evento.get("remitente") is not None:
+        remitente = {
+            "id": evento["id_remitente"],
+            "nombre_completo": evento["remitente"],
+        }
+    return {
+        "id": evento["id"],
+        "id_hogar": hogar_id,
+        "id_remitente": evento["id_remitente"],
+        "contenido": evento["contenido"],
+        "fecha_envio": datetime.fromisoformat(evento["fecha"]),
+        "remitente": remitente,
+    }
+
+
+class BufferSala:
+    def __init__(self, tamano: int):
+        self.mensajes: deque = deque(maxlen=tamano)
+        # sembrado: contiene los últimos mensajes guardados del hogar, no solo
+        # lo entregado desde que se creó el búfer
+        self.sembrado = False
+        self.sembrado_en = 0.0
+        # historial_entero: además no hay nada más antiguo en la BD
+        self.historial_entero = False
+
+    def anotar(self, evento: dict):
+        if len(self.mensajes) == self.mensajes.maxlen:
+            self.historial_entero = False
+        self.mensajes.append(evento)
+
+
+class MensajesRecientes:
+    def __init__(self, tamano: int, max_hogares: int, ttl: float | None = None):
+        self.tamano = tamano
+        self.max_hogares = max_hogares
+        # Segundos que vale la siembra para servir páginas (None: sin caducidad)
+        self.ttl = ttl
+        self._salas: OrderedDict[int, BufferSala] = OrderedDict()
+        # Métricas
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _sala(self, hogar_id: int, crear: bool = False) -> BufferSala | None:
+        sala = self._salas.get(hogar_id)
+        if sala is None and crear:
+            sala = self._salas[hogar_id] = BufferSala(self.tamano)
+            while len(self._salas) > self.max_hogares:
+                self._salas.popitem(last=False)
+        if sala is not None:
+            self._salas.move_to_end(hogar_id)
+        return sala
+
+    def anotar(self, hogar_id: int, evento: dict):
+        if self.tamano > 0:
+            self._sala(hogar_id, crear=True).anotar(evento)
+
+    def invalidar(self, hogar_id: int):
+        self._salas.pop(hogar_id, None)
+
+    def limpiar(self):
+        self._salas.clear()
+
+    def desde(self, hogar_id: int, ultimo_id: int) -> list | None:
+        """
+        Mensajes entregados después de ``ultimo_id``, del más antiguo al más
+        reciente. None si ese id ya no está en el búfer (hay que ir a la BD).
+        """
+        sala = self._sala(hogar_id)
+        if sala is not None:
+            # Orden de entrega, no de id: los ids diferidos no son crecientes
+            # entre workers
+            for posicion in range(len(sala.mensajes) - 1, -1, -1):
+                if sala.mensajes[posicion]["id"] == ultimo_id:
+                    self.aciertos += 1
+                    return list(sala.mensajes)[posicion + 1 :]
+        self.fallos += 1
+        return None
+
+    def pagina(self, hogar_id: int, limite: int) -> list | None:
+        """
+        Los ``limite`` mensajes más recientes, del más antiguo al más reciente
+        por (fecha, id) como la página de la BD, o None si el búfer no puede
+        garantizarlos (sin sembrar, siembra caducada o demasiado corto).
+        """
+        sala = self._sala(hogar_id)
+        if sala is not None and sala.sembrado and self.ttl is not None:
+            if time.monotonic() - sala.sembrado_en > self.ttl:
+                sala.sembrado = False
+        if (
+            sala is None
+            or not sala.sembrado
+            or (len(sala.mensajes) < limite and not sala.historial_entero)
+        ):
+            self.fallos += 1
+            return None
+        self.aciertos += 1
+        # El búfer está en orden de entrega; la BD ordena por (fecha_envio, id)
+        ordenados = sorted(sala.mensajes, key=lambda e: (e["fecha"], e["id"]))
+        return ordenados[-limite:]
+
+    def sembrar(self, hogar_id: int, eventos: list, historial_entero: bool):
+        """
+        Rellena el búfer con los últimos mensajes guardados (del más antiguo al
+        más reciente). Lo entregado mientras se consultaba la BD y que aún no
+        estaba guardado se conserva detrás.
+        """
+        if self.tamano <= 0:
+            return
+        sala = self._sala(hogar_id, crear=True)
+        guardados = {evento["id"] for evento in eventos}
+        posteriores = [e for e in sala.mensajes if e["id"] not in guardados]
+        sala.mensajes.clear()
+        sala.historial_entero = historial_entero
+        for evento in eventos:
+            sala.anotar(Trama(evento))
+        for evento in posteriores:
+            sala.anotar(evento)
+        sala.sembrado = True
+        sala.sembrado_en = time.monotonic()
+
+    def metricas(self) -> dict:
+        return {
+            "hogares": len(self._salas),
+            "mensajes": sum(len(s.mensajes) for s in self._salas.values()),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+        }